@@ -5,15 +5,41 @@ Adapté pour les managers RH du Smart Retail Group
 """
 
 import logging
-import json
+import threading
+from collections import OrderedDict
 from enum import Enum
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
 from user_manager import user_manager
 from game_content_manager import content_manager as template
+from path_log import completed_path_log
+from tracing import tracer
+from log_pipeline import configure_logging
+
+trace_scoring = tracer.channel('scoring')
+trace_enablers = tracer.channel('enablers')
+
+# Données du jeu dérivées du contenu (objets Choice), partagées en lecture seule par
+# toutes les parties: (version du contenu, données)
+_game_data_cache: Tuple[int, Dict] = (-1, {})
+
+# Parties reconstruites depuis un parcours (from_path): état et champs du GamePath par
+# (version du contenu, parcours). Le calcul des enablers domine la reconstruction.
+DERIVED_PATHS_MAX = 4096
+_derived_paths: 'OrderedDict[tuple, Tuple[GameState, Dict]]' = OrderedDict()
+_derived_paths_lock = threading.Lock()
+
+
+def _copy_value(value):
+    """Copie des listes/dicts d'un GamePath (chaque partie modifie les siens)"""
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return {key: _copy_value(item) for key, item in value.items()}
+    return value
 
 # Configuration du logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+configure_logging()
 logger = logging.getLogger(__name__)
 
 class GameState(Enum):
@@ -81,9 +107,70 @@ class AIAccelerationGame:
             mot5_choice=""
         )
         self.template = template
-        self.game_data = self._initialize_game_data()
-        self.completed_paths = []
+        self.game_data = self._shared_game_data()
         
+    def _shared_game_data(self) -> Dict:
+        """Données du jeu de la version courante du contenu (construites une fois par version)"""
+        global _game_data_cache
+        version, game_data = _game_data_cache
+        if version != self.template.version:
+            game_data = self._initialize_game_data()
+            _game_data_cache = (self.template.version, game_data)
+        return game_data
+
+    @classmethod
+    def from_path(cls, started: bool, mot1_choice: str = "", mot2_choices: Optional[List[str]] = None,
+                  mot3_choices: Optional[Dict[str, str]] = None, mot4_choices: Optional[List[str]] = None,
+                  mot5_choice: str = "") -> 'AIAccelerationGame':
+        """Partie reconstruite à partir d'un parcours déjà validé (jeton signé): même état qu'en
+        rejouant start_game() puis les make_motN, sans revalider chaque étape"""
+        game = cls()
+        if not started:
+            return game
+        mot2_choices, mot3_choices, mot4_choices = list(mot2_choices or []), dict(mot3_choices or {}), list(mot4_choices or [])
+        key = (game.template.version, mot1_choice, tuple(mot2_choices), tuple(mot3_choices.items()),
+               tuple(mot4_choices), mot5_choice)
+        with _derived_paths_lock:
+            derived = _derived_paths.get(key)
+            if derived is not None:
+                _derived_paths.move_to_end(key)
+        if derived is None:
+            derived = game._derive_path(mot1_choice, mot2_choices, mot3_choices, mot4_choices, mot5_choice)
+            with _derived_paths_lock:
+                _derived_paths[key] = derived
+                while len(_derived_paths) > DERIVED_PATHS_MAX:
+                    _derived_paths.popitem(last=False)
+        game.current_state = derived[0]
+        game.current_path.__dict__.update({name: _copy_value(value) for name, value in derived[1].items()})
+        return game
+
+    def _derive_path(self, mot1_choice: str, mot2_choices: List[str], mot3_choices: Dict[str, str],
+                     mot4_choices: List[str], mot5_choice: str) -> Tuple[GameState, Dict]:
+        """État et champs du GamePath après les étapes du parcours (calculés sur cette partie)"""
+        path = self.current_path
+        path.mot1_choice = mot1_choice
+        path.mot2_choices = list(mot2_choices)
+        path.mot3_choices = dict(mot3_choices)
+        path.mot4_choices = list(mot4_choices)
+        path.mot5_choice = mot5_choice
+        steps = [(mot1_choice, GameState.MOT2), (mot2_choices, GameState.MOT3), (mot3_choices, GameState.MOT4),
+                 (mot4_choices, GameState.MOT5), (mot5_choice, GameState.RESULTS)]
+        self.current_state = GameState.MOT1
+        for made, state in steps:
+            if made:
+                self.current_state = state
+        if mot4_choices:
+            path.mot4_score = self._mot4_choice_score(mot4_choices)
+        if mot5_choice:
+            self._calculate_final_score()
+        elif mot1_choice or mot2_choices or mot3_choices:
+            # make_mot4_choices ne recalcule pas les enablers: ceux de l'étape 4 n'apparaissent
+            # qu'au choix de l'étape 5
+            path.mot4_choices = []
+            self._calculate_enablers()
+            path.mot4_choices = list(mot4_choices)
+        return self.current_state, {name: _copy_value(value) for name, value in path.__dict__.items()}
+
     def _initialize_game_data(self) -> Dict:
         """Initialise toutes les données du jeu depuis le template"""
         template = self.template
@@ -279,7 +366,7 @@ class AIAccelerationGame:
             self.current_path.mot1_choice = approach_id
             self.current_state = GameState.MOT2
             mot1_score = self.calculate_mot_score(1)
-            logger.info(f"MOT1 choice made: {approach_id} - Score: {mot1_score}/3")
+            trace_scoring("MOT1 choice made: %s - Score: %s/3", approach_id, mot1_score)
 
             # Calculer les ENABLERS débloqués
             self._calculate_enablers()
@@ -322,16 +409,16 @@ class AIAccelerationGame:
         # Calculer le score basé sur le nombre de bonnes positions
         if correct_count == 3:
             mot2_score = 3  # 3 étoiles
-            logger.info(f"MOT2 perfect choices: {solution_ids} (positions 1,3,4) - Score: 3/3")
+            trace_scoring("MOT2 perfect choices: %s (positions 1,3,4) - Score: 3/3", solution_ids)
         elif correct_count == 2:
             mot2_score = 2  # 2 étoiles
-            logger.info(f"MOT2 good choices: {solution_ids} (2/3 correct positions) - Score: 2/3")
+            trace_scoring("MOT2 good choices: %s (2/3 correct positions) - Score: 2/3", solution_ids)
         elif correct_count == 1:
             mot2_score = 1  # 1 étoile
-            logger.info(f"MOT2 partial choices: {solution_ids} (1/3 correct positions) - Score: 1/3")
+            trace_scoring("MOT2 partial choices: %s (1/3 correct positions) - Score: 1/3", solution_ids)
         else:
             mot2_score = 0  # 0 étoile
-            logger.info(f"MOT2 incorrect choices: {solution_ids} (0/3 correct positions) - Score: 0/3")
+            trace_scoring("MOT2 incorrect choices: %s (0/3 correct positions) - Score: 0/3", solution_ids)
         
         # Calculer les ENABLERS débloqués
         self._calculate_enablers()
@@ -410,7 +497,7 @@ class AIAccelerationGame:
         self.current_path.mot3_choices = choices
         self.current_state = GameState.MOT4
         mot3_score = self.calculate_mot_score(3)
-        logger.info(f"MOT3 choices made: {choices} - Score: {mot3_score}/3")
+        trace_scoring("MOT3 choices made: %s - Score: %s/3", choices, mot3_score)
 
         # Calculer les ENABLERS débloqués
         self._calculate_enablers()
@@ -439,7 +526,20 @@ class AIAccelerationGame:
         # Enregistrer les choix
         self.current_path.mot4_choices = enabler_ids
 
-        # Calculer le score basé sur les bonnes réponses
+        # Enregistrer le score
+        score = self._mot4_choice_score(enabler_ids)
+        self.current_path.mot4_score = score
+
+        # Passer à l'état suivant
+        self.current_state = GameState.MOT5
+        
+        trace_scoring("MOT4 choices made: %s, total cost: %s/30, score: %s/4", enabler_ids, total_cost, score)
+        
+        return True
+    
+    @staticmethod
+    def _mot4_choice_score(enabler_ids: List[str]) -> int:
+        """Score enregistré au choix MOT4, basé sur les bonnes réponses"""
         good_choices = {
             'industrialized_data_pipelines',
             'ai_product_teams_setup', 
@@ -447,27 +547,15 @@ class AIAccelerationGame:
             'country_level_ai_deployment'
         }
 
-        correct_choices = set(enabler_ids) & good_choices
-        correct_count = len(correct_choices)
+        correct_count = len(set(enabler_ids) & good_choices)
         
         # Logique de scoring : 4/4 = 3 étoiles, 3/4 = 2 étoiles, 2 ou moins = 1 étoile
         if correct_count == 4:
-            score = 3
+            return 3
         elif correct_count == 3:
-            score = 2
-        else:
-            score = 1
-
-        # Enregistrer le score
-        self.current_path.mot4_score = score
+            return 2
+        return 1
 
-        # Passer à l'état suivant
-        self.current_state = GameState.MOT5
-        
-        logger.info(f"MOT4 choices made: {enabler_ids}, total cost: {total_cost}/30, score: {score}/4")
-        
-        return True
-    
     def get_mot5_choices(self) -> List[Choice]:
         """Retourne les choix disponibles pour MOT5"""
         choices = []
@@ -495,7 +583,7 @@ class AIAccelerationGame:
             self._calculate_enablers()
 
             self._calculate_final_score()
-            logger.info(f"MOT5 choice made: {choice_id} - Score: {mot5_score}/3")
+            trace_scoring("MOT5 choice made: %s - Score: %s/3", choice_id, mot5_score)
             return True
         return False
     
@@ -606,8 +694,7 @@ class AIAccelerationGame:
 
     def _calculate_enablers(self):
         """Calcule les ENABLERS débloqués par les choix selon le score obtenu"""
-        print(f"DEBUG _calculate_enablers: Starting calculation")
-        print(f"DEBUG _calculate_enablers: mot4_choices = {self.current_path.mot4_choices}")
+        trace_enablers("_calculate_enablers: mot4_choices = %s", self.current_path.mot4_choices)
         
         # Réinitialiser complètement les enablers par catégorie
         enablers_by_category = {
@@ -639,19 +726,18 @@ class AIAccelerationGame:
                 # Get use cases from template
                 template = self.template
                 use_cases = template.get_choice_use_cases("phase1", "amira")
-                logger.info(f"Phase 1 DEBUG: Amira choice, use_cases={use_cases}")
+                trace_enablers("Phase 1: Amira choice, use_cases=%s", use_cases)
                 # Store use cases instead of enablers
                 enablers_by_phase["phase1"] = use_cases
             else:
                 phase_enablers = self._get_enablers_for_score(choice, phase1_score)
-                logger.info(f"Phase 1 DEBUG: choice={self.current_path.mot1_choice}, score={phase1_score}, enablers={phase_enablers}")
+                trace_enablers("Phase 1: choice=%s, score=%s, enablers=%s", self.current_path.mot1_choice, phase1_score, phase_enablers)
 
                 if phase_enablers:
-                    logger.info(f"Phase 1 DEBUG: adding enablers={phase_enablers}")
                     # Ajouter chaque enabler dans sa propre catégorie selon le template
                     for enabler in phase_enablers:
                         enabler_category = self.template.get_enabler_category(enabler)
-                        logger.info(f"Phase 1 DEBUG: enabler '{enabler}' has category '{enabler_category}'")
+                        trace_enablers("Phase 1: enabler %r has category %r", enabler, enabler_category)
                         if enabler not in enablers_by_category[enabler_category]:
                             enablers_by_category[enabler_category].append(enabler)
                     # Mettre à jour la phase 1
@@ -659,13 +745,12 @@ class AIAccelerationGame:
 
         # Phase 2 - HR Solution choices
         phase2_score = self.calculate_mot_score(2)
-        print(f"DEBUG _calculate_enablers Phase 2: mot2_choices = {self.current_path.mot2_choices}")
-        print(f"DEBUG _calculate_enablers Phase 2: phase2_score = {phase2_score}")
+        trace_enablers("Phase 2: mot2_choices = %s, score = %s", self.current_path.mot2_choices, phase2_score)
         phase2_enablers = []
         for solution_id in self.current_path.mot2_choices:
             choice = self.game_data["mot2_hr_solutions"][solution_id]
             choice_enablers = self._get_enablers_for_score(choice, phase2_score)
-            print(f"DEBUG _calculate_enablers Phase 2: Choice '{solution_id}' unlocks {choice_enablers}")
+            trace_enablers("Phase 2: choice %r unlocks %s", solution_id, choice_enablers)
             if choice_enablers:
                 # Ajouter chaque enabler dans sa propre catégorie selon le template
                 for enabler in choice_enablers:
@@ -675,15 +760,14 @@ class AIAccelerationGame:
                 phase2_enablers.extend(choice_enablers)
         # Mettre à jour la phase 2
         enablers_by_phase["phase2"] = list(set(phase2_enablers))
-        print(f"DEBUG _calculate_enablers Phase 2: Final phase2_enablers = {enablers_by_phase['phase2']}")
-        print(f"DEBUG _calculate_enablers Phase 2: enablers_by_category = {enablers_by_category}")
+        trace_enablers("Phase 2: phase2_enablers = %s, enablers_by_category = %s", enablers_by_phase['phase2'], enablers_by_category)
 
         # Phase 3 - Enabler choices (déjà organisés par catégorie)
         phase3_score = self.calculate_mot_score(3)
         phase3_enablers = []
+        # Récupérer les choix depuis le template (une fois pour toutes les catégories)
+        choices_by_category = self.get_mot3_choices() if self.current_path.mot3_choices else {}
         for category, choice_id in self.current_path.mot3_choices.items():
-            # Récupérer les choix depuis le template
-            choices_by_category = self.get_mot3_choices()
             if category in choices_by_category:
                 choice_obj = None
                 for choice in choices_by_category[category]:
@@ -704,32 +788,27 @@ class AIAccelerationGame:
         # Phase 4 - Scaling enabler choices
         phase4_score = self.calculate_mot_score(4)
         phase4_enablers = []
-        print(f"DEBUG _calculate_enablers Phase 4: mot4_choices = {self.current_path.mot4_choices}")
-        print(f"DEBUG _calculate_enablers Phase 4: phase4_score = {phase4_score}")
+        trace_enablers("Phase 4: mot4_choices = %s, score = %s", self.current_path.mot4_choices, phase4_score)
         
+        # Récupérer les choix depuis le template (une fois pour tous les choix)
+        choice_dict = {choice.id: choice for choice in self.get_mot4_choices()} if self.current_path.mot4_choices else {}
         for choice_id in self.current_path.mot4_choices:
-            print(f"DEBUG _calculate_enablers Phase 4: Processing choice '{choice_id}'")
-            # Récupérer les choix depuis le template
-            choices = self.get_mot4_choices()
-            choice_dict = {choice.id: choice for choice in choices}
-            
             if choice_id in choice_dict:
                 choice_obj = choice_dict[choice_id]
                 choice_enablers = self._get_enablers_for_score(choice_obj, phase4_score)
-                print(f"DEBUG _calculate_enablers Phase 4: Choice '{choice_id}' unlocks {choice_enablers}")
+                trace_enablers("Phase 4: choice %r unlocks %s", choice_id, choice_enablers)
                 if choice_enablers:
                     # Ajouter chaque enabler dans sa propre catégorie selon le template
                     for enabler in choice_enablers:
                         enabler_category = self.template.get_enabler_category(enabler)
-                        print(f"DEBUG _calculate_enablers Phase 4: Enabler '{enabler}' has category '{enabler_category}'")
+                        trace_enablers("Phase 4: enabler %r has category %r", enabler, enabler_category)
                         if enabler not in enablers_by_category[enabler_category]:
                             enablers_by_category[enabler_category].append(enabler)
-                            print(f"DEBUG _calculate_enablers Phase 4: Added '{enabler}' to category '{enabler_category}'")
                     phase4_enablers.extend(choice_enablers)
             else:
-                print(f"DEBUG _calculate_enablers Phase 4: Choice '{choice_id}' not found in choice_dict")
+                trace_enablers("Phase 4: choice %r not found in choice_dict", choice_id)
         
-        print(f"DEBUG _calculate_enablers Phase 4: Final phase4_enablers = {phase4_enablers}")
+        trace_enablers("Phase 4: phase4_enablers = %s", phase4_enablers)
         enablers_by_phase["phase4"] = list(set(phase4_enablers))
 
         # Phase 5 - HR Deployment choice (même logique que Step 1)
@@ -738,14 +817,13 @@ class AIAccelerationGame:
             phase5_score = self.calculate_mot_score(5)
             
             phase_enablers = self._get_enablers_for_score(choice, phase5_score)
-            logger.info(f"Phase 5 DEBUG: choice={self.current_path.mot5_choice}, score={phase5_score}, enablers={phase_enablers}")
+            trace_enablers("Phase 5: choice=%s, score=%s, enablers=%s", self.current_path.mot5_choice, phase5_score, phase_enablers)
 
             if phase_enablers:
-                logger.info(f"Phase 5 DEBUG: adding enablers={phase_enablers}")
                 # Ajouter chaque enabler dans sa propre catégorie selon le template
                 for enabler in phase_enablers:
                     enabler_category = self.template.get_enabler_category(enabler)
-                    logger.info(f"Phase 5 DEBUG: enabler '{enabler}' has category '{enabler_category}'")
+                    trace_enablers("Phase 5: enabler %r has category %r", enabler, enabler_category)
                     if enabler not in enablers_by_category[enabler_category]:
                         enablers_by_category[enabler_category].append(enabler)
                 # Mettre à jour la phase 5
@@ -765,45 +843,31 @@ class AIAccelerationGame:
         self.current_path.unlocked_enablers = list(set(all_enablers))
 
         # Debug final
-        logger.info(f"FINAL DEBUG: Total enablers={len(self.current_path.unlocked_enablers)}")
-        logger.info(f"FINAL DEBUG: Enablers by category={enablers_by_category}")
-        logger.info(f"FINAL DEBUG: Enablers by phase={enablers_by_phase}")
-        logger.info(f"FINAL DEBUG: Current path mot1_choice={self.current_path.mot1_choice}")
-        logger.info(f"FINAL DEBUG: Current path mot2_choices={self.current_path.mot2_choices}")
-        logger.info(f"FINAL DEBUG: Current path mot3_choices={self.current_path.mot3_choices}")
-        logger.info(f"FINAL DEBUG: Current path mot4_choices={self.current_path.mot4_choices}")
+        trace_enablers("Total enablers=%s, by category=%s, by phase=%s", len(self.current_path.unlocked_enablers), enablers_by_category, enablers_by_phase)
 
     def _get_enablers_for_score(self, choice: Choice, score: int) -> List[str]:
         """Retourne les ENABLERS débloqués selon le score obtenu"""
         enablers = []
 
         # Debug: afficher les informations du choix
-        logger.info(f"Checking enablers for choice {choice.id} with score {score}")
-        logger.info(f"Choice has unlocks_enablers: {choice.unlocks_enablers}")
-        logger.info(f"Choice has enablers_1_star: {choice.enablers_1_star}")
-        logger.info(f"Choice has enablers_2_stars: {choice.enablers_2_stars}")
-        logger.info(f"Choice has enablers_3_stars: {choice.enablers_3_stars}")
+        trace_enablers("Checking enablers for choice %s with score %s (unlocks=%s, 1*=%s, 2*=%s, 3*=%s)", choice.id, score, choice.unlocks_enablers, choice.enablers_1_star, choice.enablers_2_stars, choice.enablers_3_stars)
 
         # Si le choix utilise l'ancien système (unlocks_enablers), on l'utilise pour tous les scores
         if choice.unlocks_enablers:
-            logger.info(f"Using old system: returning {choice.unlocks_enablers}")
             return choice.unlocks_enablers
 
         # Nouveau système basé sur les scores
         if score >= 1 and choice.enablers_1_star:
             enablers.extend(choice.enablers_1_star)
-            logger.info(f"Added 1-star enablers: {choice.enablers_1_star}")
 
         if score >= 2 and choice.enablers_2_stars:
             enablers.extend(choice.enablers_2_stars)
-            logger.info(f"Added 2-star enablers: {choice.enablers_2_stars}")
 
         if score >= 3 and choice.enablers_3_stars:
             enablers.extend(choice.enablers_3_stars)
-            logger.info(f"Added 3-star enablers: {choice.enablers_3_stars}")
 
         result = list(set(enablers))  # Supprimer les doublons
-        logger.info(f"Final enablers for choice {choice.id}: {result}")
+        trace_enablers("Final enablers for choice %s: %s", choice.id, result)
         return result
 
     def _get_choice_pillars(self) -> Dict[str, str]:
@@ -923,27 +987,18 @@ class AIAccelerationGame:
     
     def save_path(self):
         """Sauvegarde le chemin actuel"""
-        self.completed_paths.append(self.current_path)
-        
-        # Sauvegarder dans un fichier JSON
-        with open("completed_paths.json", "w") as f:
-            json.dump([path.__dict__ for path in self.completed_paths], f, indent=2)
+        # Ajout au journal des parcours (NDJSON, écrit par lots hors de la requête)
+        completed_path_log.append(self.current_path.__dict__)
     
-    def get_statistics(self) -> Dict:
-        """Retourne les statistiques des chemins complétés"""
-        if not self.completed_paths:
-            return {"total_paths": 0}
-        
-        total_paths = len(self.completed_paths)
-        avg_score = sum(path.total_score for path in self.completed_paths) / total_paths
-        star_distribution = {i: sum(1 for path in self.completed_paths if path.stars == i) for i in range(1, 4)}
-        
+    def get_path_choices(self) -> Dict[str, List[str]]:
+        """Choix du parcours actuel par phase (statistiques de choix)"""
+        path = self.current_path
         return {
-            "total_paths": total_paths,
-            "average_score": round(avg_score, 2),
-            "star_distribution": star_distribution,
-            "best_score": max(path.total_score for path in self.completed_paths),
-            "worst_score": min(path.total_score for path in self.completed_paths)
+            "phase1": [path.mot1_choice],
+            "phase2": list(path.mot2_choices),
+            "phase3": list(path.mot3_choices.values()),
+            "phase4": list(path.mot4_choices),
+            "phase5": [path.mot5_choice]
         }
 
 def main():
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmarks base de données de UserManager à différentes volumétries
+Pour chaque taille, une base synthétique est générée (generate_db.py) puis les
+opérations du jeu sont chronométrées: leaderboards, vérification d'unicité des
+usernames, flux de connexion et de fin de partie. Tout tourne hors ligne.
+
+Usage:
+    python benchmarks/db_benchmarks.py                          # 1k, 10k, 100k scores
+    python benchmarks/db_benchmarks.py --sizes 1000 1000000 --iterations 50
+    python benchmarks/db_benchmarks.py --output db_results.json --keep /tmp/aiquest_dbs
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+WORK_DIR = tempfile.mkdtemp(prefix='aiquest_dbbench_')
+os.environ.setdefault('DATABASE_PATH', os.path.join(WORK_DIR, 'global.db'))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+# Mesurer SQLite, pas l'instrumentation (SQL_PROFILE=1 pour l'inclure)
+os.environ.setdefault('SQL_PROFILE', '0')
+
+from generate_db import generate  # noqa: E402
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+MOT_SCORES = {'mot1': 3, 'mot2': 2, 'mot3': 3, 'mot4': 3, 'mot5': 2}
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max en millisecondes"""
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        'n': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p50_ms': round(pick(0.50) * 1000, 3),
+        'p95_ms': round(pick(0.95) * 1000, 3),
+        'p99_ms': round(pick(0.99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def time_operation(operation: Callable[[int], object], iterations: int, budget: float) -> Dict[str, float]:
+    """Chronomètre `operation(i)` jusqu'à `iterations` fois ou jusqu'à épuisement de `budget` secondes"""
+    samples = []
+    deadline = time.perf_counter() + budget
+    for i in range(iterations):
+        started = time.perf_counter()
+        operation(i)
+        samples.append(time.perf_counter() - started)
+        if started > deadline:
+            break
+    return percentiles(samples)
+
+
+def run_size(scores: int, iterations: int, budget: float, seed: int, db_dir: str) -> Dict:
+    """Génère une base de `scores` lignes et chronomètre chaque opération"""
+    from user_manager import UserManager
+
+    db_path = os.path.join(db_dir, f"aiquest_{scores}.db")
+    generated_at = time.perf_counter()
+    info = generate(db_path, scores=scores, seed=seed)
+    info['generation_s'] = round(time.perf_counter() - generated_at, 2)
+    manager = UserManager(db_path=db_path)
+
+    big = info['largest_session']['code']
+    small = info['smallest_session']['code']
+    live = info['live_session']
+    rng = random.Random(seed)
+
+    def join(i: int) -> None:
+        # Même enchaînement que /api/login en mode Kahoot
+        username = manager.generate_unique_username(f"Bench{rng.randint(0, 10 ** 6)}", live)
+        manager.get_session_by_code(live)
+        if not manager.username_exists_in_session(username, live):
+            if not manager.get_user_by_username(username):
+                manager.create_user(username, kahoot_mode=True)
+            manager.increment_session_player_count(live)
+            manager.register_active_player(username, live)
+
+    def finish(i: int) -> None:
+        # Même enchaînement que /api/phase5/choose
+        username = f"Finisher{i}"
+        manager.save_game_score(username, 13, 2, MOT_SCORES, live)
+        manager.remove_active_player(username, live)
+
+    operations = {
+        'get_leaderboard(limit=1000)': lambda i: manager.get_leaderboard(limit=1000),
+        'get_leaderboard(limit=50)': lambda i: manager.get_leaderboard(limit=50),
+        'leaderboard_for_session(all-hands)': lambda i: manager.get_leaderboard_for_session(big),
+        'leaderboard_for_session(small)': lambda i: manager.get_leaderboard_for_session(small),
+        'username_exists_in_session(hit)': lambda i: manager.username_exists_in_session('Alice', big),
+        'username_exists_in_session(miss)': lambda i: manager.username_exists_in_session(f'Nobody{i}', big),
+        'generate_unique_username(all-hands)': lambda i: manager.generate_unique_username('Alice', big),
+        'join_flow': join,
+        'save_game_score': lambda i: manager.save_game_score(f"Saver{i}", 12, 2, MOT_SCORES, live),
+        'finish_flow': finish,
+    }
+
+    results = {}
+    for name, operation in operations.items():
+        results[name] = time_operation(operation, iterations, budget)
+        print(f"  {name:<38} p50 {results[name]['p50_ms']:>9.3f} ms   p95 {results[name]['p95_ms']:>9.3f} ms"
+              f"   p99 {results[name]['p99_ms']:>9.3f} ms   (n={results[name]['n']})", flush=True)
+
+    info['file_bytes_after'] = os.path.getsize(db_path)
+    return {'dataset': info, 'operations': results}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks base de données UserManager')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='lignes dans game_scores')
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--budget', type=float, default=10.0, help='temps max par opération et par taille (s)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='fichier JSON de résultats')
+    parser.add_argument('--keep', help='conserver les bases générées dans ce répertoire')
+    args = parser.parse_args(argv)
+
+    db_dir = args.keep or WORK_DIR
+    os.makedirs(db_dir, exist_ok=True)
+    report = {'iterations': args.iterations, 'budget_s': args.budget, 'seed': args.seed, 'sizes': {}}
+    try:
+        for scores in args.sizes:
+            print(f"\n=== {scores:,} scores ===", flush=True)
+            result = run_size(scores, args.iterations, args.budget, args.seed, db_dir)
+            dataset = result['dataset']
+            print(f"  base: {dataset['file_bytes'] / 1024 / 1024:.1f} MB, {dataset['sessions']} sessions, "
+                  f"session all-hands: {dataset['largest_session']['players']} joueurs "
+                  f"(générée en {dataset['generation_s']} s)")
+            report['sizes'][str(scores)] = result
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nRésultats écrits dans {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
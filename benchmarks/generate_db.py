@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Générateur de bases SQLite synthétiques pour les benchmarks base de données
+Le schéma est créé par UserManager (mêmes tables et index que l'application),
+puis rempli en masse avec une distribution réaliste: quelques grosses sessions
+"all-hands" et beaucoup de petites sessions d'équipe.
+
+Usage:
+    python benchmarks/generate_db.py --scores 100000 --output /tmp/aiquest_100k.db
+    python benchmarks/generate_db.py --scores 1000000 --sessions 2000 --active 500 --seed 7
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import string
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+FIRST_NAMES = [
+    'Alice', 'Amira', 'Antoine', 'Camille', 'Chloe', 'David', 'Elena', 'Emma', 'Hugo', 'Ines',
+    'James', 'Julie', 'Karim', 'Lea', 'Lucas', 'Manon', 'Marie', 'Mohamed', 'Nathan', 'Nina',
+    'Olivier', 'Paul', 'Sarah', 'Sophie', 'Thomas', 'Yanis', 'Zoe', 'Steven', 'Laura', 'Maxime',
+]
+SESSION_CODE_CHARS = string.ascii_uppercase + string.digits
+BATCH_SIZE = 10000
+
+
+def _session_sizes(rng: random.Random, sessions: int, players: int, big_sessions: int, big_share: float) -> List[int]:
+    """Répartit `players` entre les sessions: `big_sessions` gros événements captent `big_share` des joueurs"""
+    big_sessions = min(big_sessions, sessions)
+    small_sessions = sessions - big_sessions
+    big_total = int(players * big_share) if small_sessions else players
+    small_total = players - big_total
+
+    def spread(total: int, count: int, alpha: float) -> List[int]:
+        if count <= 0:
+            return []
+        weights = [rng.paretovariate(alpha) for _ in range(count)]
+        scale = total / sum(weights)
+        sizes = [max(1, int(w * scale)) for w in weights]
+        sizes[0] += total - sum(sizes)
+        return [max(1, size) for size in sizes]
+
+    return spread(big_total, big_sessions, 3.0) + spread(small_total, small_sessions, 1.5)
+
+
+def _mot_scores(rng: random.Random) -> Dict[str, int]:
+    # Les joueurs réussissent plutôt bien: distribution centrée sur 2 étoiles par MOT
+    return {f"mot{i}": rng.choices((1, 2, 3), weights=(2, 5, 3))[0] for i in range(1, 6)}
+
+
+def generate(db_path: str, scores: int = 10000, sessions: int = 0, replays: float = 1.2,
+             active: int = 200, big_sessions: int = 3, big_share: float = 0.4, seed: int = 42) -> Dict:
+    """Crée `db_path` avec ~`scores` lignes dans game_scores et retourne les caractéristiques du jeu de données"""
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    # L'import de user_manager crée son instance globale sur DATABASE_PATH: pas de users.db parasite
+    os.environ.setdefault('DATABASE_PATH', db_path)
+    from user_manager import UserManager
+    UserManager(db_path=db_path)  # schéma + admin par défaut
+
+    rng = random.Random(seed)
+
+    players = max(1, int(scores / replays))
+    sessions = sessions or max(1, players // 40)
+    sizes = _session_sizes(rng, sessions, players, big_sessions, big_share)
+
+    codes = set()
+    while len(codes) < len(sizes):
+        codes.add(''.join(rng.choice(SESSION_CODE_CHARS) for _ in range(6)))
+    codes = sorted(codes, key=lambda _: rng.random())
+
+    started_at = datetime(2024, 1, 1)
+    session_rows, score_rows, active_rows = [], [], []
+    usernames = set()
+    session_players: Dict[str, int] = {}
+
+    for index, (code, size) in enumerate(zip(codes, sizes)):
+        session_start = started_at + timedelta(hours=index * 6)
+        session_rows.append((code, 'admin', session_start.isoformat(), size))
+        session_players[code] = size
+        names_in_session = set()
+        for _ in range(size):
+            # Collisions de prénoms réalistes: "Alice", "Alice1", "Alice2"...
+            base = rng.choice(FIRST_NAMES)
+            username = base
+            suffix = 1
+            while username.lower() in names_in_session:
+                username = f"{base}{suffix}"
+                suffix += 1
+            names_in_session.add(username.lower())
+            usernames.add(username)
+
+            completed = session_start + timedelta(seconds=rng.randint(300, 3600))
+            for attempt in range(1 + (rng.random() < replays - 1)):
+                mot_scores = _mot_scores(rng)
+                total = sum(mot_scores.values())
+                stars = 3 if total >= 14 else (2 if total >= 11 else 1)
+                score_rows.append((username, total, stars, json.dumps(mot_scores),
+                                   (completed + timedelta(minutes=attempt * 20)).isoformat(), code))
+
+    # Joueurs en cours de partie dans les sessions les plus récentes
+    recent = list(reversed(codes))
+    for index in range(active):
+        code = recent[index % min(len(recent), 5)]
+        username = f"{rng.choice(FIRST_NAMES)}_live{index}"
+        usernames.add(username)
+        now = datetime.now().isoformat()
+        active_rows.append((code, username, now))
+
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT INTO game_sessions (session_code, created_by, created_at, is_active, player_count)
+            VALUES (?, ?, ?, 1, ?)
+        ''', session_rows)
+        now = datetime.now().isoformat()
+        user_rows = [(name, now) for name in sorted(usernames) if name != 'admin']
+        for start in range(0, len(user_rows), BATCH_SIZE):
+            cursor.executemany('''
+                INSERT OR IGNORE INTO users (username, role, created_at, is_active, is_kahoot_mode)
+                VALUES (?, 'user', ?, 1, 1)
+            ''', user_rows[start:start + BATCH_SIZE])
+        for start in range(0, len(score_rows), BATCH_SIZE):
+            cursor.executemany('''
+                INSERT INTO game_scores (username, total_score, stars, mot_scores, completed_at, session_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', score_rows[start:start + BATCH_SIZE])
+        cursor.executemany('''
+            INSERT OR IGNORE INTO active_players (session_code, username, connected_at)
+            VALUES (?, ?, ?)
+        ''', active_rows)
+        conn.commit()
+
+    largest = max(session_players, key=session_players.get)
+    smallest = min(session_players, key=session_players.get)
+    return {
+        'path': db_path,
+        'seed': seed,
+        'sessions': len(codes),
+        'players': sum(sizes),
+        'users': len(usernames),
+        'scores': len(score_rows),
+        'active_players': len(active_rows),
+        'largest_session': {'code': largest, 'players': session_players[largest]},
+        'smallest_session': {'code': smallest, 'players': session_players[smallest]},
+        'live_session': recent[0],
+        'file_bytes': os.path.getsize(db_path),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Génère une base SQLite synthétique')
+    parser.add_argument('--output', required=True, help='chemin de la base à créer (écrasée si elle existe)')
+    parser.add_argument('--scores', type=int, default=10000, help='lignes visées dans game_scores')
+    parser.add_argument('--sessions', type=int, default=0, help='nombre de sessions (défaut: ~40 joueurs/session)')
+    parser.add_argument('--replays', type=float, default=1.2, help='parties moyennes par joueur (1.0 à 2.0)')
+    parser.add_argument('--active', type=int, default=200, help='joueurs en cours (active_players)')
+    parser.add_argument('--big-sessions', type=int, default=3, help='nombre de sessions all-hands')
+    parser.add_argument('--big-share', type=float, default=0.4, help='part des joueurs dans les sessions all-hands')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    info = generate(args.output, args.scores, args.sessions, args.replays, args.active,
+                    args.big_sessions, args.big_share, args.seed)
+    print(json.dumps(info, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks du moteur de jeu, du content manager et de l'API
+Sans réseau: le moteur est appelé directement, l'API via le test client Flask.
+
+Usage:
+    python benchmarks/run_benchmarks.py                       # lance tout et compare à baseline.json
+    python benchmarks/run_benchmarks.py -k engine.mot         # filtre par nom
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --threshold 0.15      # régression si > +15% (temps minimum)
+    python benchmarks/run_benchmarks.py --update-baseline     # réécrit baseline.json
+
+Code de sortie 1 si au moins un benchmark régresse au-delà du seuil (temps rapporté à une
+boucle de référence mesurée à chaque répétition; une régression est confirmée par une
+nouvelle mesure avant d'être retenue).
+"""
+
+import argparse
+import atexit
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_THRESHOLD = 0.30
+# Requêtes API: plus de bruit (thread d'écriture, allocations Flask) que le moteur, donc
+# plus de répétitions et des répétitions plus longues
+WEB_REPEAT = 15
+WEB_MIN_TIME = 0.5
+
+# Environnement isolé: base temporaire, logs réduits, pas de thread de log mémoire.
+# Le journal des parcours (completed_paths.ndjson) est écrit à côté de la base: dans un tempdir.
+WORK_DIR = tempfile.mkdtemp(prefix='aiquest_bench_')
+atexit.register(shutil.rmtree, WORK_DIR, ignore_errors=True)
+os.environ.setdefault('DATABASE_PATH', os.path.join(WORK_DIR, 'bench.db'))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('MEMORY_LOG_INTERVAL', '0')
+sys.path.insert(0, ROOT_DIR)
+
+# Un parcours complet valide (ids de game_content.json)
+PATH = {
+    'mot1': 'elena',
+    'mot2': ['fraud_integrity_detection', 'smart_game_design_assistant', 'player_journey_optimizer'],
+    'mot3': {'technology': 'ai_data_platform_modernization', 'people': 'ai_leadership_program',
+             'gover': 'ai_governance_board'},
+    'mot4': ['industrialized_data_pipelines', 'ai_product_teams_setup', 'ai_storytelling_communication',
+             'country_level_ai_deployment'],
+    'mot5': 'empower_people_amplify_impact',
+}
+
+# Un benchmark reçoit un nombre de boucles et retourne le temps écoulé (secondes)
+Benchmark = Callable[[int], float]
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str):
+    """Enregistre un benchmark"""
+    def register(func: Benchmark) -> Benchmark:
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+# --------------------------------------------------------------------- moteur
+
+def _game_at(step: int):
+    """Partie ayant joué les MOTs 1..step"""
+    from ai_acceleration_game import AIAccelerationGame
+    game = AIAccelerationGame()
+    if step >= 1:
+        game.make_mot1_choice(PATH['mot1'])
+    if step >= 2:
+        game.make_mot2_choices(PATH['mot2'])
+    if step >= 3:
+        game.make_mot3_choices(PATH['mot3'])
+    if step >= 4:
+        game.make_mot4_choices(PATH['mot4'])
+    if step >= 5:
+        game.make_mot5_choice(PATH['mot5'])
+    return game
+
+
+def _time_on_game(step: int, action: Callable) -> Benchmark:
+    """Chronomètre `action(game)` sur une partie préparée hors mesure
+
+    Les make_motN_choice écrasent le choix du MOT et recalculent scores et
+    enablers: les rejouer sur la même partie mesure le même travail.
+    """
+    def run(loops: int) -> float:
+        game = _game_at(step)
+        started = time.perf_counter()
+        for _ in range(loops):
+            action(game)
+        return time.perf_counter() - started
+    return run
+
+
+@benchmark('engine.construct')
+def bench_construct(loops: int) -> float:
+    from ai_acceleration_game import AIAccelerationGame
+    started = time.perf_counter()
+    for _ in range(loops):
+        AIAccelerationGame()
+    return time.perf_counter() - started
+
+
+BENCHMARKS['engine.mot1_choice'] = _time_on_game(0, lambda g: g.make_mot1_choice(PATH['mot1']))
+BENCHMARKS['engine.mot2_choices'] = _time_on_game(1, lambda g: g.make_mot2_choices(PATH['mot2']))
+BENCHMARKS['engine.mot3_choices'] = _time_on_game(2, lambda g: g.make_mot3_choices(PATH['mot3']))
+BENCHMARKS['engine.mot4_choices'] = _time_on_game(3, lambda g: g.make_mot4_choices(PATH['mot4']))
+BENCHMARKS['engine.mot5_choice'] = _time_on_game(4, lambda g: g.make_mot5_choice(PATH['mot5']))
+BENCHMARKS['engine.calculate_enablers'] = _time_on_game(5, lambda g: g._calculate_enablers())
+BENCHMARKS['engine.current_score'] = _time_on_game(5, lambda g: g.get_current_score())
+
+
+# -------------------------------------------------------------------- contenu
+
+def _time_calls(call: Callable[[], object]) -> Benchmark:
+    def run(loops: int) -> float:
+        started = time.perf_counter()
+        for _ in range(loops):
+            call()
+        return time.perf_counter() - started
+    return run
+
+
+def _register_content_benchmarks() -> None:
+    from game_content_manager import content_manager as content
+    BENCHMARKS['content.phase_choices'] = _time_calls(lambda: content.get_phase_choices('phase4'))
+    BENCHMARKS['content.choice_enablers'] = _time_calls(
+        lambda: content.get_choice_enablers('phase4', 'industrialized_data_pipelines'))
+    BENCHMARKS['content.choice_title'] = _time_calls(lambda: content.get_choice_title('phase2', 'ai_storyline_generator'))
+    BENCHMARKS['content.all_enablers'] = _time_calls(content.get_all_enablers)
+    BENCHMARKS['content.step_choices'] = _time_calls(lambda: content.get_step_choices(3))
+
+
+# ------------------------------------------------------------------------ API
+
+def _played_client():
+    """Test client connecté ayant joué une partie complète"""
+    from web_interface import app
+    client = app.test_client()
+    client.post('/api/login', json={'username': 'bench_player'})
+    client.post('/api/phase1/choose', json={'character_id': PATH['mot1']})
+    client.post('/api/phase2/choose', json={'solution_ids': PATH['mot2']})
+    client.post('/api/phase3/choose', json={'choices': PATH['mot3']})
+    client.post('/api/phase4/choose', json={'enabler_ids': PATH['mot4']})
+    client.post('/api/phase5/choose', json={'choice_id': PATH['mot5']})
+    return client
+
+
+def _time_requests(path: str) -> Benchmark:
+    clients = []
+
+    def run(loops: int) -> float:
+        # Une seule partie par benchmark, préchauffée et écrite en base avant la première mesure:
+        # pas d'écritures du journal d'événements pendant les répétitions
+        if not clients:
+            from player_events import player_events
+            client = _played_client()
+            for _ in range(10):
+                client.get(path)
+            player_events.flush()
+            clients.append(client)
+        client = clients[0]
+        started = time.perf_counter()
+        for _ in range(loops):
+            response = client.get(path)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{path} -> {response.status_code}")
+        return time.perf_counter() - started
+    return run
+
+
+BENCHMARKS['web.executive_dashboard'] = _time_requests('/api/executive_dashboard')
+BENCHMARKS['web.current_score'] = _time_requests('/api/current_score')
+BENCHMARKS['web.phase4_choices'] = _time_requests('/api/phase4/choices')
+
+
+# --------------------------------------------------------------------- runner
+
+def _reference(loops: int = 200) -> float:
+    """Boucle Python fixe chronométrée avec chaque répétition: mesure la vitesse de la machine
+    à cet instant (les VM partagées varient de plusieurs dizaines de % en quelques secondes)"""
+    started = time.perf_counter()
+    for _ in range(loops):
+        sum(range(1000))
+    return (time.perf_counter() - started) / loops
+
+
+def measure(func: Benchmark, repeat: int, min_time: float) -> Dict:
+    """Calibre le nombre de boucles (>= min_time par répétition) puis mesure `repeat` fois"""
+    loops = 1
+    while True:
+        elapsed = func(loops)
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+    # Comme timeit: pas de passage du ramasse-miettes pendant les mesures
+    gc.collect()
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    timings, references = [], []
+    try:
+        for _ in range(repeat):
+            references.append(_reference())
+            timings.append(func(loops) / loops)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {
+        'loops': loops,
+        'repeat': repeat,
+        'min_us': round(min(timings) * 1e6, 3),
+        'median_us': round(statistics.median(timings) * 1e6, 3),
+        'stdev_us': round(statistics.stdev(timings) * 1e6, 3) if repeat > 1 else 0.0,
+        # Temps en unités de la boucle de référence (minimum de chacun): comparable d'un run à l'autre
+        'relative': round(min(timings) / min(references), 6),
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Retourne les lignes de comparaison; les régressions commencent par 'REGRESSION'"""
+    lines = []
+    thresholds = baseline.get('thresholds', {})
+    for name, result in results['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            lines.append(f"  new        {name:<30} {result['min_us']:>12.1f} us")
+            continue
+        limit = thresholds.get(name, threshold)
+        # Le minimum des répétitions est le moins sensible au bruit de la machine (cf. timeit),
+        # rapporté à la boucle de référence quand la baseline la connaît (vitesse de la machine)
+        if base.get('relative') and result.get('relative'):
+            ratio = result['relative'] / base['relative']
+        else:
+            ratio = result['min_us'] / base['min_us'] if base['min_us'] else 1.0
+        status = 'REGRESSION' if ratio > 1 + limit else ('faster' if ratio < 1 - limit else 'ok')
+        lines.append(f"  {status:<10} {name:<30} {result['min_us']:>12.1f} us  "
+                     f"(baseline {base['min_us']:.1f} us, x{ratio:.2f}, seuil +{limit:.0%})")
+    return lines
+
+
+def _measure_named(name: str, args: argparse.Namespace) -> Dict:
+    if name.startswith('web.'):
+        return measure(BENCHMARKS[name], max(args.repeat, WEB_REPEAT), max(args.min_time, WEB_MIN_TIME))
+    return measure(BENCHMARKS[name], args.repeat, args.min_time)
+
+
+def _write_results(path: str, results: Dict) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Micro-benchmarks AI Quest')
+    parser.add_argument('-k', '--filter', default='', help='ne lance que les benchmarks contenant ce texte')
+    parser.add_argument('--repeat', type=int, default=9)
+    parser.add_argument('--min-time', type=float, default=0.2, help='durée minimale par répétition (s)')
+    parser.add_argument('--output', help='fichier JSON de résultats')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='régression tolérée sur le temps minimum (0.30 = +30%%)')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    # game_content.json est lu relativement au répertoire courant: importer avant le chdir
+    os.chdir(ROOT_DIR)
+    import web_interface  # noqa: F401
+    from scheduler import scheduler
+    os.chdir(WORK_DIR)
+    # Tâches de maintenance (snapshots, heartbeats...) arrêtées: elles tomberaient dans les mesures
+    scheduler.stop()
+    _register_content_benchmarks()
+
+    results = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'git': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': {}
+    }
+    for name in sorted(BENCHMARKS):
+        if args.filter not in name:
+            continue
+        result = _measure_named(name, args)
+        results['results'][name] = result
+        print(f"{name:<30} {result['min_us']:>12.1f} us  (médiane {result['median_us']:.1f}, x{result['loops']})")
+
+    if args.output:
+        _write_results(args.output, results)
+
+    if args.update_baseline:
+        previous = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        merged = {**previous.get('results', {}), **results['results']}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'meta': results['meta'], 'thresholds': previous.get('thresholds', {}), 'results': merged},
+                      f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baseline mise à jour: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("Pas de baseline: lancer avec --update-baseline")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nComparaison avec {os.path.relpath(args.baseline, ROOT_DIR)} (git {baseline.get('meta', {}).get('git')}):")
+    lines = compare(results, baseline, args.threshold)
+    suspects = [line.split()[1] for line in lines if line.lstrip().startswith('REGRESSION')]
+    if suspects:
+        # Une régression n'est retenue que si elle se confirme: sur une VM partagée, un
+        # ralentissement de quelques secondes peut couvrir toutes les répétitions d'un benchmark
+        print(f"\nNouvelle mesure de {len(suspects)} benchmark(s) au-delà du seuil")
+        for name in suspects:
+            retry = _measure_named(name, args)
+            if retry['relative'] < results['results'][name]['relative']:
+                results['results'][name] = retry
+        lines = compare(results, baseline, args.threshold)
+        if args.output:
+            _write_results(args.output, results)
+    print('\n'.join(lines))
+    regressions = [line for line in lines if line.lstrip().startswith('REGRESSION')]
+    if regressions:
+        print(f"\n❌ {len(regressions)} régression(s)")
+        return 1
+    print("\n✅ Pas de régression")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
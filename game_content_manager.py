@@ -4,6 +4,7 @@ Game Content Manager - Simple and Clear Template System
 This file manages ALL visible text and content in the game.
 """
 
+import hashlib
 import json
 import os
 from typing import Dict, Any, Optional
@@ -11,7 +12,10 @@ from typing import Dict, Any, Optional
 class GameContentManager:
     def __init__(self, content_file: str = "game_content.json"):
         self.content_file = content_file
+        self.version = 0
+        self.fingerprint = 0
         self.content = self._load_content()
+        self._bump_version()
     
     def _load_content(self) -> Dict[str, Any]:
         """Load content from JSON file"""
@@ -401,6 +405,7 @@ class GameContentManager:
                 self.content[section] = {}
             self.content[section][key] = value
             self._save_content()
+            self._bump_version()
             return True
         except Exception as e:
             print(f"Error updating content: {e}")
@@ -442,6 +447,14 @@ class GameContentManager:
     def reload_content(self) -> None:
         """Reload content from file"""
         self.content = self._load_content()
+        self._bump_version()
+
+    def _bump_version(self) -> None:
+        """Increment the content version so derived caches get rebuilt"""
+        self.version += 1
+        # Stable across processes (unlike version): identifies the content itself
+        canonical = json.dumps(self.content, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        self.fingerprint = int.from_bytes(hashlib.sha256(canonical).digest()[:4], 'big')
 
 # Global instance
 content_manager = GameContentManager()
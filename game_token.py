@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Jeton signé portant la partie d'un joueur (mode sans état serveur)
+Le parcours est encodé de façon compacte (indices des choix dans game_content.json),
+accompagné de l'empreinte du contenu et d'un MAC HMAC-SHA256 tronqué. N'importe quel
+worker ou réplica peut ainsi reconstruire la partie sans mémoire partagée; un jeton
+modifié ou émis pour une autre version du contenu est refusé.
+
+Le MAC couvre aussi le joueur (code de session, username), sans l'inclure dans le jeton:
+un jeton présenté par un autre joueur que celui pour qui il a été émis est refusé.
+
+Format (base64url, ~60 caractères):
+    version (B) | empreinte du contenu (I) | drapeaux (B) |
+    5 x [nombre de choix (B) + indices (B...)] | MAC (12 octets)
+"""
+
+import base64
+import hashlib
+import hmac
+import logging
+import struct
+from typing import Dict, List, Tuple
+
+from ai_acceleration_game import GameState
+from player_events import EVENT_STEP, MOT3_CATEGORIES, PlayerState
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION = 1
+MAC_SIZE = 12
+FLAG_STARTED = 1
+
+
+def path_steps(path) -> List[List[str]]:
+    """Choix d'un parcours par étape, dans l'ordre des événements (étape 3: une case par catégorie)"""
+    return [
+        [path.mot1_choice] if path.mot1_choice else [],
+        list(path.mot2_choices or []),
+        [path.mot3_choices.get(category, '') for category in MOT3_CATEGORIES] if path.mot3_choices else [],
+        list(path.mot4_choices or []),
+        [path.mot5_choice] if path.mot5_choice else [],
+    ]
+
+
+class InvalidGameToken(ValueError):
+    """Jeton illisible, falsifié ou émis pour un autre contenu"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class GameTokenCodec:
+    """Encode/décode le parcours d'une partie dans un jeton signé"""
+
+    def __init__(self, secret: str, content):
+        self._key = hashlib.sha256(f"game-token:{secret}".encode('utf-8')).digest()
+        self.content = content
+        self._tables_version = None
+        self._ids: Dict[int, List[str]] = {}
+        self._indices: Dict[int, Dict[str, int]] = {}
+
+    def _tables(self) -> Tuple[Dict[int, List[str]], Dict[int, Dict[str, int]]]:
+        """Indices des choix par étape, reconstruits quand le contenu change"""
+        if self._tables_version != self.content.version:
+            ids = {phase: list(self.content.get_phase_choices(f'phase{phase}')) for phase in range(1, 6)}
+            self._indices = {phase: {choice_id: index for index, choice_id in enumerate(choice_ids)}
+                             for phase, choice_ids in ids.items()}
+            self._ids = ids
+            self._tables_version = self.content.version
+        return self._ids, self._indices
+
+    def _mac(self, payload: bytes, owner: Tuple[str, str]) -> bytes:
+        player = '\x00'.join(owner).encode('utf-8')
+        return hmac.new(self._key, struct.pack('>H', len(player)) + player + payload, hashlib.sha256).digest()[:MAC_SIZE]
+
+    def encode(self, game, owner: Tuple[str, str]) -> str:
+        """Jeton de la partie (current_path et état de démarrage) du joueur owner = (session_code, username)"""
+        _, indices = self._tables()
+        steps = path_steps(game.current_path)
+        started = game.current_state != GameState.LOGIN
+        parts = [struct.pack('>BIB', TOKEN_VERSION, self.content.fingerprint, FLAG_STARTED if started else 0)]
+        for phase, choices in enumerate(steps, start=1):
+            parts.append(struct.pack('>B', len(choices)))
+            parts.append(bytes(indices[phase][choice_id] for choice_id in choices))
+        payload = b''.join(parts)
+        return base64.urlsafe_b64encode(payload + self._mac(payload, owner)).rstrip(b'=').decode('ascii')
+
+    def decode(self, token: str, owner: Tuple[str, str]) -> PlayerState:
+        """Parcours porté par le jeton; InvalidGameToken si illisible, falsifié, périmé ou émis
+        pour un autre joueur"""
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        except (ValueError, TypeError):
+            raise InvalidGameToken('malformed')
+        if len(raw) < 6 + 5 + MAC_SIZE:
+            raise InvalidGameToken('malformed')
+        payload, mac = raw[:-MAC_SIZE], raw[-MAC_SIZE:]
+        if not hmac.compare_digest(mac, self._mac(payload, owner)):
+            raise InvalidGameToken('bad_signature')
+        version, fingerprint, flags = struct.unpack_from('>BIB', payload)
+        if version != TOKEN_VERSION:
+            raise InvalidGameToken('malformed')
+        if fingerprint != self.content.fingerprint:
+            raise InvalidGameToken('stale_content')
+
+        ids, _ = self._tables()
+        state = PlayerState(joined=bool(flags & FLAG_STARTED))
+        offset = 6
+        try:
+            for phase in range(1, 6):
+                count = payload[offset]
+                choices = [ids[phase][index] for index in payload[offset + 1:offset + 1 + count]]
+                offset += 1 + count
+                if choices:
+                    state.apply(EVENT_STEP + phase, choices, 0.0)
+        except IndexError:
+            raise InvalidGameToken('malformed')
+        return state
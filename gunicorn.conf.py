@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Configuration gunicorn (chargée automatiquement depuis le répertoire courant)
+Chaque worker garde en cache l'état des joueurs (journal d'événements, noms pris,
+sessions); sans SHARED_STATE=1 ces caches ne sont pas invalidés quand un autre worker
+écrit en base, et un joueur servi par deux workers verrait une progression périmée.
+Le démarrage avec plusieurs workers est donc refusé hors mode partagé.
+"""
+
+import os
+import sys
+
+
+def on_starting(server):
+    """Refuse plusieurs workers sans état partagé (voir shared_store.py)"""
+    if server.cfg.workers > 1 and os.environ.get('SHARED_STATE', '0') != '1':
+        server.log.error(f"{server.cfg.workers} workers demandés sans SHARED_STATE=1: "
+                         "lancer avec SHARED_STATE=1 ou un seul worker (-w 1)")
+        sys.exit(1)
+
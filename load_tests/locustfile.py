@@ -1,115 +1,292 @@
 """
-Locust load test for Kahoot-mode API
+Locust load test for Kahoot-mode events
 
-Usage:
-  1) Start your app locally on http://127.0.0.1:5001 and create a session code (e.g., RW5VHE)
-  2) Run:
-       locust -f load_tests/locustfile.py --host http://127.0.0.1:5001
-  3) Open http://localhost:8089 and set Users to 30, Spawn rate 5
+Models the real shape of a corporate event:
+  - an admin (facilitator) logs in and creates EVENT_SESSIONS sessions via /api/admin/create_session
+  - PLAYERS_PER_SESSION players per session join in a burst within JOIN_WINDOW seconds
+    (some pick a name already taken and retry after the 409, like real players)
+  - phases are played in lock-step: every PHASE_SECONDS the facilitator moves everybody to the
+    next step and all players answer within ANSWER_SPREAD seconds
+  - after step 5, players look at their dashboard and keep the leaderboard modal open (polling)
+  - the facilitator polls the leaderboard shown on the projector
+  - sessions start STAGGER seconds apart so several events overlap
 
-Env variables:
-  SESSION_CODE: 6-char session code to join (required for players)
+Usage (headless, SLO gated):
+  locust -f load_tests/locustfile.py --host http://127.0.0.1:5001 --headless --only-summary
+
+  The load shape below drives the user count and stops the run by itself. At exit, p50/p95/p99
+  per endpoint are written to RESULTS_FILE and checked against SLO_FILE; the process exits
+  with code 1 if a threshold is not met.
 
-Notes:
-  - This simulates the full flow: login -> steps 1..5 -> leaderboard
-  - Leaderboard only shows players who finished (expected)
+Env variables:
+  EVENT_SESSIONS=2          concurrent sessions
+  PLAYERS_PER_SESSION=30    players per session
+  JOIN_WINDOW=10            seconds for all players of a session to join
+  PHASE_SECONDS=45          time between two lock-step phase transitions
+  ANSWER_SPREAD=15          players answer within this many seconds after a phase opens
+  STAGGER=20                delay between the start of two sessions
+  LEADERBOARD_POLL=3        leaderboard modal polling interval (seconds)
+  LEADERBOARD_SECONDS=60    how long players keep the leaderboard open
+  DUPLICATE_NAME_RATE=0.1   share of players first trying an already taken name
+  ADMIN_USERNAME / ADMIN_PASSWORD
+  SLO_FILE=load_tests/slo.json
+  RESULTS_FILE=load_test_results.json
 """
 
-from locust import HttpUser, task, between
+from locust import HttpUser, LoadTestShape, constant, events, task
+import gevent
+from gevent.event import Event
+import json
+import logging
 import os
 import random
 import string
+import time
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+EVENT_SESSIONS = _env_int("EVENT_SESSIONS", 2)
+PLAYERS_PER_SESSION = _env_int("PLAYERS_PER_SESSION", 30)
+JOIN_WINDOW = _env_int("JOIN_WINDOW", 10)
+PHASE_SECONDS = _env_int("PHASE_SECONDS", 45)
+ANSWER_SPREAD = _env_int("ANSWER_SPREAD", 15)
+STAGGER = _env_int("STAGGER", 20)
+LEADERBOARD_POLL = _env_int("LEADERBOARD_POLL", 3)
+LEADERBOARD_SECONDS = _env_int("LEADERBOARD_SECONDS", 60)
+DUPLICATE_NAME_RATE = float(os.environ.get("DUPLICATE_NAME_RATE", 0.1))
+ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", "admin")
+ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "FDJ2024!Admin")
+SLO_FILE = os.environ.get("SLO_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "slo.json"))
+RESULTS_FILE = os.environ.get("RESULTS_FILE", "load_test_results.json")
+
+FIRST_NAMES = ["Alice", "Amira", "Camille", "David", "Elena", "Hugo", "Ines", "James", "Julie", "Karim",
+               "Lea", "Lucas", "Marie", "Nathan", "Paul", "Sarah", "Sophie", "Thomas", "Yanis", "Zoe"]
+
+# Valid choices from game_content.json (phase 3: one per category, phase 4: budget of 30 points)
+PHASE1_CHOICES = ["elena", "james", "amira"]
+PHASE2_CHOICES = ["fraud_integrity_detection", "ai_storyline_generator", "smart_game_design_assistant",
+                  "player_journey_optimizer", "talent_analytics_dashboard"]
+PHASE3_CHOICES = {
+    "technology": ["ai_data_platform_modernization", "automation_ai_models_deployment", "data_quality_tooling"],
+    "people": ["ai_leadership_program", "hands_on_ai_bootcamp", "business_ai_champions"],
+    "gover": ["responsible_ai_guidelines", "ai_governance_roadmap", "ai_governance_board"],
+}
+PHASE4_COSTS = {"adoption_playbook": 5, "ai_storytelling_communication": 5, "ai_product_teams_setup": 10,
+                "talent_mobility_program": 5, "industrialized_data_pipelines": 10, "api_platform": 5,
+                "privacy_by_design_data": 5, "role_responsibility_matrix": 5, "country_level_ai_deployment": 5}
+PHASE5_CHOICES = ["boost_self_service_ai", "build_to_scale", "empower_people_amplify_impact"]
+
+
+class EventCoordinator:
+    """Shared state between the facilitator and the players of this Locust process"""
+
+    def __init__(self):
+        self.sessions_ready = Event()
+        self.session_codes = []
+        self.phase_zero = {}      # session code -> time at which step 1 opens
+        self.taken_names = {}     # session code -> names already used (for deliberate 409s)
+        self._next_player = 0
+
+    def publish(self, codes):
+        now = time.time()
+        self.session_codes = list(codes)
+        for index, code in enumerate(self.session_codes):
+            self.phase_zero[code] = now + index * STAGGER + JOIN_WINDOW
+            self.taken_names[code] = []
+        self.sessions_ready.set()
+
+    def assign_session(self) -> str:
+        code = self.session_codes[self._next_player % len(self.session_codes)]
+        self._next_player += 1
+        return code
+
+    def join_delay(self, code: str) -> float:
+        """Players of a session join randomly within its join window"""
+        opens_at = self.phase_zero[code] - JOIN_WINDOW
+        return max(0.0, opens_at - time.time()) + random.uniform(0, JOIN_WINDOW)
+
+    def wait_for_phase(self, code: str, phase: int) -> None:
+        """Sleep until `phase` opens for this session, then a random answer time"""
+        opens_at = self.phase_zero[code] + (phase - 1) * PHASE_SECONDS
+        gevent.sleep(max(0.0, opens_at - time.time()) + random.uniform(0, ANSWER_SPREAD))
+
+
+coordinator = EventCoordinator()
+
 
+def _unique_suffix() -> str:
+    return "".join(random.choices(string.digits, k=4))
 
-SESSION_CODE = os.environ.get("SESSION_CODE", "").strip().upper()
 
+class FacilitatorUser(HttpUser):
+    """Admin running the event: creates sessions then shows the leaderboard on the projector"""
+    fixed_count = 1
+    wait_time = constant(5)
 
-def random_username(prefix: str = "p") -> str:
-    return prefix + "".join(random.choices(string.ascii_lowercase + string.digits, k=8))
+    def on_start(self):
+        self.client.post("/api/login", json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD},
+                         name="POST /api/login (admin)")
+        codes = []
+        for _ in range(EVENT_SESSIONS):
+            with self.client.post("/api/admin/create_session", name="POST /api/admin/create_session",
+                                  catch_response=True) as resp:
+                data = resp.json() if resp.status_code == 200 else {}
+                if not data.get("success"):
+                    resp.failure(f"create_session failed: {resp.status_code} {resp.text[:200]}")
+                    continue
+                codes.append(data["session_code"])
+        if not codes:
+            raise RuntimeError("No session could be created: check ADMIN_USERNAME/ADMIN_PASSWORD")
+        coordinator.publish(codes)
+
+    @task
+    def projector_leaderboard(self):
+        self.client.get("/api/leaderboard?limit=1000", name="GET /api/leaderboard (admin)")
 
 
 class PlayerUser(HttpUser):
-    wait_time = between(0.5, 2.0)
+    """A player joining one session and playing the five steps in lock-step"""
+    wait_time = constant(0)
 
     def on_start(self):
-        if not SESSION_CODE or len(SESSION_CODE) != 6:
-            raise RuntimeError("SESSION_CODE env var is required (6 chars), e.g. export SESSION_CODE=RW5VHE")
-
-        self.username = random_username()
-
-        # Player login (username only + session code) with explicit failure handling
-        with self.client.post(
-            "/api/login",
-            json={
-                "session_code": SESSION_CODE,
-                "username": self.username,
-                "password": ""  # player mode
-            },
-            name="login_player",
-            catch_response=True,
-        ) as resp:
-            try:
-                data = resp.json()
-            except Exception:
-                data = {"raw": resp.text}
-            if resp.status_code != 200 or not data.get("success"):
-                resp.failure(f"Login failed: {resp.status_code} {data}")
-                # Abort further actions for this user instance
-                return
-            else:
-                resp.success()
-
-    @task(5)
-    def play_full_path(self):
-        # Phase 1
-        self.client.get("/api/phase1/choices", name="get_phase1_choices")
-        self.client.post("/api/phase1/choose", json={"character_id": "james"}, name="post_phase1_choose")
-
-        # Phase 2
-        self.client.get("/api/phase2/choices", name="get_phase2_choices")
-        self.client.post(
-            "/api/phase2/choose",
-            json={
-                "solution_ids": [
-                    "fraud_integrity_detection",
-                    "smart_game_design_assistant",
-                    "player_journey_optimizer",
-                ]
-            },
-            name="post_phase2_choose",
-        )
-
-        # Phase 3
-        self.client.get("/api/phase3/choices", name="get_phase3_choices")
-        self.client.post(
-            "/api/phase3/choose",
-            json={
-                "choices": {
-                    "people": ["ai_collaboration_hub"],
-                    "technology": ["trusted_tech_partners"],
-                    "governance": ["ai_governance_roadmap"],
-                }
-            },
-            name="post_phase3_choose",
-        )
-
-        # Phase 4
-        self.client.get("/api/phase4/choices", name="get_phase4_choices")
-        self.client.post(
-            "/api/phase4/choose",
-            json={"enabler_ids": ["trusted_tech_partners", "ai_collaboration_hub"]},
-            name="post_phase4_choose",
-        )
-
-        # Phase 5 -> score
-        self.client.get("/api/phase5/choices", name="get_phase5_choices")
-        self.client.post(
-            "/api/phase5/choose",
-            json={"choice_id": "build_to_scale"},
-            name="post_phase5_choose",
-        )
-
-        # Leaderboard (session filtering is on backend)
-        self.client.get("/api/leaderboard?limit=1000", name="get_leaderboard")
+        self.finished = False
+        coordinator.sessions_ready.wait()
+        self.session_code = coordinator.assign_session()
+        gevent.sleep(coordinator.join_delay(self.session_code))
+        self.client.get(f"/?session={self.session_code}", name="GET /?session=")
+        self.client.post("/api/validate_session", json={"session_code": self.session_code},
+                         name="POST /api/validate_session")
+        self.joined = self._join()
+
+    def _join(self) -> bool:
+        taken = coordinator.taken_names[self.session_code]
+        if taken and random.random() < DUPLICATE_NAME_RATE:
+            candidates = [random.choice(taken), random.choice(FIRST_NAMES) + _unique_suffix()]
+        else:
+            candidates = [random.choice(FIRST_NAMES) + _unique_suffix()]
+        candidates.append(random.choice(FIRST_NAMES) + _unique_suffix() + "b")
+
+        for username in candidates:
+            with self.client.post("/api/login", json={"session_code": self.session_code, "username": username},
+                                  name="POST /api/login", catch_response=True) as resp:
+                if resp.status_code == 409:
+                    resp.success()  # name already taken: expected, the player picks another one
+                    continue
+                if resp.status_code != 200 or not resp.json().get("success"):
+                    resp.failure(f"Login failed: {resp.status_code} {resp.text[:200]}")
+                    return False
+                self.username = username
+                taken.append(username)
+                return True
+        return False
+
+    def _choose(self, phase: int, payload: dict) -> None:
+        coordinator.wait_for_phase(self.session_code, phase)
+        self.client.get(f"/api/phase{phase}/choices", name=f"GET /api/phase{phase}/choices")
+        with self.client.post(f"/api/phase{phase}/choose", json=payload, name=f"POST /api/phase{phase}/choose",
+                              catch_response=True) as resp:
+            if resp.status_code != 200 or not resp.json().get("success"):
+                resp.failure(f"phase{phase} rejected: {resp.status_code} {resp.text[:200]}")
+        self.client.get("/api/current_score", name="GET /api/current_score")
+
+    @task
+    def play_event(self):
+        if self.finished or not self.joined:
+            gevent.sleep(5)  # idle on the results screen until the end of the run
+            return
+
+        self._choose(1, {"character_id": random.choice(PHASE1_CHOICES)})
+        self._choose(2, {"solution_ids": random.sample(PHASE2_CHOICES, 3)})
+        self._choose(3, {"choices": {category: random.choice(ids) for category, ids in PHASE3_CHOICES.items()}})
+        enablers, budget = [], 30
+        for enabler_id in random.sample(list(PHASE4_COSTS), len(PHASE4_COSTS)):
+            if PHASE4_COSTS[enabler_id] <= budget and len(enablers) < 4:
+                enablers.append(enabler_id)
+                budget -= PHASE4_COSTS[enabler_id]
+        self._choose(4, {"enabler_ids": enablers})
+        self.client.get("/api/executive_dashboard", name="GET /api/executive_dashboard")
+        self._choose(5, {"choice_id": random.choice(PHASE5_CHOICES)})
+        self.client.get("/api/executive_dashboard", name="GET /api/executive_dashboard")
+
+        # Leaderboard modal left open at the end of the game
+        deadline = time.time() + LEADERBOARD_SECONDS
+        while time.time() < deadline:
+            self.client.get("/api/leaderboard?limit=1000", name="GET /api/leaderboard")
+            gevent.sleep(LEADERBOARD_POLL)
+        self.finished = True
+
+
+class EventShape(LoadTestShape):
+    """Burst joins per session, then hold until every session has finished"""
+
+    def tick(self):
+        run_time = self.get_run_time()
+        total_players = EVENT_SESSIONS * PLAYERS_PER_SESSION
+        event_duration = (EVENT_SESSIONS - 1) * STAGGER + JOIN_WINDOW + 5 * PHASE_SECONDS + ANSWER_SPREAD \
+            + LEADERBOARD_SECONDS + 15
+        if run_time > event_duration:
+            return None
+        # Spawning is fast; the join burst itself is paced by EventCoordinator.join_delay
+        return total_players + 1, max(1, total_players / max(1, JOIN_WINDOW)) * 2
+
+
+# ---------------------------------------------------------------- SLO gating
+
+def _endpoint_stats(entry) -> dict:
+    return {
+        "requests": entry.num_requests,
+        "failures": entry.num_failures,
+        "fail_ratio": round(entry.fail_ratio, 4),
+        "rps": round(entry.total_rps, 2),
+        "avg_ms": round(entry.avg_response_time, 1),
+        "p50_ms": entry.get_response_time_percentile(0.50),
+        "p95_ms": entry.get_response_time_percentile(0.95),
+        "p99_ms": entry.get_response_time_percentile(0.99),
+        "max_ms": entry.max_response_time,
+    }
+
+
+def _check(name: str, stats: dict, slo: dict) -> list:
+    violations = []
+    for metric in ("p50_ms", "p95_ms", "p99_ms"):
+        if metric in slo and stats["requests"] and stats[metric] > slo[metric]:
+            violations.append(f"{name}: {metric}={stats[metric]} > {slo[metric]}")
+    if "max_fail_ratio" in slo and stats["fail_ratio"] > slo["max_fail_ratio"]:
+        violations.append(f"{name}: fail_ratio={stats['fail_ratio']} > {slo['max_fail_ratio']}")
+    return violations
+
+
+@events.quitting.add_listener
+def export_and_gate(environment, **kwargs):
+    stats = environment.stats
+    endpoints = {f"{entry.name}": _endpoint_stats(entry) for entry in stats.entries.values()}
+    total = _endpoint_stats(stats.total)
+
+    slo = {}
+    if os.path.exists(SLO_FILE):
+        with open(SLO_FILE, "r", encoding="utf-8") as f:
+            slo = json.load(f)
+    default = slo.get("default", {})
+    violations = []
+    for name, endpoint in endpoints.items():
+        violations += _check(name, endpoint, {**default, **slo.get("endpoints", {}).get(name, {})})
+    violations += _check("total", total, slo.get("total", {}))
 
+    with open(RESULTS_FILE, "w", encoding="utf-8") as f:
+        json.dump({
+            "config": {"sessions": EVENT_SESSIONS, "players_per_session": PLAYERS_PER_SESSION,
+                       "join_window": JOIN_WINDOW, "phase_seconds": PHASE_SECONDS},
+            "endpoints": endpoints,
+            "total": total,
+            "slo_file": SLO_FILE if slo else None,
+            "violations": violations,
+        }, f, indent=2)
 
+    if violations:
+        logging.error("SLO check failed:\n  " + "\n  ".join(violations))
+        environment.process_exit_code = 1
+    else:
+        logging.info(f"SLO check passed ({len(endpoints)} endpoints), results in {RESULTS_FILE}")
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Test multi-process: plusieurs workers (process distincts, SHARED_STATE=1) sur une même base
+Reproduit un déploiement gunicorn -w N sans serveur: chaque worker importe web_interface et
+joue ses requêtes via WSGI. Vérifie qu'une rafale de connexions simultanées ne perd aucune
+mise à jour et que l'état d'un joueur suit ses requêtes d'un worker à l'autre:
+
+1. rafale: tous les workers (et plusieurs threads par worker) connectent leurs joueurs au même
+   instant; une partie des noms est tentée deux fois, depuis deux workers, avec une casse différente
+2. chaque joueur consulte /api/next_step sur son worker (état mis en cache), puis joue les
+   étapes 1 et 2 sur un autre worker (cookie de session transporté), puis reconsulte
+   /api/next_step sur son worker d'origine
+3. contrôles en base: player_count de chaque session, joueurs actifs (sans doublon),
+   événements de connexion, un seul succès par nom, aucun 5xx, next_step à jour partout
+
+Usage:
+    python load_tests/multiprocess_joins.py                         # 4 workers, 2 sessions x 60 joueurs
+    python load_tests/multiprocess_joins.py --workers 8 --players 200 --duplicates 0.3
+Code de sortie 1 si un contrôle échoue.
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+LOAD_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(LOAD_DIR)
+
+ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
+ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'FDJ2024!Admin')
+PHASE2_CHOICE = ['fraud_integrity_detection', 'ai_storyline_generator', 'smart_game_design_assistant']
+
+
+def load_app():
+    """web_interface.app (game_content.json est lu relativement au répertoire courant)"""
+    sys.path.insert(0, ROOT_DIR)
+    os.chdir(ROOT_DIR)
+    from web_interface import app
+    os.chdir(os.path.dirname(os.environ['DATABASE_PATH']))
+    return app
+
+
+def client_for(app, cookie: Optional[str] = None):
+    """Client WSGI portant le cookie de session donné (transporté d'un worker à l'autre)"""
+    client = app.test_client()
+    if cookie:
+        client.set_cookie('session', cookie)
+    return client
+
+
+def cookie_of(client) -> Optional[str]:
+    cookie = client.get_cookie('session')
+    return cookie.value if cookie else None
+
+
+def join(app, session_code: str, username: str) -> Tuple[int, Optional[str]]:
+    client = client_for(app)
+    client.post('/api/validate_session', json={'session_code': session_code})
+    response = client.post('/api/login', json={'session_code': session_code, 'username': username})
+    return response.status_code, cookie_of(client)
+
+
+def next_step(app, cookie: str) -> int:
+    response = client_for(app, cookie).get('/api/next_step')
+    return (response.get_json() or {}).get('next_step', -1)
+
+
+def play_steps(app, cookie: str) -> Tuple[List[int], str]:
+    client = client_for(app, cookie)
+    statuses = [client.post('/api/phase1/choose', json={'character_id': 'elena'}).status_code,
+                client.post('/api/phase2/choose', json={'solution_ids': PHASE2_CHOICE}).status_code]
+    return statuses, cookie_of(client)
+
+
+def worker(index: int, threads: int, barrier, tasks, results) -> None:
+    """Un worker: exécute les commandes du coordinateur avec un pool de threads"""
+    app = load_app()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        while True:
+            command, items = tasks.get()
+            if command == 'stop':
+                return
+            if command == 'join':
+                barrier.wait()  # rafale: tous les workers démarrent ensemble
+                output = list(pool.map(lambda item: (item, *join(app, *item)), items))
+            elif command == 'next':
+                output = list(pool.map(lambda item: (item[0], next_step(app, item[1])), items))
+            else:
+                output = list(pool.map(lambda item: (item[0], *play_steps(app, item[1])), items))
+            results.put((index, command, output))
+
+
+def create_sessions(app, count: int) -> List[str]:
+    admin = app.test_client()
+    if admin.post('/api/login', json={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD}).status_code != 200:
+        raise RuntimeError('Connexion admin impossible')
+    return [admin.post('/api/admin/create_session').get_json()['session_code'] for _ in range(count)]
+
+
+def check_database(db_path: str, expected: Dict[str, int]) -> List[str]:
+    """Contrôles en base: compteurs, joueurs actifs, événements de connexion"""
+    failures = []
+    conn = sqlite3.connect(db_path)
+    try:
+        for code, count in expected.items():
+            player_count = conn.execute('SELECT player_count FROM game_sessions WHERE session_code = ?',
+                                        (code,)).fetchone()[0]
+            names = [row[0] for row in conn.execute('SELECT username FROM active_players WHERE session_code = ?',
+                                                    (code,))]
+            joins = conn.execute('SELECT COUNT(*) FROM player_events WHERE session_code = ? AND kind = 1',
+                                 (code,)).fetchone()[0]
+            duplicates = [name for name, n in Counter(name.lower() for name in names).items() if n > 1]
+            print(f"  {code}: player_count={player_count} active_players={len(names)} "
+                  f"joins={joins} attendu={count}")
+            if player_count != count:
+                failures.append(f"{code}: player_count {player_count} != {count} (mises à jour perdues)")
+            if len(names) != count:
+                failures.append(f"{code}: {len(names)} joueurs actifs au lieu de {count}")
+            if joins != count:
+                failures.append(f"{code}: {joins} événements de connexion au lieu de {count}")
+            if duplicates:
+                failures.append(f"{code}: noms en double {duplicates[:5]}")
+    finally:
+        conn.close()
+    return failures
+
+
+def run(workers: int, threads: int, sessions: int, players: int, duplicates: float) -> int:
+    work_dir = tempfile.mkdtemp(prefix='aiquest_mp_')
+    os.environ['DATABASE_PATH'] = os.path.join(work_dir, 'shared.db')
+    os.environ['SHARED_STATE'] = '1'
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    os.environ.setdefault('MEMORY_LOG_INTERVAL', '0')
+    ctx = multiprocessing.get_context('spawn')  # process neufs, comme des workers gunicorn
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    queues = [ctx.Queue() for _ in range(workers)]
+    processes = [ctx.Process(target=worker, args=(i, threads, barrier, queues[i], results), daemon=True)
+                 for i in range(workers)]
+    try:
+        app = load_app()
+        codes = create_sessions(app, sessions)
+        for process in processes:
+            process.start()
+
+        def dispatch(command: str, per_worker: Dict[int, list]) -> Dict[int, list]:
+            for i in range(workers):
+                queues[i].put((command, per_worker.get(i, [])))
+            collected = {}
+            for _ in range(workers):
+                index, _, output = results.get(timeout=300)
+                collected[index] = output
+            return collected
+
+        # 1. Rafale de connexions; les doublons viennent d'un autre worker, casse différente
+        attempts: Dict[int, list] = defaultdict(list)
+        for s, code in enumerate(codes):
+            for p in range(players):
+                owner = (s * players + p) % workers
+                attempts[owner].append((code, f"Joueur{p}"))
+                if p < players * duplicates:
+                    attempts[(owner + 1) % workers].append((code, f"JOUEUR{p}"))
+        started = time.perf_counter()
+        joined = dispatch('join', attempts)
+        burst_time = time.perf_counter() - started
+
+        failures = []
+        statuses = Counter()
+        winners: Dict[Tuple[str, str], list] = defaultdict(list)
+        accepted: Dict[int, list] = defaultdict(list)
+        for index, output in joined.items():
+            for (code, username), status, cookie in output:
+                statuses[status] += 1
+                if status == 200:
+                    winners[(code, username.lower())].append(username)
+                    accepted[index].append(((code, username), cookie))
+                elif status != 409:
+                    failures.append(f"connexion {username}@{code}: HTTP {status}")
+        for (code, name), names in winners.items():
+            if len(names) > 1:
+                failures.append(f"{code}: nom {name} accepté {len(names)} fois")
+        missing = {(code, f"joueur{p}") for code in codes for p in range(players)} - set(winners)
+        failures.extend(f"{code}: aucun succès pour {name}" for code, name in sorted(missing)[:5])
+        total = sum(len(output) for output in accepted.values())
+        print(f"Rafale: {sum(statuses.values())} connexions en {burst_time:.2f} s sur {workers} workers "
+              f"x {threads} threads -> {dict(statuses)}")
+
+        # 2. État en cache sur le worker d'origine, étapes jouées sur un autre worker, relecture
+        before = dispatch('next', {i: [(key, cookie) for key, cookie in items] for i, items in accepted.items()})
+        failures.extend(f"next_step initial {key}: {step} au lieu de 2"
+                        for output in before.values() for key, step in output if step != 2)
+        played = dispatch('play', {(i + 1) % workers: items for i, items in accepted.items()})
+        cookies = {}
+        for output in played.values():
+            for key, step_statuses, cookie in output:
+                cookies[key] = cookie
+                if step_statuses != [200, 200]:
+                    failures.append(f"étapes {key}: HTTP {step_statuses}")
+        after = dispatch('next', {i: [(key, cookies[key]) for key, _ in items] for i, items in accepted.items()})
+        stale = [(key, step) for output in after.values() for key, step in output if step != 3]
+        failures.extend(f"next_step périmé {key}: {step} au lieu de 3" for key, step in stale[:10])
+        print(f"Inter-workers: {total} joueurs, {total - len(stale)} next_step à jour après changement de worker")
+
+        # 3. Base partagée
+        print("Base:")
+        failures.extend(check_database(os.environ['DATABASE_PATH'], {code: players for code in codes}))
+
+        for queue in queues:
+            queue.put(('stop', None))
+        for process in processes:
+            process.join(timeout=30)
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        os.chdir(ROOT_DIR)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print(f"\nÉCHEC: {len(failures)} anomalie(s)")
+        for failure in failures[:20]:
+            print(f"  - {failure}")
+        return 1
+    print("\nOK: aucune mise à jour perdue, état cohérent entre workers")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Test multi-process sur une base SQLite partagée')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4, help='threads par worker')
+    parser.add_argument('--sessions', type=int, default=2)
+    parser.add_argument('--players', type=int, default=60, help='joueurs par session')
+    parser.add_argument('--duplicates', type=float, default=0.25, help='part des noms tentés deux fois')
+    args = parser.parse_args(argv)
+    return run(args.workers, args.threads, args.sessions, args.players, args.duplicates)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
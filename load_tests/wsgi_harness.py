@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Harness de charge in-process: pilote web_interface.app directement via WSGI
+Pas de serveur, pas de réseau: chaque joueur simulé a son propre client Werkzeug
+(donc son propre cookie jar) et rejoue un parcours complet dans un pool de threads.
+Mesure débit et latence par endpoint; plusieurs tailles de pool peuvent être
+comparées dans le même process.
+
+Usage:
+    python load_tests/wsgi_harness.py                              # 60 joueurs, 2 sessions, 8 threads
+    python load_tests/wsgi_harness.py --players 200 --threads 1 4 16 --sessions 4
+    python load_tests/wsgi_harness.py --output wsgi_results.json --leaderboard-polls 5
+    python load_tests/wsgi_harness.py --storage memory                 # tiers web sans I/O disque UserManager
+"""
+
+import argparse
+import atexit
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+LOAD_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(LOAD_DIR)
+
+# Base et fichiers temporaires, logs réduits: on mesure l'application, pas l'environnement
+WORK_DIR = tempfile.mkdtemp(prefix='aiquest_wsgi_')
+# Supprimé après les écritures de fin de process (journal, heartbeats, parcours): atexit les
+# exécute dans l'ordre inverse, ceux de l'application sont enregistrés après celui-ci
+atexit.register(shutil.rmtree, WORK_DIR, ignore_errors=True)
+os.environ.setdefault('DATABASE_PATH', os.path.join(WORK_DIR, 'harness.db'))
+os.environ.setdefault('LOG_LEVEL', 'ERROR')  # les slow queries sous contention noieraient le rapport
+os.environ.setdefault('MEMORY_LOG_INTERVAL', '0')
+sys.path.insert(0, ROOT_DIR)
+
+ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
+ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'FDJ2024!Admin')
+FIRST_NAMES = ['Alice', 'Amira', 'Camille', 'David', 'Elena', 'Hugo', 'Ines', 'James', 'Julie', 'Karim',
+               'Lea', 'Lucas', 'Marie', 'Nathan', 'Paul', 'Sarah', 'Sophie', 'Thomas', 'Yanis', 'Zoe']
+
+# Choix valides de game_content.json
+PHASE1_CHOICES = ['elena', 'james', 'amira']
+PHASE2_CHOICES = ['fraud_integrity_detection', 'ai_storyline_generator', 'smart_game_design_assistant',
+                  'player_journey_optimizer', 'talent_analytics_dashboard']
+PHASE3_CHOICES = {
+    'technology': ['ai_data_platform_modernization', 'automation_ai_models_deployment', 'data_quality_tooling'],
+    'people': ['ai_leadership_program', 'hands_on_ai_bootcamp', 'business_ai_champions'],
+    'gover': ['responsible_ai_guidelines', 'ai_governance_roadmap', 'ai_governance_board'],
+}
+PHASE4_COSTS = {'adoption_playbook': 5, 'ai_storytelling_communication': 5, 'ai_product_teams_setup': 10,
+                'talent_mobility_program': 5, 'industrialized_data_pipelines': 10, 'api_platform': 5,
+                'privacy_by_design_data': 5, 'role_responsibility_matrix': 5, 'country_level_ai_deployment': 5}
+PHASE5_CHOICES = ['boost_self_service_ai', 'build_to_scale', 'empower_people_amplify_impact']
+
+
+class Recorder:
+    """Latences et erreurs par endpoint, partagées entre les threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.failures: Dict[str, int] = defaultdict(int)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def request(self, client, method: str, path: str, name: str = None, expected=(200,), **kwargs):
+        name = name or f"{method} {path.split('?')[0]}"
+        started = time.perf_counter()
+        response = client.open(path, method=method, **kwargs)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies[name].append(elapsed)
+            if response.status_code not in expected:
+                self.failures[name] += 1
+                body = response.get_json(silent=True) or {}
+                self.errors[f"{name} -> {response.status_code} {body.get('message', '')[:80]}"] += 1
+        return response
+
+    def summary(self, wall_time: float) -> Dict:
+        endpoints = {}
+        for name in sorted(self.latencies):
+            samples = sorted(self.latencies[name])
+
+            def pick(q: float) -> float:
+                return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 3)
+
+            endpoints[name] = {
+                'requests': len(samples),
+                'failures': self.failures[name],
+                'rps': round(len(samples) / wall_time, 1),
+                'mean_ms': round(sum(samples) / len(samples) * 1000, 3),
+                'p50_ms': pick(0.50),
+                'p95_ms': pick(0.95),
+                'p99_ms': pick(0.99),
+                'max_ms': round(samples[-1] * 1000, 3),
+            }
+        return endpoints
+
+
+def create_sessions(app, count: int) -> List[str]:
+    """Le facilitateur se connecte et crée les sessions de l'événement"""
+    admin = app.test_client()
+    response = admin.post('/api/login', json={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD})
+    if response.status_code != 200:
+        raise RuntimeError(f"Connexion admin impossible: {response.status_code}")
+    codes = []
+    for _ in range(count):
+        data = admin.post('/api/admin/create_session').get_json()
+        if not data or not data.get('success'):
+            raise RuntimeError(f"Création de session impossible: {data}")
+        codes.append(data['session_code'])
+    return codes
+
+
+def play(app, recorder: Recorder, session_code: str, player: int, seed: int, leaderboard_polls: int) -> None:
+    """Parcours complet d'un joueur, avec son propre cookie jar"""
+    rng = random.Random(seed * 100003 + player)
+    client = app.test_client()
+    recorder.request(client, 'POST', '/api/validate_session', json={'session_code': session_code})
+    username = f"{rng.choice(FIRST_NAMES)}{player}"
+    recorder.request(client, 'POST', '/api/login', json={'session_code': session_code, 'username': username})
+
+    enablers, budget = [], 30
+    for enabler_id in rng.sample(list(PHASE4_COSTS), len(PHASE4_COSTS)):
+        if PHASE4_COSTS[enabler_id] <= budget and len(enablers) < 4:
+            enablers.append(enabler_id)
+            budget -= PHASE4_COSTS[enabler_id]
+    payloads = [
+        {'character_id': rng.choice(PHASE1_CHOICES)},
+        {'solution_ids': rng.sample(PHASE2_CHOICES, 3)},
+        {'choices': {category: rng.choice(ids) for category, ids in PHASE3_CHOICES.items()}},
+        {'enabler_ids': enablers},
+        {'choice_id': rng.choice(PHASE5_CHOICES)},
+    ]
+    for phase, payload in enumerate(payloads, start=1):
+        recorder.request(client, 'GET', f'/api/phase{phase}/choices')
+        recorder.request(client, 'POST', f'/api/phase{phase}/choose', json=payload)
+        recorder.request(client, 'GET', '/api/current_score')
+
+    recorder.request(client, 'GET', '/api/executive_dashboard')
+    for _ in range(leaderboard_polls):
+        recorder.request(client, 'GET', '/api/leaderboard?limit=1000')
+
+
+def run(app, players: int, sessions: int, threads: int, seed: int, leaderboard_polls: int) -> Dict:
+    """Un run: `players` joueurs répartis sur `sessions` sessions, joués par un pool de `threads` threads"""
+    codes = create_sessions(app, sessions)
+    recorder = Recorder()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='player') as pool:
+        futures = [pool.submit(play, app, recorder, codes[i % len(codes)], i, seed, leaderboard_polls)
+                   for i in range(players)]
+        for future in futures:
+            future.result()
+    wall_time = time.perf_counter() - started
+
+    endpoints = recorder.summary(wall_time)
+    total_requests = sum(e['requests'] for e in endpoints.values())
+    return {
+        'threads': threads,
+        'players': players,
+        'sessions': sessions,
+        'wall_time_s': round(wall_time, 3),
+        'requests': total_requests,
+        'failures': sum(e['failures'] for e in endpoints.values()),
+        'rps': round(total_requests / wall_time, 1),
+        'players_per_s': round(players / wall_time, 2),
+        'endpoints': endpoints,
+        'errors': dict(sorted(recorder.errors.items(), key=lambda item: -item[1])),
+    }
+
+
+def print_run(result: Dict) -> None:
+    print(f"\n=== {result['threads']} thread(s): {result['players']} joueurs, {result['sessions']} sessions ===")
+    print(f"  {result['requests']} requêtes en {result['wall_time_s']} s -> {result['rps']} req/s, "
+          f"{result['players_per_s']} parcours/s, {result['failures']} échecs")
+    for name, endpoint in result['endpoints'].items():
+        print(f"  {name:<32} {endpoint['rps']:>8.1f} req/s   p50 {endpoint['p50_ms']:>8.2f} ms   "
+              f"p95 {endpoint['p95_ms']:>8.2f} ms   p99 {endpoint['p99_ms']:>8.2f} ms"
+              + (f"   échecs {endpoint['failures']}" if endpoint['failures'] else ''))
+    for error, count in list(result['errors'].items())[:5]:
+        print(f"  ! {count:>5} x {error}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Harness de charge WSGI in-process')
+    parser.add_argument('--players', type=int, default=60)
+    parser.add_argument('--sessions', type=int, default=2)
+    parser.add_argument('--threads', type=int, nargs='+', default=[8], help='tailles de pool à comparer')
+    parser.add_argument('--leaderboard-polls', type=int, default=3, help='ouvertures du leaderboard par joueur')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='fichier JSON de résultats')
+    parser.add_argument('--storage', help='STORAGE_BACKEND de UserManager (ex. memory, sqlite,active_players=memory)')
+    args = parser.parse_args(argv)
+    if args.storage:
+        os.environ['STORAGE_BACKEND'] = args.storage
+
+    try:
+        # game_content.json est lu relativement au répertoire courant: importer avant le chdir
+        os.chdir(ROOT_DIR)
+        from web_interface import app
+        os.chdir(WORK_DIR)
+
+        results = []
+        for threads in args.threads:
+            result = run(app, args.players, args.sessions, threads, args.seed, args.leaderboard_polls)
+            print_run(result)
+            results.append(result)
+    finally:
+        os.chdir(ROOT_DIR)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'seed': args.seed, 'storage': os.environ.get('STORAGE_BACKEND', 'sqlite'), 'runs': results},
+                      f, indent=2)
+        print(f"\nRésultats écrits dans {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Log Pipeline - Logging asynchrone, structuré et borné
+Les threads de requête ne font que déposer les records dans une queue bornée
+(QueueHandler); un thread dédié (QueueListener) les formate en JSON et les
+écrit sur stdout. Si la queue est pleine, les records sont abandonnés (et
+comptés) au lieu de bloquer la requête.
+
+Configuration (variables d'environnement):
+    LOG_LEVEL=INFO
+    LOG_FORMAT=json | text
+    LOG_QUEUE_SIZE=10000
+    LOG_RATE_LIMITS="user_manager=20/10,trace=200/1"   # N records / T secondes par ligne de code
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Contexte de la requête courante (request_id, session_code, username)
+_log_context: contextvars.ContextVar = contextvars.ContextVar('log_context', default={})
+
+CONTEXT_FIELDS = ('request_id', 'session_code', 'username')
+
+# Limites par défaut: les logs INFO par requête de user_manager sont les plus bavards
+DEFAULT_RATE_LIMITS = 'user_manager=20/10'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional['DroppingQueueHandler'] = None
+_configure_lock = threading.Lock()
+
+
+def bind_context(**fields) -> None:
+    """Associe des champs de contexte aux logs de la requête courante"""
+    _log_context.set({k: v for k, v in fields.items() if v is not None})
+
+
+def clear_context() -> None:
+    """Efface le contexte (fin de requête ou thread réutilisé)"""
+    _log_context.set({})
+
+
+class ContextFilter(logging.Filter):
+    """Copie le contexte de la requête sur le record (exécuté sur le thread appelant)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field))
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Limite le débit des records INFO/DEBUG par ligne de code, par préfixe de logger
+
+    Au-delà de `max_records` par fenêtre de `interval` secondes, les records sont
+    supprimés; le premier record de la fenêtre suivante porte le nombre supprimé.
+    WARNING et au-dessus ne sont jamais limités.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[int, float]]):
+        super().__init__()
+        # Préfixes les plus longs d'abord pour que "trace.leaderboard" l'emporte sur "trace"
+        self.limits = sorted(limits.items(), key=lambda item: -len(item[0]))
+        self._windows: Dict[Tuple[str, str, int], list] = {}
+        # Les handlers sont appelés depuis tous les threads de requête
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse(spec: str) -> Dict[str, Tuple[int, float]]:
+        """"user_manager=20/10,trace=200/1" -> {'user_manager': (20, 10.0), ...}"""
+        limits = {}
+        for item in (spec or '').split(','):
+            if '=' not in item:
+                continue
+            name, _, rate = item.partition('=')
+            count, _, interval = rate.partition('/')
+            try:
+                limits[name.strip()] = (int(count), float(interval or 1))
+            except ValueError:
+                continue
+        return limits
+
+    def _limit_for(self, logger_name: str) -> Optional[Tuple[int, float]]:
+        for prefix, limit in self.limits:
+            if logger_name == prefix or logger_name.startswith(prefix + '.'):
+                return limit
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        limit = self._limit_for(record.name)
+        if limit is None:
+            return True
+
+        max_records, interval = limit
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < max_records:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+_exception_formatter = logging.Formatter()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler qui abandonne les records quand la queue est pleine"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported_drops = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Comme QueueHandler.prepare, mais la trace de l'exception reste à part (record.exception)
+        au lieu d'être collée au message"""
+        exception = None
+        if record.exc_info:
+            exception = _exception_formatter.formatException(record.exc_info)
+        elif record.exc_text:
+            exception = record.exc_text
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        record.exception = exception
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported_drops += 1
+            return
+
+        if self._unreported_drops:
+            drops, self._unreported_drops = self._unreported_drops, 0
+            notice = logging.LogRecord('log_pipeline', logging.WARNING, __file__, 0,
+                                       'Log queue full: %d records dropped', (drops,), None)
+            try:
+                self.queue.put_nowait(self.prepare(notice))
+            except queue.Full:
+                self._unreported_drops += drops
+
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if getattr(record, 'suppressed', None):
+            entry['suppressed'] = record.suppressed
+        exception = getattr(record, 'exception', None) or record.exc_text
+        if exception:
+            entry['exc'] = exception
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Format texte lisible, avec le contexte de la requête s'il existe"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        context = ' '.join(f"{field}={getattr(record, field)}" for field in CONTEXT_FIELDS
+                           if getattr(record, field, None) is not None)
+        if getattr(record, 'suppressed', None):
+            context += f" suppressed={record.suppressed}"
+        if context.strip():
+            line = f"{line} [{context.strip()}]"
+        if getattr(record, 'exception', None):
+            line = f"{line}\n{record.exception}"
+        return line
+
+
+def configure_logging() -> None:
+    """Installe le pipeline de logs sur le root logger (idempotent)"""
+    global _listener, _queue_handler
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        level = getattr(logging, os.environ.get('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+        log_queue: queue.Queue = queue.Queue(maxsize=int(os.environ.get('LOG_QUEUE_SIZE', 10000)))
+
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(TextFormatter() if os.environ.get('LOG_FORMAT', 'json') == 'text' else JsonFormatter())
+
+        _queue_handler = DroppingQueueHandler(log_queue)
+        _queue_handler.addFilter(ContextFilter())
+        _queue_handler.addFilter(RateLimitFilter(RateLimitFilter.parse(
+            os.environ.get('LOG_RATE_LIMITS', DEFAULT_RATE_LIMITS))))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Vide la queue et arrête le thread d'écriture"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def pipeline_stats() -> Dict[str, int]:
+    """Taille de la queue et nombre de records abandonnés"""
+    if _queue_handler is None:
+        return {'queued': 0, 'dropped': 0}
+    return {'queued': _queue_handler.queue.qsize(), 'dropped': _queue_handler.dropped}
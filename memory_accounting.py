@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Memory Accounting - Mémoire par session, par état de joueur et par cache
+Deux sources complémentaires:
+    - estimations rapides: taille profonde (sys.getsizeof récursif) des objets
+      exposés par des "providers" enregistrés (états de jeu, caches, contenu)
+    - tracemalloc à la demande: top des sites d'allocation
+Un rapport résumé peut être loggé périodiquement (MEMORY_LOG_INTERVAL secondes, tâche
+du planificateur de maintenance, voir scheduler.py).
+"""
+
+import gc
+import logging
+import os
+import sys
+import threading
+import tracemalloc
+import types
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Objets partagés par tout le process: on ne les compte pas dans les états
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+               types.MethodType, types.CodeType, types.FrameType, threading.Thread)
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None, max_depth: int = 32) -> int:
+    """Taille approximative d'un objet et de tout ce qu'il référence (chaque objet compté une fois)"""
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [(obj, 0)]
+    while stack:
+        current, depth = stack.pop()
+        if id(current) in seen or isinstance(current, _SKIP_TYPES):
+            continue
+        seen.add(id(current))
+        try:
+            size += sys.getsizeof(current)
+        except TypeError:
+            continue
+        if depth >= max_depth or isinstance(current, (str, bytes, bytearray, int, float, bool)):
+            continue
+
+        depth += 1
+        if isinstance(current, dict):
+            for key, value in current.items():
+                stack.append((key, depth))
+                stack.append((value, depth))
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend((item, depth) for item in current)
+        else:
+            attributes = getattr(current, '__dict__', None)
+            if attributes is not None:
+                stack.append((attributes, depth))
+            for slot in getattr(type(current), '__slots__', ()):
+                if hasattr(current, slot):
+                    stack.append((getattr(current, slot), depth))
+    return size
+
+
+def process_rss() -> Optional[int]:
+    """Mémoire résidente du process en octets (Linux), None si indisponible"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class MemoryAccountant:
+    """Registre de providers et rapports mémoire"""
+
+    def __init__(self, nframes: int = 10):
+        self.nframes = nframes
+        # nom -> callable retournant un objet, ou {label: objet} (ex: un état par session)
+        self.providers: Dict[str, Callable[[], Any]] = {}
+        # Providers partagés (contenu, caches): exclus de la taille des autres objets
+        self.shared: set = set()
+
+    def register(self, name: str, provider: Callable[[], Any], shared: bool = False) -> None:
+        """Enregistre un provider (remplace un provider existant du même nom)
+
+        Les objets d'un provider `shared` ne sont pas recomptés dans les autres
+        (ex: le contenu référencé par chaque état de jeu).
+        """
+        self.providers[name] = provider
+        if shared:
+            self.shared.add(name)
+        else:
+            self.shared.discard(name)
+
+    def estimate(self) -> Dict[str, Dict]:
+        """Taille estimée de chaque objet exposé, par provider et par label"""
+        report: Dict[str, Dict] = {}
+        shared_seen: set = set()
+        # Providers partagés d'abord, pour connaître les objets à exclure des autres
+        ordered = sorted(self.providers.items(), key=lambda item: item[0] not in self.shared)
+        for name, provider in ordered:
+            try:
+                value = provider()
+            except Exception as e:
+                logger.error(f"Erreur du provider mémoire {name}: {e}")
+                continue
+            items = value if isinstance(value, dict) else {name: value}
+            if name in self.shared:
+                sizes = {str(label): deep_sizeof(obj, shared_seen) for label, obj in items.items()}
+            else:
+                sizes = {str(label): deep_sizeof(obj, set(shared_seen)) for label, obj in items.items()}
+            report[name] = {
+                'count': len(sizes),
+                'total_bytes': sum(sizes.values()),
+                'items': dict(sorted(sizes.items(), key=lambda item: -item[1])[:50])
+            }
+        return report
+
+    def start_tracing(self) -> bool:
+        """Démarre tracemalloc (seules les allocations suivantes sont tracées)"""
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(self.nframes)
+        logger.info(f"tracemalloc démarré ({self.nframes} frames)")
+        return True
+
+    def stop_tracing(self) -> None:
+        """Arrête tracemalloc et libère ses structures"""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("tracemalloc arrêté")
+
+    def top_allocations(self, limit: int = 20, group_by: str = 'lineno') -> List[Dict]:
+        """Top des sites d'allocation encore vivants (tracemalloc doit être actif)"""
+        if not tracemalloc.is_tracing():
+            return []
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        if group_by not in ('lineno', 'filename', 'traceback'):
+            group_by = 'lineno'
+        return [{
+            'site': ' <- '.join(str(frame) for frame in stat.traceback) if group_by == 'traceback' else str(stat.traceback[0]),
+            'size_bytes': stat.size,
+            'count': stat.count
+        } for stat in snapshot.statistics(group_by)[:limit]]
+
+    def report(self, top: int = 0) -> Dict:
+        """Rapport complet: RSS, estimations par provider et (optionnel) top allocations"""
+        report = {
+            'rss_bytes': process_rss(),
+            'tracemalloc': tracemalloc.is_tracing(),
+            'estimates': self.estimate()
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            report['traced_bytes'] = current
+            report['traced_peak_bytes'] = peak
+            if top:
+                report['top_allocations'] = self.top_allocations(top)
+        return report
+
+    def log_summary(self) -> None:
+        """Logge une ligne de résumé (RSS + total par provider)"""
+        estimates = self.estimate()
+        parts = ', '.join(f"{name}={data['total_bytes'] // 1024}KB/{data['count']}"
+                          for name, data in estimates.items())
+        rss = process_rss()
+        logger.info(f"Mémoire: rss={rss // (1024 * 1024) if rss else '?'}MB, {parts}")
+
+
+# Instance globale
+memory_accountant = MemoryAccountant(nframes=int(os.environ.get('TRACEMALLOC_FRAMES', 10)))
+if os.environ.get('TRACEMALLOC') == '1':
+    memory_accountant.start_tracing()
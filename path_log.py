@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Journal des parcours terminés (append-only, NDJSON)
+Chaque partie terminée ajoute une ligne JSON (le parcours + completed_at) à un tampon
+mémoire, écrit sur disque par lots: tâche du planificateur (voir scheduler.py), tampon
+plein ou arrêt du process. La fin de partie ne fait donc ni relecture ni réécriture de
+l'historique: son coût ne dépend pas du nombre de parties précédentes.
+
+Rotation par taille: au-delà de COMPLETED_PATHS_MAX_BYTES, le fichier devient
+<fichier>.1 (les anciens sont décalés, COMPLETED_PATHS_BACKUPS conservés).
+iter_paths() relit l'historique, du plus ancien au plus récent.
+
+Configuration (variables d'environnement):
+    COMPLETED_PATHS_LOG=...              # défaut: completed_paths.ndjson à côté de la base
+    COMPLETED_PATHS_FLUSH_INTERVAL=1     # écriture du tampon (s)
+    COMPLETED_PATHS_MAX_BYTES=10485760   # taille avant rotation (0: pas de rotation)
+    COMPLETED_PATHS_BACKUPS=5            # fichiers tournés conservés
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List
+
+try:
+    import fcntl
+except ImportError:  # Windows: pas de verrou entre process
+    fcntl = None
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+paths_written = metrics.counter('completed_paths_written_total', 'Parcours terminés écrits dans le journal')
+
+
+class CompletedPathLog:
+    """Journal NDJSON des parcours terminés: ajouts en mémoire, écritures par lots, rotation"""
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 5,
+                 flush_interval: float = 1.0, max_buffer: int = 1000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._buffer: List[str] = []
+        self.appended = 0
+        self.written = 0
+        self.rotations = 0
+
+    def append(self, path: Dict) -> None:
+        """Ajoute un parcours (dict sérialisable); écrit sur disque plus tard"""
+        record = dict(path, completed_at=datetime.now().isoformat())
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._buffer.append(line)
+            self.appended += 1
+            backlog = len(self._buffer)
+        if backlog >= self.max_buffer:
+            # Tampon plein: coût borné par la taille du tampon, pas par l'historique
+            self.flush()
+
+    def flush(self) -> int:
+        """Écrit le tampon à la fin du fichier (rotation si besoin); retourne le nombre de lignes"""
+        with self._write_lock:
+            with self._lock:
+                lines, self._buffer = self._buffer, []
+            if not lines:
+                return 0
+            data = ('\n'.join(lines) + '\n').encode('utf-8')
+            try:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, exist_ok=True)
+                with open(f"{self.path}.lock", 'a') as lock_file:
+                    # Plusieurs workers écrivent le même fichier: rotation et ajout sous verrou
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    if self.max_bytes and os.path.exists(self.path) and \
+                            os.path.getsize(self.path) + len(data) > self.max_bytes:
+                        self._rotate()
+                    with open(self.path, 'ab') as f:
+                        f.write(data)
+            except OSError as e:
+                logger.error(f"Erreur d'écriture du journal des parcours {self.path}: {e}")
+                with self._lock:
+                    self._buffer[:0] = lines
+                return 0
+            self.written += len(lines)
+            paths_written.inc(amount=len(lines))
+            return len(lines)
+
+    def _rotate(self) -> None:
+        if self.backups <= 0:
+            os.remove(self.path)
+        else:
+            for index in range(self.backups - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self.rotations += 1
+        logger.info(f"Rotation du journal des parcours: {self.path}")
+
+    def files(self) -> List[str]:
+        """Fichiers du journal, du plus ancien au plus récent"""
+        rotated = [f"{self.path}.{index}" for index in range(self.backups, 0, -1)]
+        return [path for path in rotated + [self.path] if os.path.exists(path)]
+
+    def iter_paths(self) -> Iterator[Dict]:
+        """Parcours enregistrés, du plus ancien au plus récent (tampon écrit d'abord)"""
+        self.flush()
+        for path in self.files():
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # Ligne tronquée (arrêt brutal pendant une écriture): ignorée
+                        logger.warning(f"Ligne illisible dans {path}")
+
+    def stats(self) -> Dict:
+        return {
+            'path': self.path,
+            'appended': self.appended,
+            'written': self.written,
+            'buffered': len(self._buffer),
+            'rotations': self.rotations,
+            'files': self.files(),
+        }
+
+
+def _default_log_path() -> str:
+    database_path = os.environ.get('DATABASE_PATH', 'users.db')
+    return os.path.join(os.path.dirname(os.path.abspath(database_path)), 'completed_paths.ndjson')
+
+
+# Instance globale (à côté de la base, pas du répertoire courant)
+completed_path_log = CompletedPathLog(os.environ.get('COMPLETED_PATHS_LOG') or _default_log_path(),
+                                      max_bytes=int(os.environ.get('COMPLETED_PATHS_MAX_BYTES', 10 * 1024 * 1024)),
+                                      backups=int(os.environ.get('COMPLETED_PATHS_BACKUPS', 5)),
+                                      flush_interval=float(os.environ.get('COMPLETED_PATHS_FLUSH_INTERVAL', 1)))
+atexit.register(completed_path_log.flush)
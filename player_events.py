@@ -0,0 +1,606 @@
+#!/usr/bin/env python3
+"""
+Journal d'événements des joueurs (append-only)
+Chaque action d'un joueur Kahoot (connexion, choix de chaque étape, fin de
+partie, retrait pour inactivité) est ajoutée à la table player_events: type entier, choix encodés en
+entiers (table choice_codes), insertions groupées par un thread d'écriture.
+L'état courant d'un joueur est obtenu en rejouant (fold) ses événements, puis
+gardé en cache et mis à jour à chaque ajout: pas de lecture SQL sur le chemin
+chaud.
+
+Snapshots: les états des joueurs en cours sont écrits périodiquement sur disque
+(format binaire compact, un bloc par session; tâche du planificateur, voir scheduler.py). Au redémarrage, seul l'index est
+lu; une session est restaurée à son premier accès (son bloc + les événements
+postérieurs au snapshot), le coût suit donc les sessions actives, pas l'historique.
+
+Mode multi-process (SHARED_STATE=1, voir shared_store.py): les événements sont écrits
+avant la réponse (write-through) avec la version de leur session; un process qui voit
+la version d'une session changer oublie les états qu'il en gardait en cache.
+
+Configuration (variables d'environnement):
+    EVENT_FLUSH_INTERVAL=0.2   # délai max avant écriture d'un événement (s)
+    EVENT_BATCH_SIZE=200       # écriture anticipée au-delà de N événements en attente
+    EVENT_STATE_CACHE=20000    # états de joueurs gardés en mémoire (LRU)
+    SNAPSHOT_INTERVAL=30       # snapshot des joueurs en cours toutes les N secondes (0: désactivé)
+    SNAPSHOT_PATH=...          # défaut: player_states.snap à côté de la base
+"""
+
+import atexit
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from shared_store import shared_store
+from sql_profiler import sql_profiler
+from user_manager import user_manager
+
+logger = logging.getLogger(__name__)
+
+# Types d'événements: l'étape N est EVENT_STEP + N
+EVENT_JOIN = 1
+EVENT_LEFT = 2
+EVENT_STEP = 10
+EVENT_COMPLETED = 20
+
+# Ordre fixe des catégories de l'étape 3 (le payload est positionnel)
+MOT3_CATEGORIES = ('technology', 'people', 'gover')
+
+# Snapshot: MAGIC, longueur de l'en-tête JSON (index des sessions), en-tête, blocs par session
+SNAPSHOT_MAGIC = b'AQSNAP2\n'
+
+PlayerKey = Tuple[str, str]
+
+
+@dataclass
+class Event:
+    """Événement décodé"""
+    id: int
+    session_code: str
+    username: str
+    kind: int
+    choices: List[str]
+    created_at: float
+
+
+@dataclass
+class PlayerState:
+    """État d'un joueur obtenu en rejouant ses événements"""
+    joined: bool = False
+    current_step: int = 0
+    completed: bool = False
+    mot1_choice: str = ""
+    mot2_choices: List[str] = field(default_factory=list)
+    mot3_choices: Dict[str, str] = field(default_factory=dict)
+    mot4_choices: List[str] = field(default_factory=list)
+    mot5_choice: str = ""
+    updated_at: float = 0.0
+    # Heure de la connexion: distingue deux joueurs successifs du même nom
+    joined_at: float = 0.0
+
+    def apply(self, kind: int, choices: Sequence[str], created_at: float) -> None:
+        """Applique un événement (chaque événement remplace les champs qu'il porte)"""
+        if kind == EVENT_JOIN:
+            self.__init__()
+            self.joined = True
+            self.current_step = 1
+            self.joined_at = created_at
+        elif kind == EVENT_LEFT:
+            # Retiré par le nettoyage des inactifs: sa partie est oubliée
+            self.__init__()
+        elif kind == EVENT_COMPLETED:
+            self.completed = True
+            self.current_step = 5
+        elif EVENT_STEP < kind <= EVENT_STEP + 5:
+            step = kind - EVENT_STEP
+            if step == 1:
+                self.mot1_choice = choices[0] if choices else ""
+            elif step == 2:
+                self.mot2_choices = list(choices)
+            elif step == 3:
+                self.mot3_choices = dict(zip(MOT3_CATEGORIES, choices))
+            elif step == 4:
+                self.mot4_choices = list(choices)
+            else:
+                self.mot5_choice = choices[0] if choices else ""
+            self.current_step = step
+        self.updated_at = created_at
+
+    def step_choices(self) -> List[Tuple[int, List[str]]]:
+        """Choix par étape, dans le format des événements"""
+        return [
+            (1, [self.mot1_choice] if self.mot1_choice else []),
+            (2, self.mot2_choices),
+            (3, [self.mot3_choices.get(category, '') for category in MOT3_CATEGORIES] if self.mot3_choices else []),
+            (4, self.mot4_choices),
+            (5, [self.mot5_choice] if self.mot5_choice else []),
+        ]
+
+    def next_step(self) -> Dict:
+        """Prochain step autorisé: 1 avant la connexion, 6 une fois la partie terminée"""
+        if not self.joined:
+            return {'next_step': 1, 'completed': False}
+        if self.completed:
+            return {'next_step': 6, 'completed': True}
+        return {'next_step': max(2, min(6, self.current_step + 1)), 'completed': False}
+
+
+class PlayerEventLog:
+    """Journal append-only des actions joueurs, avec états dérivés en cache"""
+
+    def __init__(self, db_path: str, flush_interval: float = 0.2, batch_size: int = 200,
+                 state_cache_size: int = 20000, snapshot_path: Optional[str] = None,
+                 snapshot_interval: float = 30.0):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.state_cache_size = state_cache_size
+        self.snapshot_path = snapshot_path or os.path.join(os.path.dirname(os.path.abspath(db_path)),
+                                                           'player_states.snap')
+        self.snapshot_interval = snapshot_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: List[Tuple] = []
+        self._states: 'OrderedDict[PlayerKey, PlayerState]' = OrderedDict()
+        self._session_players: Dict[str, set] = {}
+        self._codes: Dict[Tuple[int, str], int] = {}
+        self._choices: Dict[int, str] = {}
+        self._wakeup = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self.appended = 0
+        self.written = 0
+        self.batches = 0
+        # Snapshot courant: index des sessions, restaurées à la demande
+        self._snapshot_lock = threading.Lock()
+        self._restore_lock = threading.Lock()
+        self._snapshot_index: Dict[str, List[int]] = {}
+        self._snapshot_event_id = 0
+        self._snapshot_data_start = 0
+        self._restored_sessions = set()
+        self._appended_at_snapshot = 0
+        self.snapshot_info: Dict = {}
+        self.restore_info = {'sessions': 0, 'players': 0, 'replayed_events': 0, 'time_ms': 0.0}
+        self.init_database()
+        self._read_snapshot_index()
+        shared_store.on_change('events:', self._invalidate_session)
+
+    def _connect(self):
+        return shared_store.configure(sql_profiler.connect(self.db_path, timeout=shared_store.busy_timeout))
+
+    def init_database(self) -> None:
+        """Crée les tables du journal et charge le dictionnaire des choix"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS player_events (
+                        id INTEGER PRIMARY KEY,
+                        session_code TEXT NOT NULL,
+                        username TEXT NOT NULL,
+                        kind INTEGER NOT NULL,
+                        payload BLOB,
+                        created_at REAL NOT NULL
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_events_player ON player_events(session_code, username, id)
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS choice_codes (
+                        code INTEGER PRIMARY KEY,
+                        phase INTEGER NOT NULL,
+                        choice_id TEXT NOT NULL,
+                        UNIQUE(phase, choice_id)
+                    )
+                ''')
+                conn.commit()
+                cursor.execute('SELECT code, phase, choice_id FROM choice_codes')
+                for code, phase, choice_id in cursor.fetchall():
+                    self._codes[(phase, choice_id)] = code
+                    self._choices[code] = choice_id
+        except Exception as e:
+            logger.error(f"Erreur lors de l'initialisation du journal d'événements: {e}")
+            raise
+
+    # ------------------------------------------------------------ encodage
+
+    def _code(self, phase: int, choice_id: str) -> int:
+        """Code entier d'un choix (créé à la première utilisation)"""
+        code = self._codes.get((phase, choice_id))
+        if code is not None:
+            return code
+        with self._lock:
+            code = self._codes.get((phase, choice_id))
+            if code is None:
+                with self._connect() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('INSERT OR IGNORE INTO choice_codes (phase, choice_id) VALUES (?, ?)',
+                                   (phase, choice_id))
+                    conn.commit()
+                    cursor.execute('SELECT code FROM choice_codes WHERE phase = ? AND choice_id = ?',
+                                   (phase, choice_id))
+                    code = cursor.fetchone()[0]
+                self._codes[(phase, choice_id)] = code
+                self._choices[code] = choice_id
+        return code
+
+    def encode(self, phase: int, choices: Sequence[str]) -> bytes:
+        codes = [self._code(phase, choice_id) for choice_id in choices]
+        return struct.pack(f'<{len(codes)}H', *codes)
+
+    def decode(self, payload: Optional[bytes]) -> List[str]:
+        if not payload:
+            return []
+        codes = struct.unpack(f'<{len(payload) // 2}H', payload)
+        return [self._choices.get(code, f'#{code}') for code in codes]
+
+    # --------------------------------------------------------------- écriture
+
+    def append(self, session_code: str, username: str, kind: int, choices: Sequence[str] = ()) -> None:
+        """Ajoute un événement (écrit en base par lot, état en cache mis à jour tout de suite)"""
+        session_code = session_code.upper().strip()
+        phase = kind - EVENT_STEP if EVENT_STEP < kind <= EVENT_STEP + 5 else 0
+        if phase == 3 and isinstance(choices, dict):
+            choices = [choices.get(category, '') for category in MOT3_CATEGORIES]
+        choices = list(choices or ())
+        payload = self.encode(phase, choices) if choices else None
+        now = time.time()
+        key = (session_code, username)
+
+        state = self._cached_state(key) if kind != EVENT_JOIN else PlayerState()
+        with self._lock:
+            self._pending.append((session_code, username, kind, payload, now))
+            self.appended += 1
+            state.apply(kind, choices, now)
+            self._remember(key, state)
+            backlog = len(self._pending)
+        self._ensure_writer()
+        if shared_store.enabled:
+            # Les autres workers doivent voir l'événement dès la requête suivante du joueur
+            self.flush()
+        elif backlog >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run_writer, name='player-events', daemon=True)
+                self._writer.start()
+
+    def _run_writer(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Erreur d'écriture du journal d'événements: {e}")
+
+    def flush(self) -> int:
+        """Écrit les événements en attente en une transaction; retourne le nombre écrit"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                with self._connect() as conn:
+                    conn.executemany('''
+                        INSERT INTO player_events (session_code, username, kind, payload, created_at)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', batch)
+                    for session_code in {row[0] for row in batch}:
+                        shared_store.bump(conn, f'events:{session_code}')
+                    conn.commit()
+            except Exception:
+                # Remettre le lot en tête pour le prochain essai
+                with self._lock:
+                    self._pending[:0] = batch
+                raise
+            self.written += len(batch)
+            self.batches += 1
+            return len(batch)
+
+    # ---------------------------------------------------------------- lecture
+
+    def _remember(self, key: PlayerKey, state: PlayerState) -> None:
+        self._states[key] = state
+        self._states.move_to_end(key)
+        self._session_players.setdefault(key[0], set()).add(key[1])
+        while len(self._states) > self.state_cache_size:
+            (session_code, username), _ = self._states.popitem(last=False)
+            players = self._session_players.get(session_code)
+            if players is not None:
+                players.discard(username)
+                if not players:
+                    del self._session_players[session_code]
+
+    def _invalidate_session(self, name: str) -> None:
+        """Un autre process a écrit dans la session: ses états en cache sont périmés"""
+        session_code = name.split(':', 1)[1]
+        with self._lock:
+            for username in self._session_players.pop(session_code, ()):
+                self._states.pop((session_code, username), None)
+
+    def _cached_state(self, key: PlayerKey) -> PlayerState:
+        shared_store.refresh()
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+                return state
+        if key[0] in self._snapshot_index and key[0] not in self._restored_sessions:
+            self._restore_session(key[0])
+            with self._lock:
+                state = self._states.get(key)
+                if state is not None:
+                    return state
+        state = self._fold(key)
+        with self._lock:
+            # Un append concurrent a pu remplir le cache entre-temps: il fait foi
+            current = self._states.get(key)
+            if current is not None:
+                return current
+            self._remember(key, state)
+        return state
+
+    def _fold(self, key: PlayerKey) -> PlayerState:
+        """Reconstruit l'état d'un joueur depuis la base et les événements en attente"""
+        state = PlayerState()
+        with self._flush_lock:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT kind, payload, created_at FROM player_events
+                    WHERE session_code = ? AND username = ?
+                    ORDER BY id
+                ''', key)
+                rows = cursor.fetchall()
+            with self._lock:
+                rows += [(kind, payload, created_at) for code, name, kind, payload, created_at in self._pending
+                         if (code, name) == key]
+        for kind, payload, created_at in rows:
+            state.apply(kind, self.decode(payload), created_at)
+        return state
+
+    def state(self, session_code: str, username: str) -> PlayerState:
+        """État courant d'un joueur (cache, sinon fold de ses événements)"""
+        return self._cached_state((session_code.upper().strip(), username))
+
+    def events(self, session_code: Optional[str] = None, after_id: int = 0,
+               batch: int = 1000) -> Iterator[Event]:
+        """Parcourt le journal (rejeu, analyses), par lots, après écriture des événements en attente"""
+        self.flush()
+        while True:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                if session_code:
+                    cursor.execute('''
+                        SELECT id, session_code, username, kind, payload, created_at FROM player_events
+                        WHERE session_code = ? AND id > ? ORDER BY id LIMIT ?
+                    ''', (session_code.upper().strip(), after_id, batch))
+                else:
+                    cursor.execute('''
+                        SELECT id, session_code, username, kind, payload, created_at FROM player_events
+                        WHERE id > ? ORDER BY id LIMIT ?
+                    ''', (after_id, batch))
+                rows = cursor.fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield Event(row[0], row[1], row[2], row[3], self.decode(row[4]), row[5])
+            after_id = rows[-1][0]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'appended': self.appended,
+                'written': self.written,
+                'batches': self.batches,
+                'pending': len(self._pending),
+                'cached_states': len(self._states),
+                'snapshot': self.snapshot_info,
+                'restore': dict(self.restore_info, pending_sessions=len(self._snapshot_index)
+                                - len(self._restored_sessions)),
+            }
+
+    # -------------------------------------------------------------- snapshots
+
+    def _pack_state(self, username: str, state: PlayerState) -> bytes:
+        name = username.encode('utf-8')
+        parts = [struct.pack('<H', len(name)), name,
+                 struct.pack('<BBdd', state.current_step, state.joined | (state.completed << 1), state.updated_at,
+                             state.joined_at)]
+        for phase, choices in state.step_choices():
+            parts.append(struct.pack('<B', len(choices)))
+            parts.append(self.encode(phase, choices))
+        return b''.join(parts)
+
+    def _unpack_states(self, blob: bytes) -> Dict[str, PlayerState]:
+        states = {}
+        offset = 0
+        while offset < len(blob):
+            (name_length,) = struct.unpack_from('<H', blob, offset)
+            offset += 2
+            username = blob[offset:offset + name_length].decode('utf-8')
+            offset += name_length
+            step, flags, updated_at, joined_at = struct.unpack_from('<BBdd', blob, offset)
+            offset += 18
+            state = PlayerState()
+            for phase in range(1, 6):
+                count = blob[offset]
+                offset += 1
+                if count:
+                    state.apply(EVENT_STEP + phase, self.decode(blob[offset:offset + 2 * count]), updated_at)
+                offset += 2 * count
+            state.joined, state.completed = bool(flags & 1), bool(flags & 2)
+            state.current_step, state.updated_at, state.joined_at = step, updated_at, joined_at
+            states[username] = state
+        return states
+
+    def snapshot(self) -> Dict:
+        """Écrit les états des joueurs en cours (écriture atomique) et retourne ses caractéristiques"""
+        started = time.perf_counter()
+        with self._snapshot_lock:
+            # Les sessions pas encore restaurées doivent l'être pour ne pas disparaître du snapshot
+            for session_code in list(self._snapshot_index):
+                if session_code not in self._restored_sessions:
+                    self._restore_session(session_code)
+            self.flush()
+            appended = self.appended
+            with self._flush_lock:
+                with self._connect() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('SELECT COALESCE(MAX(id), 0) FROM player_events')
+                    last_event_id = cursor.fetchone()[0]
+                # Multi-process: oublier les états modifiés ailleurs jusqu'à last_event_id
+                shared_store.refresh()
+                # Des ajouts concurrents peuvent déjà figurer dans les états copiés: rejouer
+                # un suffixe d'événements sur un état qui le contient ne change rien
+                with self._lock:
+                    live = [(key, state) for key, state in self._states.items()
+                            if state.joined and not state.completed]
+
+            by_session: Dict[str, List[bytes]] = {}
+            for (session_code, username), state in live:
+                by_session.setdefault(session_code, []).append(self._pack_state(username, state))
+            index, blobs, offset = {}, [], 0
+            for session_code, packed in by_session.items():
+                blob = b''.join(packed)
+                index[session_code] = [offset, len(blob), len(packed)]
+                blobs.append(blob)
+                offset += len(blob)
+            header = json.dumps({'last_event_id': last_event_id, 'created_at': time.time(),
+                                 'sessions': index}).encode('utf-8')
+
+            temporary = f"{self.snapshot_path}.{os.getpid()}.tmp"
+            with open(temporary, 'wb') as f:
+                f.write(SNAPSHOT_MAGIC)
+                f.write(struct.pack('<I', len(header)))
+                f.write(header)
+                for blob in blobs:
+                    f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, self.snapshot_path)
+
+            # Le nouveau snapshot devient la référence (tout ce qu'il contient est déjà en mémoire)
+            with self._restore_lock:
+                self._snapshot_index = index
+                self._snapshot_event_id = last_event_id
+                self._snapshot_data_start = len(SNAPSHOT_MAGIC) + 4 + len(header)
+                self._restored_sessions = set(index)
+            self._appended_at_snapshot = appended
+            self.snapshot_info = {
+                'path': self.snapshot_path,
+                'last_event_id': last_event_id,
+                'sessions': len(index),
+                'players': len(live),
+                'bytes': self._snapshot_data_start + offset,
+                'time_ms': round((time.perf_counter() - started) * 1000, 2),
+            }
+        logger.info(f"Snapshot joueurs: {len(live)} joueurs, {len(index)} sessions, "
+                    f"{self.snapshot_info['bytes']} octets en {self.snapshot_info['time_ms']} ms")
+        return self.snapshot_info
+
+    @staticmethod
+    def _read_header(f) -> Tuple[Dict[str, List[int]], int, int]:
+        """En-tête d'un snapshot ouvert: index des sessions, dernier événement, début des blocs"""
+        if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise ValueError('format inconnu')
+        (header_length,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_length).decode('utf-8'))
+        return header['sessions'], header['last_event_id'], len(SNAPSHOT_MAGIC) + 4 + header_length
+
+    def _read_snapshot_index(self) -> None:
+        """Au démarrage: ne lit que l'index du dernier snapshot"""
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                self._snapshot_index, self._snapshot_event_id, self._snapshot_data_start = self._read_header(f)
+            logger.info(f"Snapshot joueurs trouvé: {len(self._snapshot_index)} sessions "
+                        f"(événement {self._snapshot_event_id}), restauration à la demande")
+        except Exception as e:
+            # Le journal reste la source de vérité: sans snapshot, les états sont rejoués depuis la base
+            logger.warning(f"Snapshot joueurs ignoré ({self.snapshot_path}): {e}")
+            self._snapshot_index = {}
+
+    def _restore_session(self, session_code: str) -> None:
+        """Restaure une session: son bloc du snapshot + les événements postérieurs"""
+        started = time.perf_counter()
+        with self._restore_lock:
+            if session_code in self._restored_sessions or session_code not in self._snapshot_index:
+                return
+            try:
+                with open(self.snapshot_path, 'rb') as f:
+                    index, last_event_id, data_start = self._read_header(f)
+                    if last_event_id != self._snapshot_event_id:
+                        # Snapshot remplacé depuis (autre worker): son index fait foi
+                        self._snapshot_index, self._snapshot_event_id = index, last_event_id
+                        self._snapshot_data_start = data_start
+                    states = {}
+                    if session_code in index:
+                        offset, length, _ = index[session_code]
+                        f.seek(data_start + offset)
+                        states = self._unpack_states(f.read(length))
+            except Exception as e:
+                logger.warning(f"Restauration de la session {session_code} depuis le snapshot impossible: {e}")
+                states = {}
+
+            with self._flush_lock:
+                with self._connect() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        SELECT username, kind, payload, created_at FROM player_events
+                        WHERE session_code = ? AND id > ?
+                        ORDER BY id
+                    ''', (session_code, self._snapshot_event_id))
+                    rows = cursor.fetchall()
+                with self._lock:
+                    rows += [(name, kind, payload, created_at) for code, name, kind, payload, created_at
+                             in self._pending if code == session_code]
+            # Seuls les joueurs du snapshot sont complétés ici; les autres seront rejoués en entier
+            for username, kind, payload, created_at in rows:
+                state = states.get(username)
+                if state is not None:
+                    state.apply(kind, self.decode(payload), created_at)
+
+            with self._lock:
+                for username, state in states.items():
+                    if (session_code, username) not in self._states:
+                        self._remember((session_code, username), state)
+                self._restored_sessions.add(session_code)
+                self.restore_info['sessions'] += 1
+                self.restore_info['players'] += len(states)
+                self.restore_info['replayed_events'] += len(rows)
+                self.restore_info['time_ms'] = round(self.restore_info['time_ms']
+                                                     + (time.perf_counter() - started) * 1000, 2)
+
+    def snapshot_if_changed(self) -> Optional[Dict]:
+        """Snapshot périodique: seulement si des événements ont été ajoutés depuis le précédent"""
+        if self.snapshot_interval and self.appended != self._appended_at_snapshot:
+            return self.snapshot()
+        return None
+
+    def close(self) -> None:
+        """Arrêt: écrit les événements en attente puis un dernier snapshot"""
+        self.flush()
+        self.snapshot_if_changed()
+
+
+# Instance globale (même base que UserManager)
+player_events = PlayerEventLog(user_manager.db_path,
+                               flush_interval=float(os.environ.get('EVENT_FLUSH_INTERVAL', 0.2)),
+                               batch_size=int(os.environ.get('EVENT_BATCH_SIZE', 200)),
+                               state_cache_size=int(os.environ.get('EVENT_STATE_CACHE', 20000)),
+                               snapshot_path=os.environ.get('SNAPSHOT_PATH'),
+                               snapshot_interval=float(os.environ.get('SNAPSHOT_INTERVAL', 30)))
+atexit.register(player_events.close)
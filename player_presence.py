@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Présence des joueurs actifs (heartbeat et nettoyage)
+Chaque appel API d'un joueur connecté à une session vaut heartbeat: l'heure est notée en
+mémoire (une entrée par joueur, les appels rapprochés se recouvrent) et écrite en base par
+lots (une transaction toutes les HEARTBEAT_FLUSH_INTERVAL secondes). Le nettoyage retire par
+lots les joueurs inactifs depuis ACTIVE_PLAYER_IDLE_TIMEOUT (onglet fermé...) et libère leur
+nom: la table active_players suit les joueurs réellement présents, pas l'historique. Le
+retrait est inscrit au journal d'événements (la partie du joueur retiré est oubliée, un
+homonyme qui reprend le nom repart de zéro).
+Les deux passages sont des tâches du planificateur de maintenance (scheduler.py); le
+nettoyage n'est exécuté que par un worker à la fois.
+
+Configuration (variables d'environnement):
+    HEARTBEAT_FLUSH_INTERVAL=15      # écriture des heartbeats accumulés (s)
+    ACTIVE_PLAYER_IDLE_TIMEOUT=1800  # inactivité avant retrait d'un joueur (s, 0 pour désactiver)
+    ACTIVE_PLAYER_LIVE_WINDOW=120    # activité récente: joueur "live" plutôt qu'"idle" (s)
+    ACTIVE_PLAYER_SWEEP_INTERVAL=60  # passage du nettoyage (s)
+    ACTIVE_PLAYER_SWEEP_BATCH=500    # joueurs retirés par transaction
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import metrics
+from player_events import player_events, EVENT_LEFT
+from user_manager import user_manager
+
+logger = logging.getLogger(__name__)
+
+expired_players = metrics.counter('active_players_expired_total', 'Joueurs actifs retirés pour inactivité')
+
+
+class PlayerPresence:
+    """Heartbeats coalescés en mémoire et retrait périodique des joueurs inactifs"""
+
+    def __init__(self, manager, flush_interval: float = 15.0, idle_timeout: float = 1800.0,
+                 live_window: float = 120.0, sweep_interval: float = 60.0, batch_size: int = 500):
+        self.manager = manager
+        self.flush_interval = flush_interval
+        self.idle_timeout = idle_timeout
+        self.live_window = live_window
+        self.sweep_interval = sweep_interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], str] = {}
+        self._expire_listeners: List[Callable[[List[Tuple[str, str]]], None]] = []
+        self.flushed = 0
+        self.expired = 0
+        metrics.gauge('heartbeats_pending', 'Heartbeats en attente d\'écriture', callback=lambda: len(self._pending))
+
+    def touch(self, session_code: str, username: str) -> None:
+        """Heartbeat d'un joueur (appelé à chaque requête, sans accès base)"""
+        key = (session_code.upper().strip(), username)
+        last_seen = datetime.now().isoformat()
+        with self._lock:
+            self._pending[key] = last_seen
+
+    def on_expire(self, callback: Callable[[List[Tuple[str, str]]], None]) -> None:
+        """Appelle `callback(joueurs)` après chaque lot de joueurs retirés (caches locaux)"""
+        self._expire_listeners.append(callback)
+
+    def flush(self) -> int:
+        """Écrit les heartbeats accumulés en une transaction; retourne le nombre de joueurs"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        entries = [(code, username, last_seen) for (code, username), last_seen in pending.items()]
+        if not self.manager.touch_active_players(entries):
+            # Réessayés au prochain passage (un heartbeat plus récent l'emporte)
+            with self._lock:
+                for key, last_seen in pending.items():
+                    self._pending.setdefault(key, last_seen)
+            return 0
+        self.flushed += len(entries)
+        return len(entries)
+
+    def sweep(self) -> int:
+        """Retire les joueurs inactifs, par lots; retourne le nombre de joueurs retirés"""
+        if not self.idle_timeout:
+            return 0
+        self.flush()
+        idle_before = (datetime.now() - timedelta(seconds=self.idle_timeout)).isoformat()
+        joined_before = time.time() - self.idle_timeout
+        total = 0
+        while True:
+            removed = self.manager.expire_idle_players(idle_before, self.batch_size)
+            self._forget(removed, joined_before)
+            total += len(removed)
+            if len(removed) < self.batch_size:
+                break
+            # Laisser passer les écritures des requêtes entre deux lots
+            time.sleep(0.01)
+        if total:
+            expired_players.inc(amount=total)
+            self.expired += total
+        return total
+
+    def _forget(self, removed: List[Tuple[str, str]], joined_before: float) -> None:
+        """Oublie la partie des joueurs retirés (journal d'événements, puis caches locaux)"""
+        for session_code, username in removed:
+            # Un homonyme connecté entre-temps (nom déjà libéré) garde sa partie
+            if player_events.state(session_code, username).joined_at < joined_before:
+                player_events.append(session_code, username, EVENT_LEFT)
+        for callback in self._expire_listeners:
+            try:
+                callback(removed)
+            except Exception as e:
+                logger.error(f"Erreur après retrait des joueurs inactifs: {e}")
+
+    def session_activity(self, session_code: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """Joueurs live/idle par session (heartbeats de ce worker écrits avant le comptage)"""
+        self.flush()
+        live_since = (datetime.now() - timedelta(seconds=self.live_window)).isoformat()
+        return self.manager.get_session_activity(live_since, session_code)
+
+    def close(self) -> None:
+        self.flush()
+
+    def stats(self) -> Dict:
+        return {
+            'pending_heartbeats': len(self._pending),
+            'flushed': self.flushed,
+            'expired': self.expired,
+            'idle_timeout_s': self.idle_timeout,
+            'live_window_s': self.live_window,
+        }
+
+
+# Instance globale
+player_presence = PlayerPresence(user_manager,
+                                 flush_interval=float(os.environ.get('HEARTBEAT_FLUSH_INTERVAL', 15)),
+                                 idle_timeout=float(os.environ.get('ACTIVE_PLAYER_IDLE_TIMEOUT', 1800)),
+                                 live_window=float(os.environ.get('ACTIVE_PLAYER_LIVE_WINDOW', 120)),
+                                 sweep_interval=float(os.environ.get('ACTIVE_PLAYER_SWEEP_INTERVAL', 60)),
+                                 batch_size=int(os.environ.get('ACTIVE_PLAYER_SWEEP_BATCH', 500)))
+atexit.register(player_presence.close)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Request Profiler - Profilage à la demande du process en production
+Deux modes, armés par un admin (POST /api/admin/profile):
+    cprofile  cProfile sur les N prochaines requêtes (filtrées par préfixe de chemin),
+              résultat agrégé par fonction
+    sampling  échantillonnage des piles des threads en cours de requête pendant
+              N secondes, résultat en "collapsed stacks" (flamegraph.pl, speedscope)
+Inactif, le coût par requête se limite à un test booléen.
+"""
+
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_REQUESTS = 1000
+MAX_SECONDS = 120
+MIN_INTERVAL = 0.001
+
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class RequestProfiler:
+    """Profileur armé à la demande, conscient des frontières de requêtes"""
+
+    def __init__(self):
+        self.active = False
+        self.mode: Optional[str] = None
+        self.path_prefix: Optional[str] = None
+        self.result: Optional[Dict] = None
+        self._lock = threading.Lock()
+
+        # Mode cprofile
+        self._remaining = 0
+        self._requests_profiled = 0
+        self._stats: Optional[pstats.Stats] = None
+        self._profile_lock = threading.Lock()
+        self._local = threading.local()
+
+        # Mode sampling
+        self._requests_in_flight: Dict[int, str] = {}
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._deadline = 0.0
+        self._stop_event = threading.Event()
+
+    # ------------------------------------------------------------------ contrôle
+
+    def start_cprofile(self, requests: int, path_prefix: Optional[str] = None) -> None:
+        """Profile les `requests` prochaines requêtes dont le chemin commence par `path_prefix`"""
+        with self._lock:
+            self._reset(mode='cprofile', path_prefix=path_prefix)
+            self._remaining = max(1, min(int(requests), MAX_REQUESTS))
+            self.active = True
+        logger.info(f"Profiler cprofile armé: {self._remaining} requêtes, filtre={path_prefix or '*'}")
+
+    def start_sampling(self, seconds: float, interval: float = 0.005, path_prefix: Optional[str] = None) -> None:
+        """Échantillonne les piles des requêtes en cours pendant `seconds` secondes"""
+        with self._lock:
+            self._reset(mode='sampling', path_prefix=path_prefix)
+            seconds = max(0.1, min(float(seconds), MAX_SECONDS))
+            interval = max(MIN_INTERVAL, float(interval))
+            self._deadline = time.monotonic() + seconds
+            self._stop_event = threading.Event()
+            self.active = True
+            threading.Thread(target=self._sample_loop, args=(interval, self._stop_event),
+                             name='request-profiler', daemon=True).start()
+        logger.info(f"Profiler sampling armé: {seconds}s, intervalle={interval * 1000:.1f}ms, filtre={path_prefix or '*'}")
+
+    def stop(self) -> Optional[Dict]:
+        """Arrête le profilage en cours et retourne le résultat"""
+        with self._lock:
+            if self.active:
+                self._finish()
+            return self.result
+
+    def status(self) -> Dict:
+        """État courant du profileur"""
+        status = {'active': self.active, 'mode': self.mode, 'path_prefix': self.path_prefix}
+        if self.active and self.mode == 'cprofile':
+            status['remaining_requests'] = self._remaining
+        elif self.active and self.mode == 'sampling':
+            status['remaining_seconds'] = round(max(0.0, self._deadline - time.monotonic()), 1)
+        return status
+
+    def _reset(self, mode: str, path_prefix: Optional[str]) -> None:
+        if self.active:
+            self._finish()
+        self.mode = mode
+        self.path_prefix = path_prefix or None
+        self.result = None
+        self._requests_profiled = 0
+        self._stats = None
+        self._stacks = Counter()
+        self._samples = 0
+        self._requests_in_flight.clear()
+
+    def _finish(self) -> None:
+        """Fige le résultat (appelé sous self._lock)"""
+        self.active = False
+        if self.mode == 'cprofile':
+            self.result = self._cprofile_result()
+        elif self.mode == 'sampling':
+            self._stop_event.set()
+            self.result = {
+                'mode': 'sampling',
+                'path_prefix': self.path_prefix,
+                'samples': self._samples,
+                'stacks': dict(self._stacks.most_common())
+            }
+        logger.info(f"Profiler {self.mode} terminé")
+
+    # ---------------------------------------------------------- hooks de requête
+
+    def _matches(self, path: str) -> bool:
+        return self.path_prefix is None or path.startswith(self.path_prefix)
+
+    def begin_request(self, path: str) -> None:
+        """A appeler en before_request"""
+        if not self.active or not self._matches(path):
+            return
+        if self.mode == 'sampling':
+            self._requests_in_flight[threading.get_ident()] = path
+        elif self.mode == 'cprofile' and self._profile_lock.acquire(blocking=False):
+            # Une seule requête profilée à la fois: cProfile est global au process en 3.12
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                self._profile_lock.release()
+                return
+            self._local.profile = profile
+
+    def end_request(self) -> None:
+        """A appeler en teardown_request"""
+        if self._requests_in_flight:
+            self._requests_in_flight.pop(threading.get_ident(), None)
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            return
+        profile.disable()
+        self._local.profile = None
+        self._profile_lock.release()
+
+        with self._lock:
+            if not self.active or self.mode != 'cprofile':
+                return
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            self._requests_profiled += 1
+            self._remaining -= 1
+            if self._remaining <= 0:
+                self._finish()
+
+    # ------------------------------------------------------------------ résultats
+
+    def _cprofile_result(self, limit: int = 50) -> Dict:
+        functions: List[Dict] = []
+        if self._stats is not None:
+            entries = sorted(self._stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+            for (filename, line, name), (_, ncalls, tottime, cumtime, _) in entries[:limit]:
+                functions.append({
+                    'function': f"{os.path.basename(filename)}:{line}({name})",
+                    'ncalls': ncalls,
+                    'tottime_ms': round(tottime * 1000, 3),
+                    'cumtime_ms': round(cumtime * 1000, 3)
+                })
+        return {
+            'mode': 'cprofile',
+            'path_prefix': self.path_prefix,
+            'requests': self._requests_profiled,
+            'functions': functions
+        }
+
+    def collapsed(self) -> str:
+        """Dernier résultat sampling au format collapsed stacks ("a;b;c 42" par ligne)"""
+        if not self.result or self.result.get('mode') != 'sampling':
+            return ''
+        return ''.join(f"{stack} {count}\n" for stack, count in self.result['stacks'].items())
+
+    # ------------------------------------------------------------------- sampling
+
+    def _sample_loop(self, interval: float, stop_event: threading.Event) -> None:
+        own_id = threading.get_ident()
+        while not stop_event.wait(interval):
+            if time.monotonic() >= self._deadline:
+                with self._lock:
+                    if self.active and self._stop_event is stop_event:
+                        self._finish()
+                return
+            in_flight = dict(self._requests_in_flight)
+            if not in_flight:
+                continue
+            frames = sys._current_frames()
+            for thread_id, path in in_flight.items():
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(path)
+                self._stacks[';'.join(reversed(stack))] += 1
+                self._samples += 1
+
+
+# Instance globale
+request_profiler = RequestProfiler()
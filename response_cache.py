@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Response Cache - Réponses pré-construites par version de contenu
+Les payloads qui ne dépendent que de game_content.json sont sérialisés une
+seule fois puis servis tels quels (avec ETag) jusqu'au prochain changement.
+"""
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from flask import current_app, request
+
+
+@dataclass(frozen=True)
+class CachedPayload:
+    """Corps de réponse figé et son ETag"""
+    body: bytes
+    etag: str
+
+
+def json_body(payload: Any) -> bytes:
+    """Sérialise un payload JSON de façon compacte, clés triées comme le faisait jsonify
+    (l'UI affiche les catégories dans l'ordre des clés)"""
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+class ResponseCache:
+    """Cache de réponses invalidé par un numéro de version"""
+
+    def __init__(self, version_source: Callable[[], Hashable]):
+        self._version_source = version_source
+        self._entries: Dict[Hashable, Tuple[Hashable, CachedPayload]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, build: Callable[[], bytes]) -> CachedPayload:
+        """Retourne le payload pour `key`, reconstruit si la version a changé"""
+        version = self._version_source()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        body = build()
+        payload = CachedPayload(body=body, etag=hashlib.sha1(body).hexdigest()[:20])
+        with self._lock:
+            self._entries[key] = (version, payload)
+        return payload
+
+    def respond(self, key: Hashable, build: Callable[[], bytes], mimetype: str = 'application/json'):
+        """Construit une réponse Flask conditionnelle (304 si l'ETag correspond)"""
+        payload = self.get(key, build)
+        response = current_app.response_class(payload.body, mimetype=mimetype)
+        response.set_etag(payload.etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
+
+    def clear(self) -> None:
+        """Vide le cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Planificateur des tâches de maintenance
+Un seul thread daemon par process exécute les tâches enregistrées (écriture des heartbeats,
+snapshot des joueurs, retrait des inactifs, optimisation SQLite...), hors du chemin des
+requêtes. Horloge monotone; chaque exécution est suivie de la suivante après l'intervalle
+± une part aléatoire (jitter) pour que les workers ne se synchronisent pas. Une tâche ne
+chevauche jamais sa propre exécution (un seul thread, replanifiée après la fin).
+
+Tâches exclusives: en mode multi-process (SHARED_STATE=1), un bail en base (table
+scheduler_leases) désigne le worker qui les exécute; les autres passent leur tour tant que
+le bail est valide (renouvelé à chaque exécution, repris s'il expire).
+
+Métriques: scheduler_task_runs_total{task,result}, scheduler_task_duration_seconds{task}.
+"""
+
+import heapq
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import metrics
+from shared_store import shared_store
+from sql_profiler import sql_profiler
+
+logger = logging.getLogger(__name__)
+
+task_runs = metrics.counter('scheduler_task_runs_total',
+                            'Exécutions des tâches de maintenance, par résultat (ok, error, skipped)',
+                            ('task', 'result'))
+task_duration = metrics.histogram('scheduler_task_duration_seconds', 'Durée des tâches de maintenance', ('task',))
+
+
+class ScheduledTask:
+    """Tâche périodique et son historique d'exécution"""
+
+    def __init__(self, name: str, func: Callable[[], object], interval: float, jitter: float, exclusive: bool):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.exclusive = exclusive
+        self.next_run = 0.0
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_duration: Optional[float] = None
+        self.last_run: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def delay(self) -> float:
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def to_dict(self) -> Dict:
+        return {
+            'interval_s': self.interval,
+            'exclusive': self.exclusive,
+            'runs': self.runs,
+            'failures': self.failures,
+            'skipped': self.skipped,
+            'last_run': self.last_run,
+            'last_duration_ms': round(self.last_duration * 1000, 2) if self.last_duration is not None else None,
+            'last_error': self.last_error,
+            'next_run_in_s': round(max(0.0, self.next_run - time.monotonic()), 1),
+        }
+
+
+class Scheduler:
+    """Exécute les tâches de maintenance dans un thread dédié"""
+
+    def __init__(self, db_path: str, leases: bool = False):
+        self.db_path = db_path
+        self.leases = leases
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._tasks: Dict[str, ScheduledTask] = {}
+        self._queue: List[Tuple[float, str]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._lease_table_ready = False
+
+    def register(self, name: str, func: Callable[[], object], interval: float,
+                 jitter: float = 0.1, exclusive: bool = False) -> None:
+        """Enregistre une tâche toutes les `interval` secondes (désactivée si interval <= 0)"""
+        if interval <= 0:
+            return
+        task = ScheduledTask(name, func, interval, jitter, exclusive)
+        with self._lock:
+            self._tasks[name] = task
+            self._schedule(task, time.monotonic() + task.delay())
+        self._wakeup.set()
+
+    def _schedule(self, task: ScheduledTask, when: float) -> None:
+        task.next_run = when
+        heapq.heappush(self._queue, (when, task.name))
+
+    def trigger(self, name: str) -> bool:
+        """Avance la prochaine exécution d'une tâche à maintenant (exécutée par le thread du planificateur)"""
+        with self._lock:
+            task = self._tasks.get(name)
+            if task is None:
+                return False
+            self._schedule(task, time.monotonic())
+        self._wakeup.set()
+        return True
+
+    def _connect(self):
+        return shared_store.configure(sql_profiler.connect(self.db_path, timeout=shared_store.busy_timeout))
+
+    def _acquire_lease(self, task: ScheduledTask) -> bool:
+        """Bail de la tâche pour ce process (pris s'il est libre ou expiré, renouvelé s'il est à nous)"""
+        if not self.leases:
+            return True
+        now = time.time()
+        with self._connect() as conn:
+            if not self._lease_table_ready:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS scheduler_leases (
+                        task TEXT PRIMARY KEY,
+                        owner TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                ''')
+                self._lease_table_ready = True
+            cursor = conn.execute('''
+                INSERT INTO scheduler_leases (task, owner, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(task) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE scheduler_leases.owner = excluded.owner OR scheduler_leases.expires_at < ?
+            ''', (task.name, self.owner, now + 2 * task.interval + 60, now))
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def _run_task(self, task: ScheduledTask) -> None:
+        try:
+            if task.exclusive and not self._acquire_lease(task):
+                task.skipped += 1
+                task_runs.inc(task.name, 'skipped')
+                return
+        except Exception as e:
+            logger.error(f"Erreur lors de la prise du bail de la tâche {task.name}: {e}")
+            task_runs.inc(task.name, 'error')
+            return
+        started = time.perf_counter()
+        task.last_run = time.time()
+        try:
+            task.func()
+            task.last_error = None
+            task_runs.inc(task.name, 'ok')
+        except Exception as e:
+            task.failures += 1
+            task.last_error = str(e)
+            task_runs.inc(task.name, 'error')
+            logger.error(f"Erreur lors de la tâche de maintenance {task.name}: {e}")
+        finally:
+            task.runs += 1
+            task.last_duration = time.perf_counter() - started
+            task_duration.observe(task.last_duration, task.name)
+
+    def run_pending(self) -> int:
+        """Exécute les tâches arrivées à échéance; retourne le nombre exécuté"""
+        executed = 0
+        while True:
+            with self._lock:
+                if not self._queue or self._queue[0][0] > time.monotonic():
+                    return executed
+                when, name = heapq.heappop(self._queue)
+                task = self._tasks.get(name)
+                if task is None or task.next_run != when:
+                    continue  # entrée remplacée (trigger, nouvel enregistrement)
+            self._run_task(task)
+            executed += 1
+            with self._lock:
+                if self._tasks.get(name) is task and task.next_run == when:
+                    # Prochaine exécution comptée depuis la fin: jamais de chevauchement
+                    self._schedule(task, time.monotonic() + task.delay())
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.run_pending()
+            with self._lock:
+                timeout = self._queue[0][0] - time.monotonic() if self._queue else None
+            if timeout is None or timeout > 0:
+                self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        """Démarre le thread du planificateur (une fois par process)"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            tasks = {name: task.to_dict() for name, task in self._tasks.items()}
+        return {'owner': self.owner, 'leases': self.leases, 'running': self._thread is not None, 'tasks': tasks}
+
+
+# Instance globale (bail en base seulement en mode multi-process)
+scheduler = Scheduler(os.environ.get('DATABASE_PATH', 'users.db'), leases=shared_store.enabled)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Registre des sessions de jeu en mémoire
+Cache des sessions actives (code -> id, créateur, statut, nombre de joueurs) avec TTL,
+et cache négatif des codes inconnus: les fautes de frappe et les essais de codes au
+hasard ne descendent pas jusqu'à la base. Invalidation explicite à la création et à la
+fermeture d'une session; en multi-process, les autres workers sont prévenus par le
+compteur de version 'sessions' (voir shared_store.py).
+
+Registre des noms par session: ensemble des noms normalisés déjà pris, chargé depuis la base
+au premier accès à la session. La vérification "nom déjà pris" reste en mémoire; la
+réservation passe par la contrainte d'unicité du stockage (table session_names), qui fait
+foi entre threads et entre workers: un ensemble local en retard (nom pris par un autre
+worker) est tranché par la réservation. Les noms libérés (joueurs inactifs retirés, voir
+player_presence.py) font oublier l'ensemble de la session, y compris aux autres workers
+(compteur de version 'names:<code>').
+
+Configuration (variables d'environnement):
+    SESSION_CACHE_TTL=60        # durée de vie d'une session en cache (s)
+    SESSION_NEGATIVE_TTL=10     # durée de vie d'un code inconnu en cache (s)
+    SESSION_CACHE_SIZE=10000    # entrées max de chaque cache (LRU)
+    USERNAME_CACHE_SESSIONS=1000  # sessions dont les noms sont gardés en mémoire (LRU)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+
+from metrics import metrics
+from shared_store import shared_store
+
+session_lookups = metrics.counter('session_registry_lookups_total',
+                                  'Recherches de session par code, par résultat (hit, negative_hit, miss)',
+                                  ('result',))
+username_checks = metrics.counter('username_registry_checks_total',
+                                  'Vérifications de noms par session, par résultat (taken, free, reserved, conflict)',
+                                  ('result',))
+
+MISSING = object()
+
+
+class SessionRegistry:
+    """Cache TTL des sessions actives, avec cache négatif des codes inconnus"""
+
+    def __init__(self, ttl: float = 60.0, negative_ttl: float = 10.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._sessions: 'OrderedDict[str, Tuple[float, Dict]]' = OrderedDict()
+        self._unknown: 'OrderedDict[str, float]' = OrderedDict()
+        shared_store.on_change('sessions', lambda name: self.invalidate())
+
+    def get(self, session_code: str):
+        """Session en cache, None si le code est connu comme inconnu, MISSING s'il faut interroger la base"""
+        if not self.ttl:
+            return MISSING
+        shared_store.refresh()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_code)
+            if entry is not None:
+                if entry[0] > now:
+                    self._sessions.move_to_end(session_code)
+                    session_lookups.inc('hit')
+                    return dict(entry[1])
+                del self._sessions[session_code]
+            expires = self._unknown.get(session_code)
+            if expires is not None:
+                if expires > now:
+                    session_lookups.inc('negative_hit')
+                    return None
+                del self._unknown[session_code]
+        session_lookups.inc('miss')
+        return MISSING
+
+    def put(self, session_code: str, record: Optional[Dict]) -> None:
+        """Mémorise le résultat d'une lecture en base (None: code inconnu ou session fermée)"""
+        if not self.ttl:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if record is None:
+                self._sessions.pop(session_code, None)
+                self._unknown[session_code] = now + self.negative_ttl
+                self._unknown.move_to_end(session_code)
+                while len(self._unknown) > self.max_entries:
+                    self._unknown.popitem(last=False)
+            else:
+                self._unknown.pop(session_code, None)
+                self._sessions[session_code] = (now + self.ttl, dict(record))
+                self._sessions.move_to_end(session_code)
+                while len(self._sessions) > self.max_entries:
+                    self._sessions.popitem(last=False)
+
+    def add_players(self, session_code: str, count: int = 1) -> None:
+        """Répercute un nouveau joueur sur la session en cache"""
+        with self._lock:
+            entry = self._sessions.get(session_code)
+            if entry is not None:
+                entry[1]['player_count'] = entry[1].get('player_count', 0) + count
+
+    def invalidate(self, session_code: Optional[str] = None) -> None:
+        """Oublie une session (création, fermeture) ou tout le registre"""
+        with self._lock:
+            if session_code is None:
+                self._sessions.clear()
+                self._unknown.clear()
+            else:
+                self._sessions.pop(session_code, None)
+                self._unknown.pop(session_code, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'ttl_s': self.ttl,
+                'negative_ttl_s': self.negative_ttl,
+                'sessions': len(self._sessions),
+                'unknown_codes': len(self._unknown),
+            }
+
+
+class UsernameRegistry:
+    """Noms normalisés pris dans chaque session, en mémoire; la réservation passe par le stockage"""
+
+    def __init__(self, storage, max_sessions: int = 1000, scores=None):
+        self.storage = storage
+        # Scores dans un autre stockage (STORAGE_BACKEND mixte): les noms des joueurs qui ont
+        # un score y sont lus et réservés dans `storage` au chargement de la session
+        self.scores = scores
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions: 'OrderedDict[str, Set[str]]' = OrderedDict()
+        self.loads = 0
+        shared_store.on_change('names:', lambda name: self.invalidate(name.split(':', 1)[1]))
+
+    def _names(self, session_code: str) -> Set[str]:
+        shared_store.refresh()
+        with self._lock:
+            names = self._sessions.get(session_code)
+            if names is not None:
+                self._sessions.move_to_end(session_code)
+                return names
+        # Chargement hors verrou; les noms ajoutés entre-temps sont conservés
+        loaded = self.storage.reserved_names(session_code)
+        if self.scores is not None:
+            reserved_at = datetime.now().isoformat()
+            for normalized, username in self.scores.scored_names(session_code).items():
+                if normalized not in loaded:
+                    # Réservé dans le stockage des joueurs actifs: add_active_player le refusera
+                    self.storage.reserve_name(session_code, username, normalized, reserved_at)
+                    loaded.add(normalized)
+        with self._lock:
+            names = self._sessions.get(session_code)
+            if names is None:
+                names = self._sessions[session_code] = loaded
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                names |= loaded
+            self.loads += 1
+        return names
+
+    def is_taken(self, session_code: str, normalized_username: str) -> bool:
+        taken = normalized_username in self._names(session_code)
+        username_checks.inc('taken' if taken else 'free')
+        return taken
+
+    def reserve(self, session_code: str, username: str, normalized_username: str, connected_at: str) -> bool:
+        """Réserve le nom et enregistre le joueur actif; False si le nom est déjà pris"""
+        names = self._names(session_code)
+        if normalized_username in names:
+            username_checks.inc('taken')
+            return False
+        reserved = self.storage.add_active_player(session_code, username, normalized_username, connected_at)
+        # Réservé par nous ou, entre-temps, par un autre thread/worker: le nom est pris
+        with self._lock:
+            names.add(normalized_username)
+        username_checks.inc('reserved' if reserved else 'conflict')
+        return reserved
+
+    def remember(self, session_code: str, username: str, normalized_username: str, reserved_at: str) -> None:
+        """Réserve le nom d'un joueur qui a un score dans la session, s'il ne l'était pas déjà"""
+        names = self._names(session_code)
+        if normalized_username not in names:
+            self.storage.reserve_name(session_code, username, normalized_username, reserved_at)
+            with self._lock:
+                names.add(normalized_username)
+
+    def invalidate(self, session_code: Optional[str] = None) -> None:
+        """Oublie les noms d'une session (noms libérés) ou de toutes"""
+        with self._lock:
+            if session_code is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_code, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'names': sum(len(names) for names in self._sessions.values()),
+                'loads': self.loads,
+            }
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+État partagé entre process (déploiement multi-workers, gunicorn -w N)
+Tout l'état qui doit survivre d'une requête à l'autre passe par la base SQLite:
+- connexions configurées pour l'accès concurrent (WAL, busy_timeout, synchronous=NORMAL);
+- compteurs de version par espace de noms (table data_versions), incrémentés dans la
+  transaction qui modifie les données. Chaque process garde ses caches de lecture et
+  les invalide quand la version d'un espace a été changée par un autre process.
+
+Chemin rapide: PRAGMA data_version (connexion dédiée par thread) ne change que si une
+autre connexion a écrit dans la base; tant qu'il est stable, la table n'est pas relue.
+
+Configuration (variables d'environnement):
+    SHARED_STATE=1             # active le mode multi-process
+    SQLITE_BUSY_TIMEOUT=5      # attente max d'un verrou d'écriture (s)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SharedStore:
+    """Configuration des connexions et versions de données partagées entre process"""
+
+    def __init__(self, db_path: str, enabled: bool = False, busy_timeout: float = 5.0):
+        self.db_path = db_path
+        self.enabled = enabled
+        self.busy_timeout = busy_timeout
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._wal_ready = False
+        self._table_ready = False
+        self._seen: Dict[str, int] = {}
+        self._listeners: List[Tuple[str, Callable[[str], None]]] = []
+        self.invalidations = 0
+
+    def configure(self, conn: sqlite3.Connection) -> sqlite3.Connection:
+        """Prépare une connexion à l'accès concurrent (sans effet hors mode partagé)"""
+        if not self.enabled:
+            return conn
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}')
+        if not self._wal_ready:
+            # journal_mode est persistant dans le fichier: une fois par process suffit
+            mode = conn.execute('PRAGMA journal_mode = WAL').fetchone()[0]
+            if mode.lower() != 'wal':
+                logger.warning(f"Mode WAL indisponible pour {self.db_path} (journal_mode={mode})")
+            self._wal_ready = True
+        conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+
+    def _ensure_table(self, conn: sqlite3.Connection) -> None:
+        if self._table_ready:
+            return
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS data_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            )
+        ''')
+        self._table_ready = True
+
+    def on_change(self, prefix: str, callback: Callable[[str], None]) -> None:
+        """callback(name) est appelé quand un autre process a modifié un espace `prefix...`"""
+        self._listeners.append((prefix, callback))
+
+    def bump(self, conn: sqlite3.Connection, name: str) -> None:
+        """Incrémente la version de `name` dans la transaction en cours de `conn`"""
+        if not self.enabled:
+            return
+        self._ensure_table(conn)
+        conn.execute('''
+            INSERT INTO data_versions (name, version) VALUES (?, 1)
+            ON CONFLICT(name) DO UPDATE SET version = version + 1
+        ''', (name,))
+        version = conn.execute('SELECT version FROM data_versions WHERE name = ?', (name,)).fetchone()[0]
+        with self._lock:
+            # Écriture de ce process seul: pas d'invalidation. Sinon la version vue reste
+            # en retard et le prochain refresh() invalidera l'espace.
+            if self._seen.get(name, 0) + 1 == version:
+                self._seen[name] = version
+
+    def _version_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self.configure(sqlite3.connect(self.db_path, timeout=self.busy_timeout))
+            self._ensure_table(conn)
+            conn.commit()
+            self._local.conn = conn
+            self._local.data_version = None
+        return conn
+
+    def refresh(self) -> int:
+        """Invalide les caches des espaces modifiés ailleurs; retourne le nombre d'espaces invalidés"""
+        if not self.enabled:
+            return 0
+        conn = self._version_connection()
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == self._local.data_version:
+            return 0
+        # data_version lu avant la table: une écriture concurrente sera vue au prochain appel
+        rows = conn.execute('SELECT name, version FROM data_versions').fetchall()
+        self._local.data_version = data_version
+        changed = []
+        with self._lock:
+            for name, version in rows:
+                if self._seen.get(name, 0) != version:
+                    self._seen[name] = version
+                    changed.append(name)
+            self.invalidations += len(changed)
+        for name in changed:
+            for prefix, callback in self._listeners:
+                if name.startswith(prefix):
+                    callback(name)
+        return len(changed)
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'busy_timeout_s': self.busy_timeout,
+            'tracked_versions': len(self._seen),
+            'invalidations': self.invalidations,
+        }
+
+
+# Instance globale (même base que UserManager)
+shared_store = SharedStore(os.environ.get('DATABASE_PATH', 'users.db'),
+                           enabled=os.environ.get('SHARED_STATE', '0') == '1',
+                           busy_timeout=float(os.environ.get('SQLITE_BUSY_TIMEOUT', 5)))
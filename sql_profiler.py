@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+SQL Profiler - Instrumentation des requêtes SQLite de UserManager
+Chaque requête est chronométrée et agrégée par empreinte (SQL normalisé,
+littéraux remplacés par ?), pour la requête HTTP en cours et depuis le
+démarrage. Au-delà de SLOW_QUERY_MS, la requête est loggée avec son
+EXPLAIN QUERY PLAN.
+
+Configuration (variables d'environnement):
+    SQL_PROFILE=1          # 0 pour désactiver l'instrumentation
+    SLOW_QUERY_MS=50       # seuil du slow-query log
+"""
+
+import contextvars
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Stats de la requête HTTP en cours: {'count': int, 'time': float}
+_request_stats: contextvars.ContextVar = contextvars.ContextVar('sql_request_stats', default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql: str) -> str:
+    """Normalise une requête: espaces compactés, littéraux et listes IN remplacés par ?"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    return _IN_LIST.sub('IN (?)', sql)
+
+
+class StatementStats:
+    """Agrégat par empreinte de requête"""
+    __slots__ = ('count', 'total', 'max', 'slow')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+
+
+class SqlProfiler:
+    """Collecte des temps de requêtes SQL, par requête HTTP et depuis le démarrage"""
+
+    def __init__(self, enabled: bool = True, slow_query_ms: float = 50.0):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self.statements: Dict[str, StatementStats] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        profiler = self
+
+        class ProfiledCursor(sqlite3.Cursor):
+            def execute(self, sql, parameters=()):
+                started = time.perf_counter()
+                try:
+                    return super().execute(sql, parameters)
+                finally:
+                    profiler.record(self.connection, sql, parameters, time.perf_counter() - started)
+
+            def executemany(self, sql, seq_of_parameters):
+                started = time.perf_counter()
+                try:
+                    return super().executemany(sql, seq_of_parameters)
+                finally:
+                    profiler.record(self.connection, sql, None, time.perf_counter() - started)
+
+        class ProfiledConnection(sqlite3.Connection):
+            def cursor(self, factory=ProfiledCursor):
+                return super().cursor(factory)
+
+            # Connection.execute crée son curseur en C sans passer par cursor()
+            def execute(self, sql, parameters=()):
+                return self.cursor().execute(sql, parameters)
+
+            def executemany(self, sql, seq_of_parameters):
+                return self.cursor().executemany(sql, seq_of_parameters)
+
+        self._connection_factory = ProfiledConnection
+
+    def connect(self, db_path: str, **kwargs) -> sqlite3.Connection:
+        """sqlite3.connect, instrumenté si le profiler est actif"""
+        if self.enabled:
+            kwargs.setdefault('factory', self._connection_factory)
+        return sqlite3.connect(db_path, **kwargs)
+
+    def _fingerprint(self, sql: str) -> str:
+        # Les requêtes de UserManager sont des constantes: on mémorise la normalisation
+        cached = self._fingerprints.get(sql)
+        if cached is None:
+            cached = self._fingerprints[sql] = fingerprint(sql)
+        return cached
+
+    def record(self, conn: sqlite3.Connection, sql: str, parameters, elapsed: float) -> None:
+        """Enregistre une exécution (appelé par le curseur instrumenté)"""
+        key = self._fingerprint(sql)
+        slow = elapsed * 1000 >= self.slow_query_ms
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = StatementStats()
+            stats.count += 1
+            stats.total += elapsed
+            if elapsed > stats.max:
+                stats.max = elapsed
+            if slow:
+                stats.slow += 1
+
+        current = _request_stats.get()
+        if current is not None:
+            current['count'] += 1
+            current['time'] += elapsed
+
+        if slow:
+            logger.warning(f"Slow query ({elapsed * 1000:.1f} ms): {key} | plan: {self.explain(conn, sql, parameters)}")
+
+    @staticmethod
+    def explain(conn: sqlite3.Connection, sql: str, parameters) -> str:
+        """EXPLAIN QUERY PLAN d'une requête (sur un curseur non instrumenté)"""
+        if parameters is None or not sql.lstrip().upper().startswith(('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')):
+            return '-'
+        try:
+            cursor = sqlite3.Cursor(conn)
+            rows = cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+            return '; '.join(row[-1] for row in rows) or '-'
+        except sqlite3.Error as e:
+            return f"indisponible ({e})"
+
+    def begin_request(self) -> None:
+        """Démarre le comptage pour la requête HTTP courante"""
+        _request_stats.set({'count': 0, 'time': 0.0})
+
+    def end_request(self) -> Optional[Dict]:
+        """Termine le comptage et retourne {'count', 'time'} de la requête"""
+        current = _request_stats.get()
+        _request_stats.set(None)
+        return current
+
+    def request_stats(self) -> Optional[Dict]:
+        """Stats de la requête HTTP en cours"""
+        return _request_stats.get()
+
+    def top(self, limit: int = 20, order_by: str = 'total') -> List[Dict]:
+        """Requêtes les plus coûteuses depuis le démarrage"""
+        with self._lock:
+            items = [(sql, stats.count, stats.total, stats.max, stats.slow)
+                     for sql, stats in self.statements.items()]
+        sort_index = {'total': 2, 'count': 1, 'max': 3}.get(order_by, 2)
+        items.sort(key=lambda item: item[sort_index], reverse=True)
+        return [{
+            'statement': sql,
+            'count': count,
+            'total_ms': round(total * 1000, 3),
+            'avg_ms': round(total * 1000 / count, 3) if count else 0,
+            'max_ms': round(maximum * 1000, 3),
+            'slow': slow
+        } for sql, count, total, maximum, slow in items[:limit]]
+
+    def reset(self) -> None:
+        """Remet les agrégats à zéro"""
+        with self._lock:
+            self.statements.clear()
+
+
+# Instance globale
+sql_profiler = SqlProfiler(enabled=os.environ.get('SQL_PROFILE', '1') != '0',
+                           slow_query_ms=float(os.environ.get('SLOW_QUERY_MS', 50)))
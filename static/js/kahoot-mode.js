@@ -281,8 +281,12 @@ class KahootMode {
             const data = await response.json();
 
             if (!data.success) {
-                // Afficher l'erreur
-                this.showLoginAlert(data.message || 'Erreur de connexion', 'danger');
+                // Afficher l'erreur (avec des noms libres si le nom est déjà pris)
+                let message = data.message || 'Erreur de connexion';
+                if (data.suggestions && data.suggestions.length) {
+                    message += ' Suggestions : ' + data.suggestions.join(', ');
+                }
+                this.showLoginAlert(message, 'danger');
                 loginBtn.disabled = false;
                 loginBtnText.style.display = 'inline';
                 loginBtnLoading.style.display = 'none';
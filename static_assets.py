@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Static Assets - Build des assets fingerprintés et pré-compressés
+Usage: python static_assets.py
+
+Copie chaque fichier de static/ (css, js, images) vers static/dist/ sous un nom
+contenant le hash de son contenu, écrit une variante .gz pour les formats
+texte et génère static/dist/manifest.json, lu au démarrage par web_interface.py.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIRNAME = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Répertoires traités, dans l'ordre : les images d'abord pour pouvoir
+# réécrire leurs URLs dans le CSS et le JS avant de hasher ceux-ci.
+ASSET_DIRS = ['images', 'css', 'js']
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.vtt', '.txt'}
+HASH_LENGTH = 12
+
+
+def _fingerprint(data: bytes) -> str:
+    """Hash court du contenu d'un fichier"""
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def _hashed_name(rel_path: str, digest: str) -> str:
+    """css/style.css -> css/style.<hash>.css"""
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest}{ext}"
+
+
+def _write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def build(static_dir: str = STATIC_DIR) -> Dict[str, Dict]:
+    """Construit static/dist/ et retourne le manifest"""
+    dist_dir = os.path.join(static_dir, DIST_DIRNAME)
+    manifest: Dict[str, Dict] = {}
+    url_rewrites: Dict[str, str] = {}
+
+    for asset_dir in ASSET_DIRS:
+        source_dir = os.path.join(static_dir, asset_dir)
+        if not os.path.isdir(source_dir):
+            continue
+        for dirpath, _, filenames in os.walk(source_dir):
+            for filename in sorted(filenames):
+                source_path = os.path.join(dirpath, filename)
+                rel_path = os.path.relpath(source_path, static_dir).replace(os.sep, '/')
+                ext = os.path.splitext(filename)[1].lower()
+
+                with open(source_path, 'rb') as f:
+                    data = f.read()
+
+                # Réécrire les références /static/... vers les copies hashées
+                if ext in COMPRESSIBLE_EXTENSIONS and url_rewrites:
+                    text = data.decode('utf-8')
+                    for old_url, new_url in url_rewrites.items():
+                        text = text.replace(old_url, new_url)
+                    data = text.encode('utf-8')
+
+                hashed = _hashed_name(rel_path, _fingerprint(data))
+                _write(os.path.join(dist_dir, hashed), data)
+
+                entry = {'path': hashed, 'size': len(data), 'gzip': False}
+                if ext in COMPRESSIBLE_EXTENSIONS:
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                    if len(compressed) < len(data):
+                        _write(os.path.join(dist_dir, hashed + '.gz'), compressed)
+                        entry['gzip'] = True
+                        entry['gzip_size'] = len(compressed)
+
+                manifest[rel_path] = entry
+                url_rewrites[f"/static/{rel_path}"] = f"/assets/{hashed}"
+
+    _write(os.path.join(dist_dir, MANIFEST_NAME),
+           json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+class AssetManifest:
+    """Manifest des assets fingerprintés (vide si le build n'a pas été lancé)"""
+
+    def __init__(self, static_dir: str = STATIC_DIR):
+        self.dist_dir = os.path.join(static_dir, DIST_DIRNAME)
+        self.entries: Dict[str, Dict] = {}
+        self.gzipped = set()
+        self.load()
+
+    def load(self) -> None:
+        """Charge static/dist/manifest.json"""
+        try:
+            with open(os.path.join(self.dist_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+        self.gzipped = {entry['path'] for entry in self.entries.values() if entry.get('gzip')}
+
+    def lookup(self, rel_path: str) -> Optional[str]:
+        """Retourne le chemin hashé d'un asset, ou None s'il n'est pas dans le manifest"""
+        entry = self.entries.get(rel_path)
+        return entry['path'] if entry else None
+
+
+if __name__ == '__main__':
+    result = build()
+    total = sum(entry['size'] for entry in result.values())
+    compressed = sum(entry.get('gzip_size', entry['size']) for entry in result.values())
+    print(f"✅ {len(result)} assets écrits dans static/{DIST_DIRNAME}/ "
+          f"({total // 1024} KB, {compressed // 1024} KB servis en gzip)")
@@ -0,0 +1,1089 @@
+#!/usr/bin/env python3
+"""
+Backends de stockage de UserManager
+Les données sont réparties en groupes (utilisateurs, sessions, joueurs actifs,
+scores); chaque groupe est servi par un backend choisi par configuration:
+- sqlite: implémentation historique (fichier SQLite, durable)
+- memory: dictionnaires en mémoire du process (tests, benchmarks du tiers web sans
+  I/O disque, tables chaudes non durables)
+D'autres backends (base client-serveur) s'ajoutent avec register_backend().
+
+Configuration: STORAGE_BACKEND="<défaut>[,<groupe>=<backend>...]", par exemple
+    STORAGE_BACKEND=memory
+    STORAGE_BACKEND=sqlite,active_players=memory
+"""
+
+import json
+import logging
+import threading
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from shared_store import shared_store
+from sql_profiler import sql_profiler
+
+logger = logging.getLogger(__name__)
+
+GROUPS = ('users', 'sessions', 'active_players', 'scores')
+
+# Ligne de classement: (username, total_score, stars, mot_scores JSON, completed_at)
+ScoreRow = Tuple[str, int, int, str, str]
+
+
+@dataclass
+class User:
+    """Représente un utilisateur"""
+    id: int
+    username: str
+    email: Optional[str]
+    password_hash: Optional[str]
+    salt: Optional[str]
+    role: str
+    created_at: str
+    last_login: Optional[str] = None
+    is_active: bool = True
+    is_kahoot_mode: bool = False
+
+
+def normalize_username(username: str) -> str:
+    """Forme comparée des noms dans une session (insensible à la casse et aux espaces)"""
+    return username.strip().lower()
+
+
+def stats_scopes(session_code: Optional[str] = None, trainer: Optional[str] = None) -> List[str]:
+    """Scopes des statistiques d'une partie: global, sa session, le formateur de la session"""
+    scopes = ['global']
+    if session_code:
+        scopes.append(f'session:{session_code}')
+    if trainer:
+        scopes.append(f'trainer:{trainer}')
+    return scopes
+
+
+def stats_buckets(stars: int, mot_scores: Dict[str, int], choices: Dict[str, List[str]]) -> List[Tuple[str, str]]:
+    """(métrique, case) des histogrammes touchés par une partie terminée"""
+    buckets = [('stars', str(stars))]
+    buckets.extend((f'score:{mot}', str(score)) for mot, score in mot_scores.items())
+    buckets.extend((f'choice:{phase}', choice) for phase, ids in choices.items() for choice in ids if choice)
+    return buckets
+
+
+def accumulate_stats(aggregates: Dict[str, Dict], scopes: List[str], total_score: int, stars: int,
+                     mot_scores: Dict[str, int], choices: Dict[str, List[str]]) -> None:
+    """Ajoute une partie terminée aux agrégats en mémoire {scope: agrégat}"""
+    buckets = stats_buckets(stars, mot_scores, choices)
+    for scope in scopes:
+        aggregate = aggregates.setdefault(scope, {'count': 0, 'score_sum': 0, 'best': total_score,
+                                                  'worst': total_score, 'histograms': {}})
+        aggregate['count'] += 1
+        aggregate['score_sum'] += total_score
+        aggregate['best'] = max(aggregate['best'], total_score)
+        aggregate['worst'] = min(aggregate['worst'], total_score)
+        for metric, bucket in buckets:
+            histogram = aggregate['histograms'].setdefault(metric, {})
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """Plus petite chaîne supérieure à toutes celles qui commencent par `prefix` (requêtes par plage)"""
+    return prefix + '\U0010ffff'
+
+
+class StorageBackend:
+    """Interface de stockage: chaque méthode lève une exception en cas d'erreur"""
+
+    name = 'abstract'
+    durable = False
+
+    def optimize(self) -> None:
+        """Maintenance périodique (statistiques du planificateur de requêtes...); rien par défaut"""
+
+    # Utilisateurs
+    def count_users(self) -> int:
+        raise NotImplementedError
+
+    def insert_user(self, username: str, email: Optional[str], password_hash: Optional[str],
+                    salt: Optional[str], role: str, created_at: str, kahoot_mode: bool) -> None:
+        raise NotImplementedError
+
+    def get_user_by_username(self, username: str) -> Optional[User]:
+        raise NotImplementedError
+
+    def get_user_by_email(self, email: str) -> Optional[User]:
+        raise NotImplementedError
+
+    def list_users(self) -> List[User]:
+        """Tous les utilisateurs, du plus récent au plus ancien"""
+        raise NotImplementedError
+
+    def set_last_login(self, user_id: int, when: str) -> None:
+        raise NotImplementedError
+
+    def set_password(self, user_id: int, password_hash: str, salt: str) -> None:
+        raise NotImplementedError
+
+    def deactivate_user(self, username: str) -> None:
+        raise NotImplementedError
+
+    def usernames_with_prefix(self, prefix: str) -> Set[str]:
+        """Noms d'utilisateurs commençant par `prefix` (sensible à la casse)"""
+        raise NotImplementedError
+
+    # Sessions de jeu
+    def insert_session(self, session_code: str, created_by: str, created_at: str) -> None:
+        raise NotImplementedError
+
+    def get_session(self, session_code: str) -> Optional[Dict]:
+        """Session active par code exact (déjà normalisé)"""
+        raise NotImplementedError
+
+    def session_creator(self, session_code: str) -> Optional[str]:
+        """Créateur d'une session, active ou fermée"""
+        raise NotImplementedError
+
+    def close_session(self, session_code: str) -> bool:
+        """Marque la session inactive; False si elle n'était pas active"""
+        raise NotImplementedError
+
+    def increment_player_count(self, session_code: str) -> None:
+        raise NotImplementedError
+
+    # Joueurs actifs et noms réservés (code de session normalisé, noms normalisés par normalize_username)
+    def reserved_names(self, session_code: str) -> Set[str]:
+        """Noms normalisés déjà réservés dans la session (joueurs connectés ou ayant un score)"""
+        raise NotImplementedError
+
+    def reserved_names_with_prefix(self, session_code: str, normalized_prefix: str) -> Set[str]:
+        """Noms normalisés réservés dans la session et commençant par `normalized_prefix`"""
+        raise NotImplementedError
+
+    def reserve_name(self, session_code: str, username: str, normalized_username: str, reserved_at: str) -> bool:
+        """Réserve un nom sans joueur actif (score enregistré); False s'il était déjà réservé"""
+        raise NotImplementedError
+
+    def add_active_player(self, session_code: str, username: str, normalized_username: str,
+                          connected_at: str) -> bool:
+        """Réservation du nom + joueur actif, atomiques; False si le nom est déjà réservé dans la session"""
+        raise NotImplementedError
+
+    def remove_active_player(self, session_code: str, username: str) -> None:
+        raise NotImplementedError
+
+    def touch_active_players(self, entries: List[Tuple[str, str, str]]) -> None:
+        """Dernière activité des joueurs actifs: [(session_code, username, last_seen)]"""
+        raise NotImplementedError
+
+    def expire_active_players(self, idle_before: str, limit: int, release_names: bool = True) -> List[Tuple[str, str]]:
+        """Retire au plus `limit` joueurs inactifs depuis `idle_before` et libère leur nom s'ils
+        n'ont pas de score (release_names=False: noms gardés, voir release_names());
+        retourne les (session_code, username) retirés"""
+        raise NotImplementedError
+
+    def release_names(self, session_code: str, normalized_usernames: List[str]) -> None:
+        """Libère des noms réservés de la session"""
+        raise NotImplementedError
+
+    def activity_counts(self, live_since: str, session_code: Optional[str] = None) -> Dict[str, Tuple[int, int]]:
+        """(actifs récemment, inactifs) par session"""
+        raise NotImplementedError
+
+    # Scores
+    def scored_names(self, session_code: str) -> Dict[str, str]:
+        """Joueurs ayant un score dans la session: {nom normalisé: username}"""
+        raise NotImplementedError
+
+    def insert_score(self, username: str, total_score: int, stars: int, mot_scores: str,
+                     completed_at: str, session_id: Optional[str]) -> None:
+        raise NotImplementedError
+
+    def leaderboard(self, limit: int) -> List[ScoreRow]:
+        """Meilleur score de chaque joueur, tous sessions confondues"""
+        raise NotImplementedError
+
+    def session_leaderboard(self, session_code: str, limit: int) -> List[ScoreRow]:
+        """Meilleur score de chaque joueur dans une session"""
+        raise NotImplementedError
+
+    def best_score(self, username: str) -> Optional[ScoreRow]:
+        raise NotImplementedError
+
+    # Statistiques agrégées (scope: 'global', 'session:<code>', 'trainer:<username>')
+    def record_stats(self, scopes: List[str], total_score: int, stars: int,
+                     mot_scores: Dict[str, int], choices: Dict[str, List[str]]) -> None:
+        """Ajoute une partie terminée aux agrégats de chaque scope"""
+        raise NotImplementedError
+
+    def get_stats(self, scope: str) -> Optional[Dict]:
+        """{'count', 'score_sum', 'best', 'worst', 'histograms': {métrique: {case: n}}} ou None"""
+        raise NotImplementedError
+
+
+def _user_from_row(row) -> User:
+    return User(
+        id=row[0],
+        username=row[1],
+        email=row[2],
+        password_hash=row[3],
+        salt=row[4],
+        role=row[5],
+        created_at=row[6],
+        last_login=row[7],
+        is_active=bool(row[8]),
+        is_kahoot_mode=bool(row[9]) if len(row) > 9 else False
+    )
+
+
+class SQLiteStorage(StorageBackend):
+    """Stockage SQLite (instrumenté par sql_profiler, configuré pour le multi-process)"""
+
+    name = 'sqlite'
+    durable = True
+
+    USER_COLUMNS = 'id, username, email, password_hash, salt, role, created_at, last_login, is_active, is_kahoot_mode'
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.init_schema()
+
+    def _connect(self):
+        return shared_store.configure(sql_profiler.connect(self.db_path, timeout=shared_store.busy_timeout))
+
+    def optimize(self) -> None:
+        """Met à jour les statistiques des index (ANALYZE ciblé) et replie le WAL dans la base"""
+        with self._connect() as conn:
+            conn.execute('PRAGMA optimize')
+            if shared_store.enabled:
+                # PASSIVE: n'attend pas les lecteurs en cours
+                conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+
+    def init_schema(self) -> None:
+        """Crée les tables et applique les migrations"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    email TEXT UNIQUE,
+                    password_hash TEXT,
+                    salt TEXT,
+                    role TEXT DEFAULT 'user',
+                    created_at TEXT NOT NULL,
+                    last_login TEXT,
+                    is_active BOOLEAN DEFAULT 1,
+                    is_kahoot_mode BOOLEAN DEFAULT 0
+                )
+            ''')
+
+            # Créer la table pour les sessions de jeu (Kahoot mode)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS game_sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_code TEXT UNIQUE NOT NULL,
+                    created_by TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    is_active BOOLEAN DEFAULT 1,
+                    player_count INTEGER DEFAULT 0
+                )
+            ''')
+
+            # Créer un index pour les sessions actives
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_session_code ON game_sessions(session_code)
+            ''')
+
+            # Créer la table pour le leaderboard (scores)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS game_scores (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT NOT NULL,
+                    total_score INTEGER NOT NULL,
+                    stars INTEGER NOT NULL,
+                    mot_scores TEXT NOT NULL,
+                    completed_at TEXT NOT NULL,
+                    session_id TEXT
+                )
+            ''')
+
+            # Créer un index pour les classements par session
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_total_score ON game_scores(total_score DESC)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_session_id ON game_scores(session_id)
+            ''')
+
+            # Créer la table pour les joueurs actifs (en cours de jeu)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS active_players (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_code TEXT NOT NULL,
+                    username TEXT NOT NULL,
+                    connected_at TEXT NOT NULL,
+                    last_seen TEXT,
+                    UNIQUE(session_code, username)
+                )
+            ''')
+            # Migration : dernière activité (heartbeat) des joueurs actifs
+            cursor.execute('PRAGMA table_info(active_players)')
+            if 'last_seen' not in [row[1] for row in cursor.fetchall()]:
+                logger.info("Migration: Adding last_seen column to active_players table")
+                cursor.execute('ALTER TABLE active_players ADD COLUMN last_seen TEXT')
+                cursor.execute('UPDATE active_players SET last_seen = connected_at')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_active_last_seen ON active_players(last_seen)
+            ''')
+
+            # Créer un index pour les recherches rapides
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_active_session_username ON active_players(session_code, username)
+            ''')
+
+            # Noms réservés par session: la clé primaire sur les colonnes normalisées fait foi
+            # (deux connexions simultanées avec le même nom, quel que soit le worker)
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'session_names'")
+            backfill = cursor.fetchone() is None
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS session_names (
+                    session_code TEXT NOT NULL,
+                    username_norm TEXT NOT NULL,
+                    username TEXT NOT NULL,
+                    reserved_at TEXT NOT NULL,
+                    PRIMARY KEY (session_code, username_norm)
+                ) WITHOUT ROWID
+            ''')
+            if backfill:
+                # Migration : réserver les noms déjà utilisés (normalisés en Python, comme à l'exécution)
+                cursor.execute('''
+                    SELECT session_code, username, connected_at FROM active_players
+                    UNION ALL
+                    SELECT session_id, username, completed_at FROM game_scores WHERE session_id IS NOT NULL
+                ''')
+                names = [(code.strip().upper(), normalize_username(username), username, at)
+                         for code, username, at in cursor.fetchall()]
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO session_names (session_code, username_norm, username, reserved_at)
+                    VALUES (?, ?, ?, ?)
+                ''', names)
+                if names:
+                    logger.info(f"Migration: {len(names)} noms réservés repris dans session_names")
+
+            # Statistiques agrégées, mises à jour à chaque fin de partie (lecture en O(1))
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats_aggregates'")
+            rebuild_stats = cursor.fetchone() is None
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS stats_aggregates (
+                    scope TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL,
+                    score_sum INTEGER NOT NULL,
+                    best INTEGER NOT NULL,
+                    worst INTEGER NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS stats_histograms (
+                    scope TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (scope, metric, bucket)
+                ) WITHOUT ROWID
+            ''')
+            if rebuild_stats:
+                self._rebuild_stats(cursor)
+
+            # Migration : Mettre à jour la structure de la table si nécessaire
+            try:
+                cursor.execute('PRAGMA table_info(users)')
+                columns_info = cursor.fetchall()
+                columns = [row[1] for row in columns_info]
+
+                # Vérifier et ajouter is_kahoot_mode si absent
+                if 'is_kahoot_mode' not in columns:
+                    logger.info("Migration: Adding is_kahoot_mode column to users table")
+                    cursor.execute('ALTER TABLE users ADD COLUMN is_kahoot_mode BOOLEAN DEFAULT 0')
+
+                # Migration : Vérifier les contraintes NOT NULL sur email et password_hash
+                # Si password_hash a NOT NULL, on doit recréer la table (SQLite ne permet pas de modifier les contraintes)
+                has_not_null_password = any(row[1] == 'password_hash' and row[3] == 1 for row in columns_info)
+                has_not_null_email = any(row[1] == 'email' and row[3] == 1 for row in columns_info)
+
+                if has_not_null_password or has_not_null_email:
+                    logger.info("Migration: Removing NOT NULL constraints from password_hash and email")
+                    # Créer une nouvelle table avec la bonne structure
+                    cursor.execute('''
+                        CREATE TABLE IF NOT EXISTS users_new (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            username TEXT UNIQUE NOT NULL,
+                            email TEXT UNIQUE,
+                            password_hash TEXT,
+                            salt TEXT,
+                            role TEXT DEFAULT 'user',
+                            created_at TEXT NOT NULL,
+                            last_login TEXT,
+                            is_active BOOLEAN DEFAULT 1,
+                            is_kahoot_mode BOOLEAN DEFAULT 0
+                        )
+                    ''')
+
+                    # Copier les données existantes
+                    cursor.execute('''
+                        INSERT INTO users_new (id, username, email, password_hash, salt, role, created_at, last_login, is_active, is_kahoot_mode)
+                        SELECT id, username, email, password_hash, salt, role, created_at, last_login, is_active,
+                               COALESCE(is_kahoot_mode, 0) as is_kahoot_mode
+                        FROM users
+                    ''')
+
+                    # Supprimer l'ancienne table et renommer la nouvelle
+                    cursor.execute('DROP TABLE users')
+                    cursor.execute('ALTER TABLE users_new RENAME TO users')
+                    logger.info("Migration: Table users restructured successfully")
+
+            except Exception as e:
+                logger.warning(f"Migration check failed (table may not exist yet): {e}")
+
+            conn.commit()
+
+    @staticmethod
+    def _rebuild_stats(cursor) -> None:
+        """Migration : agrégats recalculés depuis game_scores (les choix des parties passées ne sont pas connus)"""
+        cursor.execute('''
+            SELECT gs.total_score, gs.stars, gs.mot_scores, UPPER(TRIM(gs.session_id)), s.created_by
+            FROM game_scores gs
+            LEFT JOIN game_sessions s ON s.session_code = UPPER(TRIM(gs.session_id))
+        ''')
+        aggregates: Dict[str, Dict] = {}
+        for total_score, stars, mot_scores, session_code, trainer in cursor.fetchall():
+            try:
+                scores = json.loads(mot_scores) if mot_scores else {}
+            except ValueError:
+                scores = {}
+            accumulate_stats(aggregates, stats_scopes(session_code, trainer), total_score, stars, scores, {})
+        cursor.executemany('''
+            INSERT OR REPLACE INTO stats_aggregates (scope, count, score_sum, best, worst) VALUES (?, ?, ?, ?, ?)
+        ''', [(scope, a['count'], a['score_sum'], a['best'], a['worst']) for scope, a in aggregates.items()])
+        cursor.executemany('''
+            INSERT OR REPLACE INTO stats_histograms (scope, metric, bucket, count) VALUES (?, ?, ?, ?)
+        ''', [(scope, metric, bucket, count) for scope, a in aggregates.items()
+              for metric, histogram in a['histograms'].items() for bucket, count in histogram.items()])
+        if aggregates:
+            logger.info(f"Migration: statistiques agrégées recalculées ({len(aggregates)} scopes)")
+
+    # Utilisateurs
+    def count_users(self) -> int:
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def insert_user(self, username, email, password_hash, salt, role, created_at, kahoot_mode) -> None:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO users (username, email, password_hash, salt, role, created_at, is_kahoot_mode)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (username, email, password_hash, salt, role, created_at, kahoot_mode))
+            conn.commit()
+
+    def get_user_by_username(self, username: str) -> Optional[User]:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT {self.USER_COLUMNS} FROM users WHERE username = ?', (username,))
+            row = cursor.fetchone()
+            return _user_from_row(row) if row else None
+
+    def get_user_by_email(self, email: str) -> Optional[User]:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT {self.USER_COLUMNS} FROM users WHERE email = ?', (email,))
+            row = cursor.fetchone()
+            return _user_from_row(row) if row else None
+
+    def list_users(self) -> List[User]:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT {self.USER_COLUMNS} FROM users ORDER BY created_at DESC')
+            return [_user_from_row(row) for row in cursor.fetchall()]
+
+    def set_last_login(self, user_id: int, when: str) -> None:
+        with self._connect() as conn:
+            conn.execute('UPDATE users SET last_login = ? WHERE id = ?', (when, user_id))
+            conn.commit()
+
+    def set_password(self, user_id: int, password_hash: str, salt: str) -> None:
+        with self._connect() as conn:
+            conn.execute('UPDATE users SET password_hash = ?, salt = ? WHERE id = ?', (password_hash, salt, user_id))
+            conn.commit()
+
+    def deactivate_user(self, username: str) -> None:
+        with self._connect() as conn:
+            conn.execute('UPDATE users SET is_active = 0 WHERE username = ?', (username,))
+            conn.commit()
+
+    def usernames_with_prefix(self, prefix: str) -> Set[str]:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            # Plage sur l'index unique de username (LIKE ne l'utiliserait pas: insensible à la casse)
+            cursor.execute('SELECT username FROM users WHERE username >= ? AND username < ?',
+                           (prefix, prefix_upper_bound(prefix)))
+            return {row[0] for row in cursor.fetchall()}
+
+    # Sessions de jeu
+    def insert_session(self, session_code: str, created_by: str, created_at: str) -> None:
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT INTO game_sessions (session_code, created_by, created_at, is_active, player_count)
+                VALUES (?, ?, ?, 1, 0)
+            ''', (session_code, created_by, created_at))
+            # Les autres workers oublient leurs codes inconnus (registre des sessions)
+            shared_store.bump(conn, 'sessions')
+            conn.commit()
+
+    def get_session(self, session_code: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, session_code, created_by, created_at, is_active, player_count
+                FROM game_sessions
+                WHERE session_code = ? AND is_active = 1
+            ''', (session_code,))
+            row = cursor.fetchone()
+        if not row:
+            return None
+        return {
+            'id': row[0],
+            'session_code': row[1],
+            'created_by': row[2],
+            'created_at': row[3],
+            'is_active': bool(row[4]),
+            'player_count': row[5]
+        }
+
+    def session_creator(self, session_code: str) -> Optional[str]:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT created_by FROM game_sessions WHERE session_code = ?', (session_code,))
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def close_session(self, session_code: str) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                UPDATE game_sessions SET is_active = 0
+                WHERE session_code = ? AND is_active = 1
+            ''', (session_code,))
+            shared_store.bump(conn, 'sessions')
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def increment_player_count(self, session_code: str) -> None:
+        with self._connect() as conn:
+            conn.execute('''
+                UPDATE game_sessions
+                SET player_count = player_count + 1
+                WHERE session_code = ?
+            ''', (session_code,))
+            conn.commit()
+
+    # Joueurs actifs et noms réservés
+    def reserved_names(self, session_code: str) -> Set[str]:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT username_norm FROM session_names WHERE session_code = ?', (session_code,))
+            return {row[0] for row in cursor.fetchall()}
+
+    def reserved_names_with_prefix(self, session_code: str, normalized_prefix: str) -> Set[str]:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            # Plage sur la clé primaire (session_code, username_norm)
+            cursor.execute('''
+                SELECT username_norm FROM session_names
+                WHERE session_code = ? AND username_norm >= ? AND username_norm < ?
+            ''', (session_code, normalized_prefix, prefix_upper_bound(normalized_prefix)))
+            return {row[0] for row in cursor.fetchall()}
+
+    def reserve_name(self, session_code: str, username: str, normalized_username: str, reserved_at: str) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute('''
+                INSERT OR IGNORE INTO session_names (session_code, username_norm, username, reserved_at)
+                VALUES (?, ?, ?, ?)
+            ''', (session_code, normalized_username, username, reserved_at))
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def add_active_player(self, session_code: str, username: str, normalized_username: str,
+                          connected_at: str) -> bool:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            # La réservation ouvre la transaction d'écriture: un seul gagnant par nom, y compris entre workers
+            cursor.execute('''
+                INSERT OR IGNORE INTO session_names (session_code, username_norm, username, reserved_at)
+                VALUES (?, ?, ?, ?)
+            ''', (session_code, normalized_username, username, connected_at))
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return False
+            cursor.execute('''
+                INSERT OR REPLACE INTO active_players (session_code, username, connected_at, last_seen)
+                VALUES (?, ?, ?, ?)
+            ''', (session_code, username, connected_at, connected_at))
+            conn.commit()
+            return True
+
+    def remove_active_player(self, session_code: str, username: str) -> None:
+        with self._connect() as conn:
+            conn.execute('''
+                DELETE FROM active_players
+                WHERE UPPER(TRIM(session_code)) = ? AND username = ?
+            ''', (session_code, username))
+            conn.commit()
+
+    def touch_active_players(self, entries: List[Tuple[str, str, str]]) -> None:
+        with self._connect() as conn:
+            # Une seule transaction pour tous les heartbeats accumulés
+            conn.executemany('''
+                UPDATE active_players SET last_seen = ?
+                WHERE session_code = ? AND username = ? AND last_seen < ?
+            ''', [(last_seen, code, username, last_seen) for code, username, last_seen in entries])
+            conn.commit()
+
+    def expire_active_players(self, idle_before: str, limit: int, release_names: bool = True) -> List[Tuple[str, str]]:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                SELECT id, session_code, username FROM active_players
+                WHERE last_seen < ?
+                ORDER BY last_seen
+                LIMIT ?
+            ''', (idle_before, limit))
+            rows = cursor.fetchall()
+            if not rows:
+                conn.rollback()
+                return []
+            cursor.executemany('DELETE FROM active_players WHERE id = ?', [(row[0],) for row in rows])
+            if release_names:
+                # Nom libéré sauf si le joueur a un score dans la session (il reste au classement)
+                cursor.executemany('''
+                    DELETE FROM session_names
+                    WHERE session_code = ? AND username_norm = ?
+                      AND NOT EXISTS (SELECT 1 FROM game_scores WHERE session_id = ? AND username = ?)
+                ''', [(code, normalize_username(username), code, username) for _, code, username in rows])
+                for code in {row[1] for row in rows}:
+                    shared_store.bump(conn, f'names:{code}')
+            conn.commit()
+            return [(code, username) for _, code, username in rows]
+
+    def release_names(self, session_code: str, normalized_usernames: List[str]) -> None:
+        with self._connect() as conn:
+            conn.executemany('DELETE FROM session_names WHERE session_code = ? AND username_norm = ?',
+                             [(session_code, normalized) for normalized in normalized_usernames])
+            shared_store.bump(conn, f'names:{session_code}')
+            conn.commit()
+
+    def activity_counts(self, live_since: str, session_code: Optional[str] = None) -> Dict[str, Tuple[int, int]]:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            query = '''
+                SELECT session_code, SUM(last_seen >= ?), COUNT(*) FROM active_players
+                {where}
+                GROUP BY session_code
+            '''
+            if session_code:
+                cursor.execute(query.format(where='WHERE session_code = ?'), (live_since, session_code))
+            else:
+                cursor.execute(query.format(where=''), (live_since,))
+            return {code: (int(live), int(total - live)) for code, live, total in cursor.fetchall()}
+
+    # Scores
+    def scored_names(self, session_code: str) -> Dict[str, str]:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT DISTINCT username FROM game_scores WHERE session_id = ?', (session_code,))
+            return {normalize_username(row[0]): row[0] for row in cursor.fetchall()}
+
+    def insert_score(self, username, total_score, stars, mot_scores, completed_at, session_id) -> None:
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT INTO game_scores (username, total_score, stars, mot_scores, completed_at, session_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (username, total_score, stars, mot_scores, completed_at, session_id))
+            conn.commit()
+
+    def leaderboard(self, limit: int) -> List[ScoreRow]:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            # Récupérer le meilleur score de chaque utilisateur
+            # En cas d'égalité de score, on prend le plus récent
+            cursor.execute('''
+                SELECT
+                    username,
+                    MAX(total_score) as total_score,
+                    stars,
+                    mot_scores,
+                    MAX(completed_at) as completed_at
+                FROM game_scores
+                GROUP BY username
+                ORDER BY total_score DESC, completed_at ASC
+                LIMIT ?
+            ''', (limit,))
+
+            rows = []
+            for row in cursor.fetchall():
+                # Pour les scores avec enablers, on doit récupérer le stars du meilleur score
+                # On fait une sous-requête pour récupérer le stars du meilleur score de cet utilisateur
+                cursor2 = conn.cursor()
+                cursor2.execute('''
+                    SELECT stars, mot_scores
+                    FROM game_scores
+                    WHERE username = ? AND total_score = ?
+                    ORDER BY completed_at DESC
+                    LIMIT 1
+                ''', (row[0], row[1]))
+                best_row = cursor2.fetchone()
+                stars = best_row[0] if best_row else row[2]
+                mot_scores = best_row[1] if best_row else row[3]
+                rows.append((row[0], row[1], stars, mot_scores, row[4]))
+            return rows
+
+    def session_leaderboard(self, session_code: str, limit: int) -> List[ScoreRow]:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            # Filter strictly by session_id - only players who played in THIS specific session
+            # Use UPPER() to handle any case inconsistencies
+            cursor.execute('''
+                SELECT username, MAX(total_score) as max_score, MAX(stars) as max_stars,
+                       (SELECT mot_scores FROM game_scores
+                        WHERE username = gs.username
+                        AND UPPER(TRIM(session_id)) = ?
+                        ORDER BY total_score DESC LIMIT 1) as mot_scores,
+                       MIN(completed_at) as first_completed
+                FROM game_scores gs
+                WHERE UPPER(TRIM(session_id)) = ? AND session_id IS NOT NULL
+                GROUP BY username
+                ORDER BY max_score DESC, first_completed ASC
+                LIMIT ?
+            ''', (session_code, session_code, limit))
+            return [tuple(row) for row in cursor.fetchall()]
+
+    def best_score(self, username: str) -> Optional[ScoreRow]:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT username, total_score, stars, mot_scores, completed_at
+                FROM game_scores
+                WHERE username = ?
+                ORDER BY total_score DESC, completed_at ASC
+                LIMIT 1
+            ''', (username,))
+            row = cursor.fetchone()
+        return tuple(row) if row else None
+
+    def record_stats(self, scopes, total_score, stars, mot_scores, choices) -> None:
+        buckets = stats_buckets(stars, mot_scores, choices)
+        with self._connect() as conn:
+            # Incréments dans une transaction: cohérent entre workers, sans relecture
+            conn.executemany('''
+                INSERT INTO stats_aggregates (scope, count, score_sum, best, worst) VALUES (?, 1, ?, ?, ?)
+                ON CONFLICT(scope) DO UPDATE SET count = count + 1, score_sum = score_sum + excluded.score_sum,
+                    best = MAX(best, excluded.best), worst = MIN(worst, excluded.worst)
+            ''', [(scope, total_score, total_score, total_score) for scope in scopes])
+            conn.executemany('''
+                INSERT INTO stats_histograms (scope, metric, bucket, count) VALUES (?, ?, ?, 1)
+                ON CONFLICT(scope, metric, bucket) DO UPDATE SET count = count + 1
+            ''', [(scope, metric, bucket) for scope in scopes for metric, bucket in buckets])
+            conn.commit()
+
+    def get_stats(self, scope: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT count, score_sum, best, worst FROM stats_aggregates WHERE scope = ?', (scope,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            cursor.execute('SELECT metric, bucket, count FROM stats_histograms WHERE scope = ?', (scope,))
+            histograms: Dict[str, Dict[str, int]] = {}
+            for metric, bucket, count in cursor.fetchall():
+                histograms.setdefault(metric, {})[bucket] = count
+        return {'count': row[0], 'score_sum': row[1], 'best': row[2], 'worst': row[3], 'histograms': histograms}
+
+
+class MemoryStorage(StorageBackend):
+    """Stockage en mémoire du process (mêmes règles que SQLiteStorage, non durable)"""
+
+    name = 'memory'
+    durable = False
+
+    def __init__(self, db_path: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._users: Dict[int, User] = {}
+        self._users_by_name: Dict[str, User] = {}
+        self._users_by_email: Dict[str, User] = {}
+        self._sessions: Dict[str, Dict] = {}
+        self._active: Dict[str, Dict[str, List[str]]] = {}   # code -> nom normalisé -> [nom, connexion, activité]
+        self._names: Dict[str, Set[str]] = {}                      # code -> noms normalisés réservés
+        self._scores: List[ScoreRow] = []
+        self._scores_by_user: Dict[str, List[ScoreRow]] = {}
+        self._scores_by_session: Dict[str, List[ScoreRow]] = {}
+        self._stats: Dict[str, Dict] = {}
+        self._next_id = {'users': 1, 'sessions': 1}
+
+    def _allocate(self, table: str) -> int:
+        value = self._next_id[table]
+        self._next_id[table] = value + 1
+        return value
+
+    # Utilisateurs
+    def count_users(self) -> int:
+        return len(self._users)
+
+    def insert_user(self, username, email, password_hash, salt, role, created_at, kahoot_mode) -> None:
+        with self._lock:
+            if username in self._users_by_name:
+                raise ValueError('UNIQUE constraint failed: users.username')
+            if email is not None and email in self._users_by_email:
+                raise ValueError('UNIQUE constraint failed: users.email')
+            user = User(id=self._allocate('users'), username=username, email=email, password_hash=password_hash,
+                        salt=salt, role=role or 'user', created_at=created_at, is_kahoot_mode=bool(kahoot_mode))
+            self._users[user.id] = user
+            self._users_by_name[username] = user
+            if email is not None:
+                self._users_by_email[email] = user
+
+    def get_user_by_username(self, username: str) -> Optional[User]:
+        user = self._users_by_name.get(username)
+        return replace(user) if user else None
+
+    def get_user_by_email(self, email: str) -> Optional[User]:
+        user = self._users_by_email.get(email)
+        return replace(user) if user else None
+
+    def list_users(self) -> List[User]:
+        with self._lock:
+            users = [replace(user) for user in self._users.values()]
+        return sorted(users, key=lambda user: user.created_at, reverse=True)
+
+    def set_last_login(self, user_id: int, when: str) -> None:
+        with self._lock:
+            if user_id in self._users:
+                self._users[user_id].last_login = when
+
+    def set_password(self, user_id: int, password_hash: str, salt: str) -> None:
+        with self._lock:
+            if user_id in self._users:
+                self._users[user_id].password_hash = password_hash
+                self._users[user_id].salt = salt
+
+    def deactivate_user(self, username: str) -> None:
+        with self._lock:
+            if username in self._users_by_name:
+                self._users_by_name[username].is_active = False
+
+    def usernames_with_prefix(self, prefix: str) -> Set[str]:
+        with self._lock:
+            return {username for username in self._users_by_name if username.startswith(prefix)}
+
+    # Sessions de jeu
+    def insert_session(self, session_code: str, created_by: str, created_at: str) -> None:
+        with self._lock:
+            if session_code in self._sessions:
+                raise ValueError('UNIQUE constraint failed: game_sessions.session_code')
+            self._sessions[session_code] = {
+                'id': self._allocate('sessions'),
+                'session_code': session_code,
+                'created_by': created_by,
+                'created_at': created_at,
+                'is_active': True,
+                'player_count': 0
+            }
+
+    def get_session(self, session_code: str) -> Optional[Dict]:
+        data = self._sessions.get(session_code)
+        return dict(data) if data and data['is_active'] else None
+
+    def session_creator(self, session_code: str) -> Optional[str]:
+        data = self._sessions.get(session_code)
+        return data['created_by'] if data else None
+
+    def close_session(self, session_code: str) -> bool:
+        with self._lock:
+            data = self._sessions.get(session_code)
+            if not data or not data['is_active']:
+                return False
+            data['is_active'] = False
+            return True
+
+    def increment_player_count(self, session_code: str) -> None:
+        with self._lock:
+            if session_code in self._sessions:
+                self._sessions[session_code]['player_count'] += 1
+
+    # Joueurs actifs et noms réservés
+    def reserved_names(self, session_code: str) -> Set[str]:
+        with self._lock:
+            return set(self._names.get(session_code, ()))
+
+    def reserved_names_with_prefix(self, session_code: str, normalized_prefix: str) -> Set[str]:
+        with self._lock:
+            return {name for name in self._names.get(session_code, ()) if name.startswith(normalized_prefix)}
+
+    def reserve_name(self, session_code: str, username: str, normalized_username: str, reserved_at: str) -> bool:
+        with self._lock:
+            names = self._names.setdefault(session_code, set())
+            if normalized_username in names:
+                return False
+            names.add(normalized_username)
+            return True
+
+    def add_active_player(self, session_code: str, username: str, normalized_username: str,
+                          connected_at: str) -> bool:
+        with self._lock:
+            names = self._names.setdefault(session_code, set())
+            if normalized_username in names:
+                return False
+            names.add(normalized_username)
+            self._active.setdefault(session_code, {})[normalized_username] = [username, connected_at, connected_at]
+            return True
+
+    def remove_active_player(self, session_code: str, username: str) -> None:
+        with self._lock:
+            players = self._active.get(session_code, {})
+            normalized = normalize_username(username)
+            if normalized in players and players[normalized][0] == username:
+                del players[normalized]
+
+    def touch_active_players(self, entries: List[Tuple[str, str, str]]) -> None:
+        with self._lock:
+            for code, username, last_seen in entries:
+                entry = self._active.get(code, {}).get(normalize_username(username))
+                if entry is not None and entry[0] == username and entry[2] < last_seen:
+                    entry[2] = last_seen
+
+    def expire_active_players(self, idle_before: str, limit: int, release_names: bool = True) -> List[Tuple[str, str]]:
+        with self._lock:
+            idle = sorted((entry[2], code, normalized) for code, players in self._active.items()
+                          for normalized, entry in players.items() if entry[2] < idle_before)[:limit]
+            removed = []
+            for _, code, normalized in idle:
+                username = self._active[code].pop(normalized)[0]
+                if release_names and not any(row[0] == username for row in self._scores_by_session.get(code, ())):
+                    self._names.get(code, set()).discard(normalized)
+                removed.append((code, username))
+            return removed
+
+    def release_names(self, session_code: str, normalized_usernames: List[str]) -> None:
+        with self._lock:
+            names = self._names.get(session_code, set())
+            for normalized in normalized_usernames:
+                names.discard(normalized)
+
+    def activity_counts(self, live_since: str, session_code: Optional[str] = None) -> Dict[str, Tuple[int, int]]:
+        with self._lock:
+            sessions = [session_code] if session_code else list(self._active)
+            counts = {}
+            for code in sessions:
+                players = self._active.get(code)
+                if players:
+                    live = sum(1 for entry in players.values() if entry[2] >= live_since)
+                    counts[code] = (live, len(players) - live)
+            return counts
+
+    # Scores
+    def scored_names(self, session_code: str) -> Dict[str, str]:
+        with self._lock:
+            return {normalize_username(row[0]): row[0] for row in self._scores_by_session.get(session_code, ())}
+
+    def insert_score(self, username, total_score, stars, mot_scores, completed_at, session_id) -> None:
+        row = (username, total_score, stars, mot_scores, completed_at)
+        with self._lock:
+            self._scores.append(row)
+            self._scores_by_user.setdefault(username, []).append(row)
+            if session_id:
+                code = session_id.strip().upper()
+                self._scores_by_session.setdefault(code, []).append(row)
+
+    def leaderboard(self, limit: int) -> List[ScoreRow]:
+        with self._lock:
+            per_user = {username: list(rows) for username, rows in self._scores_by_user.items()}
+        rows = []
+        for username, scores in per_user.items():
+            best = max(row[1] for row in scores)
+            # stars/mot_scores du meilleur score le plus récent, date = dernière partie (comme en SQL)
+            best_row = max((row for row in scores if row[1] == best), key=lambda row: row[4])
+            rows.append((username, best, best_row[2], best_row[3], max(row[4] for row in scores)))
+        rows.sort(key=lambda row: (-row[1], row[4]))
+        return rows[:limit]
+
+    def session_leaderboard(self, session_code: str, limit: int) -> List[ScoreRow]:
+        with self._lock:
+            scores = list(self._scores_by_session.get(session_code, ()))
+        per_user: Dict[str, List[ScoreRow]] = {}
+        for row in scores:
+            per_user.setdefault(row[0], []).append(row)
+        rows = []
+        for username, user_scores in per_user.items():
+            best_row = max(user_scores, key=lambda row: row[1])
+            rows.append((username, best_row[1], max(row[2] for row in user_scores), best_row[3],
+                         min(row[4] for row in user_scores)))
+        rows.sort(key=lambda row: (-row[1], row[4]))
+        return rows[:limit]
+
+    def best_score(self, username: str) -> Optional[ScoreRow]:
+        scores = self._scores_by_user.get(username)
+        if not scores:
+            return None
+        return min(scores, key=lambda row: (-row[1], row[4]))
+
+    def record_stats(self, scopes, total_score, stars, mot_scores, choices) -> None:
+        with self._lock:
+            accumulate_stats(self._stats, scopes, total_score, stars, mot_scores, choices)
+
+    def get_stats(self, scope: str) -> Optional[Dict]:
+        with self._lock:
+            aggregate = self._stats.get(scope)
+            if aggregate is None:
+                return None
+            return dict(aggregate, histograms={metric: dict(histogram)
+                                               for metric, histogram in aggregate['histograms'].items()})
+
+
+# Backends disponibles: nom -> fabrique(db_path)
+BACKENDS: Dict[str, Callable[[str], StorageBackend]] = {
+    'sqlite': SQLiteStorage,
+    'memory': MemoryStorage,
+}
+
+
+def register_backend(name: str, factory: Callable[[str], StorageBackend]) -> None:
+    """Déclare un backend supplémentaire (ex. base client-serveur)"""
+    BACKENDS[name] = factory
+
+
+def parse_storage_spec(spec: str) -> Dict[str, str]:
+    """'sqlite,active_players=memory' -> backend par groupe"""
+    default, overrides = 'sqlite', {}
+    for item in (spec or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if '=' in item:
+            group, backend = (part.strip() for part in item.split('=', 1))
+            if group not in GROUPS:
+                raise ValueError(f"Groupe de stockage inconnu: {group} (attendu: {', '.join(GROUPS)})")
+            overrides[group] = backend
+        else:
+            default = item
+    mapping = {group: overrides.get(group, default) for group in GROUPS}
+    for backend in mapping.values():
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend de stockage inconnu: {backend} (disponibles: {', '.join(BACKENDS)})")
+    return mapping
+
+
+def build_storage(spec: str, db_path: str) -> Dict[str, StorageBackend]:
+    """Instancie les backends (une instance par backend, partagée entre ses groupes)"""
+    mapping = parse_storage_spec(spec)
+    instances: Dict[str, StorageBackend] = {}
+    for backend in dict.fromkeys(mapping.values()):
+        instances[backend] = BACKENDS[backend](db_path)
+    if shared_store.enabled and any(not instance.durable for instance in instances.values()):
+        logger.warning("SHARED_STATE=1 avec un stockage en mémoire: ces données ne sont pas partagées entre workers")
+    return {group: instances[backend] for group, backend in mapping.items()}
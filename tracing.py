@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tracing - Traces de debug par canal, activables à chaud
+Remplace les print("DEBUG ...") du hot path: un canal désactivé ne coûte
+qu'un test booléen, et les arguments ne sont formatés que si la trace est émise.
+
+Usage:
+    trace_enablers = tracer.channel('enablers')
+    trace_enablers("choice %s unlocks %s", choice_id, enablers)
+    if trace_enablers:
+        trace_enablers("keys=%s", list(big_dict.keys()))   # calcul coûteux protégé
+
+Activation:
+    TRACE_CHANNELS=scoring,enablers  (ou "all") au démarrage
+    POST /api/admin/trace  à chaud, globalement ou pour un code de session
+"""
+
+import contextvars
+import logging
+import os
+from typing import Callable, Dict, Optional, Set
+
+# Code de session Kahoot de la requête en cours (pour l'activation par session)
+_current_session: contextvars.ContextVar = contextvars.ContextVar('trace_session', default=None)
+
+DEFAULT_CHANNELS = ('scoring', 'enablers', 'dashboard', 'leaderboard')
+
+
+class lazy:
+    """Argument calculé uniquement si la trace est formatée"""
+    __slots__ = ('func',)
+
+    def __init__(self, func: Callable[[], object]):
+        self.func = func
+
+    def __str__(self) -> str:
+        return str(self.func())
+
+    __repr__ = __str__
+
+
+class TraceChannel:
+    """Canal de trace nommé (faux quand désactivé pour la requête courante)"""
+    __slots__ = ('name', 'enabled', 'sessions', 'logger')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.enabled = False
+        self.sessions: Set[str] = set()
+        self.logger = logging.getLogger(f"trace.{name}")
+
+    def __bool__(self) -> bool:
+        if self.enabled:
+            return True
+        return bool(self.sessions) and _current_session.get() in self.sessions
+
+    def __call__(self, msg: str, *args) -> None:
+        if self.enabled or (self.sessions and _current_session.get() in self.sessions):
+            self.logger.info(msg, *args)
+
+
+class Tracer:
+    """Registre des canaux de trace"""
+
+    def __init__(self, spec: str = ''):
+        self.channels: Dict[str, TraceChannel] = {}
+        for name in DEFAULT_CHANNELS:
+            self.channel(name)
+        self.configure(spec)
+
+    def channel(self, name: str) -> TraceChannel:
+        """Retourne (en le créant si besoin) le canal `name`"""
+        if name not in self.channels:
+            self.channels[name] = TraceChannel(name)
+        return self.channels[name]
+
+    def configure(self, spec: str) -> None:
+        """Active les canaux listés dans `spec` ("scoring,enablers" ou "all")"""
+        names = [n.strip() for n in (spec or '').split(',') if n.strip()]
+        if 'all' in names:
+            names = list(self.channels)
+        for name in names:
+            self.set(name, True)
+
+    def set(self, name: str, enabled: bool, session_code: Optional[str] = None) -> bool:
+        """Active/désactive un canal, globalement ou pour une seule session"""
+        if name not in self.channels:
+            return False
+        channel = self.channels[name]
+        if session_code:
+            code = session_code.upper().strip()
+            if enabled:
+                channel.sessions.add(code)
+            else:
+                channel.sessions.discard(code)
+        else:
+            channel.enabled = enabled
+            if not enabled:
+                channel.sessions.clear()
+        return True
+
+    def status(self) -> Dict[str, Dict]:
+        """État de chaque canal"""
+        return {
+            name: {'enabled': ch.enabled, 'sessions': sorted(ch.sessions)}
+            for name, ch in self.channels.items()
+        }
+
+    @staticmethod
+    def bind_session(session_code: Optional[str]) -> None:
+        """Associe la requête courante à un code de session"""
+        _current_session.set(session_code.upper() if session_code else None)
+
+
+# Instance globale
+tracer = Tracer(os.environ.get('TRACE_CHANNELS', ''))
@@ -4,185 +4,46 @@ Système d'authentification pour AI Acceleration EXEC
 Gestion des utilisateurs avec mots de passe hashés
 """
 
-import sqlite3
 import hashlib
 import secrets
 import logging
 import os
 from typing import Optional, Tuple, List, Dict
-from dataclasses import dataclass
 from datetime import datetime
+from log_pipeline import configure_logging
+from storage_backends import User, build_storage, normalize_username, stats_scopes
+from session_registry import MISSING, SessionRegistry, UsernameRegistry
 
+configure_logging()
 logger = logging.getLogger(__name__)
 
-@dataclass
-class User:
-    """Représente un utilisateur"""
-    id: int
-    username: str
-    email: Optional[str]
-    password_hash: Optional[str]
-    salt: Optional[str]
-    role: str
-    created_at: str
-    last_login: Optional[str] = None
-    is_active: bool = True
-    is_kahoot_mode: bool = False
-
 class UserManager:
     """Gestionnaire des utilisateurs avec authentification sécurisée"""
     
-    def __init__(self, db_path: str = "users.db"):
+    def __init__(self, db_path: str = "users.db", storage: str = "sqlite",
+                 session_registry: Optional[SessionRegistry] = None, username_cache_sessions: int = 1000):
         self.db_path = db_path
+        self.storage_spec = storage
+        # Cache des sessions actives et des codes inconnus (validate_session, login)
+        self.session_registry = session_registry or SessionRegistry()
+        self.username_cache_sessions = username_cache_sessions
         self.init_database()
     
     def init_database(self):
         """Initialise la base de données des utilisateurs"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS users (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        username TEXT UNIQUE NOT NULL,
-                        email TEXT UNIQUE,
-                        password_hash TEXT,
-                        salt TEXT,
-                        role TEXT DEFAULT 'user',
-                        created_at TEXT NOT NULL,
-                        last_login TEXT,
-                        is_active BOOLEAN DEFAULT 1,
-                        is_kahoot_mode BOOLEAN DEFAULT 0
-                    )
-                ''')
-                
-                # Créer la table pour les sessions de jeu (Kahoot mode)
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS game_sessions (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        session_code TEXT UNIQUE NOT NULL,
-                        created_by TEXT NOT NULL,
-                        created_at TEXT NOT NULL,
-                        is_active BOOLEAN DEFAULT 1,
-                        player_count INTEGER DEFAULT 0
-                    )
-                ''')
-                
-                # Créer un index pour les sessions actives
-                cursor.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_session_code ON game_sessions(session_code)
-                ''')
-                
-                # Créer la table pour le leaderboard (scores)
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS game_scores (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        username TEXT NOT NULL,
-                        total_score INTEGER NOT NULL,
-                        stars INTEGER NOT NULL,
-                        mot_scores TEXT NOT NULL,
-                        completed_at TEXT NOT NULL,
-                        session_id TEXT
-                    )
-                ''')
-                
-                # Créer un index pour les classements par session
-                cursor.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_total_score ON game_scores(total_score DESC)
-                ''')
-                cursor.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_session_id ON game_scores(session_id)
-                ''')
-                
-                # Authoritative per-user progress within a session
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS player_progress (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        session_code TEXT NOT NULL,
-                        username TEXT NOT NULL,
-                        current_step INTEGER NOT NULL DEFAULT 1,
-                        completed BOOLEAN NOT NULL DEFAULT 0,
-                        updated_at TEXT NOT NULL,
-                        UNIQUE(session_code, username)
-                    )
-                ''')
-                cursor.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_progress_session_user ON player_progress(session_code, username)
-                ''')
-
-                # Créer la table pour les joueurs actifs (en cours de jeu)
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS active_players (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        session_code TEXT NOT NULL,
-                        username TEXT NOT NULL,
-                        connected_at TEXT NOT NULL,
-                        UNIQUE(session_code, username)
-                    )
-                ''')
-                
-                # Créer un index pour les recherches rapides
-                cursor.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_active_session_username ON active_players(session_code, username)
-                ''')
-                
-                # Migration : Mettre à jour la structure de la table si nécessaire
-                try:
-                    cursor.execute('PRAGMA table_info(users)')
-                    columns_info = cursor.fetchall()
-                    columns = [row[1] for row in columns_info]
-                    
-                    # Vérifier et ajouter is_kahoot_mode si absent
-                    if 'is_kahoot_mode' not in columns:
-                        logger.info("Migration: Adding is_kahoot_mode column to users table")
-                        cursor.execute('ALTER TABLE users ADD COLUMN is_kahoot_mode BOOLEAN DEFAULT 0')
-                    
-                    # Migration : Vérifier les contraintes NOT NULL sur email et password_hash
-                    # Si password_hash a NOT NULL, on doit recréer la table (SQLite ne permet pas de modifier les contraintes)
-                    has_not_null_password = any(row[1] == 'password_hash' and row[3] == 1 for row in columns_info)
-                    has_not_null_email = any(row[1] == 'email' and row[3] == 1 for row in columns_info)
-                    
-                    if has_not_null_password or has_not_null_email:
-                        logger.info("Migration: Removing NOT NULL constraints from password_hash and email")
-                        # Créer une nouvelle table avec la bonne structure
-                        cursor.execute('''
-                            CREATE TABLE IF NOT EXISTS users_new (
-                                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                username TEXT UNIQUE NOT NULL,
-                                email TEXT UNIQUE,
-                                password_hash TEXT,
-                                salt TEXT,
-                                role TEXT DEFAULT 'user',
-                                created_at TEXT NOT NULL,
-                                last_login TEXT,
-                                is_active BOOLEAN DEFAULT 1,
-                                is_kahoot_mode BOOLEAN DEFAULT 0
-                            )
-                        ''')
-                        
-                        # Copier les données existantes
-                        cursor.execute('''
-                            INSERT INTO users_new (id, username, email, password_hash, salt, role, created_at, last_login, is_active, is_kahoot_mode)
-                            SELECT id, username, email, password_hash, salt, role, created_at, last_login, is_active, 
-                                   COALESCE(is_kahoot_mode, 0) as is_kahoot_mode
-                            FROM users
-                        ''')
-                        
-                        # Supprimer l'ancienne table et renommer la nouvelle
-                        cursor.execute('DROP TABLE users')
-                        cursor.execute('ALTER TABLE users_new RENAME TO users')
-                        logger.info("Migration: Table users restructured successfully")
-                    
-                except Exception as e:
-                    logger.warning(f"Migration check failed (table may not exist yet): {e}")
-                
-                conn.commit()
-                
-                # Créer un utilisateur admin par défaut si aucun utilisateur n'existe
-                cursor.execute('SELECT COUNT(*) FROM users')
-                if cursor.fetchone()[0] == 0:
-                    self.create_default_admin()
-                    
+            # Backend par groupe de données (voir storage_backends.py)
+            self.storage = build_storage(self.storage_spec, self.db_path)
+            self.users = self.storage['users']
+            self.sessions = self.storage['sessions']
+            self.active_players = self.storage['active_players']
+            self.scores = self.storage['scores']
+            # Noms pris par session, en mémoire (réservation via la contrainte d'unicité du stockage)
+            self.usernames = UsernameRegistry(self.active_players, max_sessions=self.username_cache_sessions,
+                                              scores=self.scores if self.scores is not self.active_players else None)
+            # Créer un utilisateur admin par défaut si aucun utilisateur n'existe
+            if self.users.count_users() == 0:
+                self.create_default_admin()
         except Exception as e:
             logger.error(f"Erreur lors de l'initialisation de la base de données: {e}")
             raise
@@ -240,13 +101,7 @@ class UserManager:
                 password_hash, salt = self.hash_password(password)
             
             # Insérer dans la base de données
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO users (username, email, password_hash, salt, role, created_at, is_kahoot_mode)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (username, email, password_hash, salt, role, datetime.now().isoformat(), kahoot_mode))
-                conn.commit()
+            self.users.insert_user(username, email, password_hash, salt, role, datetime.now().isoformat(), kahoot_mode)
             
             logger.info(f"Utilisateur {username} créé avec succès (mode: {'Kahoot' if kahoot_mode else 'Normal'})")
             return True
@@ -261,35 +116,39 @@ class UserManager:
         Si session_code est fourni, vérifie l'unicité uniquement dans cette session.
         Sinon, vérifie l'unicité globale dans la table users.
         """
-        username = base_username.strip()
-        original_username = username
-        
-        if session_code:
-            # Vérifier l'unicité dans la session spécifique (via game_scores)
-            counter = 1
-            while self.username_exists_in_session(username, session_code):
-                username = f"{original_username}{counter}"
-                counter += 1
-                # Limite de sécurité pour éviter une boucle infinie
-                if counter > 9999:
-                    # Utiliser un timestamp comme fallback
-                    import time
-                    username = f"{original_username}_{int(time.time())}"
-                    break
-        else:
-            # Vérifier l'unicité globale dans la table users
-            counter = 1
-            while self.get_user_by_username(username):
-                username = f"{original_username}{counter}"
-                counter += 1
-                # Limite de sécurité pour éviter une boucle infinie
-                if counter > 9999:
-                    # Utiliser un timestamp comme fallback
-                    import time
-                    username = f"{original_username}_{int(time.time())}"
-                    break
+        suggestions = self.suggest_usernames(base_username, session_code, count=1)
+        return suggestions[0] if suggestions else base_username.strip()
+    
+    def suggest_usernames(self, base_username: str, session_code: str = None, count: int = 3) -> List[str]:
+        """Propose `count` usernames libres: le nom lui-même s'il est libre, puis nom1, nom2...
         
-        return username
+        Les noms existants qui partagent le préfixe sont lus en une seule requête par plage
+        (index de session_names ou de users), quel que soit le nombre de collisions.
+        """
+        base = base_username.strip()
+        try:
+            if session_code:
+                # Unicité dans la session, insensible à la casse/espaces
+                prefix = normalize_username(base)
+                normalized_code = session_code.upper().strip()
+                taken = self.active_players.reserved_names_with_prefix(normalized_code, prefix)
+                if self.scores is not self.active_players:
+                    # Scores dans un autre stockage (STORAGE_BACKEND mixte)
+                    taken |= {name for name in self.scores.scored_names(normalized_code) if name.startswith(prefix)}
+            else:
+                # Unicité globale dans la table users
+                prefix = base
+                taken = self.users.usernames_with_prefix(prefix)
+        except Exception as e:
+            logger.error(f"Erreur lors de la recherche de noms libres pour {base}: {e}")
+            return []
+        suggestions = [] if prefix in taken else [base]
+        counter = 1
+        while len(suggestions) < count:
+            if f"{prefix}{counter}" not in taken:
+                suggestions.append(f"{base}{counter}")
+            counter += 1
+        return suggestions
     
     def username_exists_in_session(self, username: str, session_code: str) -> bool:
         """Vérifie (insensible à la casse/espaces) si un username existe déjà dans une session donnée.
@@ -297,23 +156,8 @@ class UserManager:
         """
         try:
             normalized_code = session_code.upper().strip()
-            normalized_username = username.strip().lower()
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                # Comparaison insensible à la casse/espaces sur username, et session normalisé
-                cursor.execute('''
-                    SELECT COUNT(*) FROM (
-                        SELECT username FROM active_players
-                        WHERE UPPER(TRIM(session_code)) = ?
-                          AND LOWER(TRIM(username)) = ?
-                        UNION
-                        SELECT username FROM game_scores
-                        WHERE UPPER(TRIM(session_id)) = ?
-                          AND LOWER(TRIM(username)) = ?
-                    )
-                ''', (normalized_code, normalized_username, normalized_code, normalized_username))
-                count = cursor.fetchone()[0]
-                return count > 0
+            # Comparaison insensible à la casse/espaces, en mémoire (noms chargés au premier accès)
+            return self.usernames.is_taken(normalized_code, normalize_username(username))
         except Exception as e:
             logger.error(f"Erreur lors de la vérification du username dans la session: {e}")
             return False
@@ -322,25 +166,13 @@ class UserManager:
         """Enregistre un joueur actif dans une session (appelé à la connexion)"""
         try:
             normalized_code = session_code.upper().strip()
-            normalized_username = username.strip().lower()
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                # Refus si un joueur existe déjà avec le même username (insensible à la casse)
-                cursor.execute('''
-                    SELECT 1 FROM active_players
-                    WHERE UPPER(TRIM(session_code)) = ? AND LOWER(TRIM(username)) = ?
-                    LIMIT 1
-                ''', (normalized_code, normalized_username))
-                if cursor.fetchone():
-                    logger.info(f"Duplicate active username refused (case-insensitive): {username} in session {normalized_code}")
-                    return False
-                cursor.execute('''
-                    INSERT OR REPLACE INTO active_players (session_code, username, connected_at)
-                    VALUES (?, ?, ?)
-                ''', (normalized_code, username, datetime.now().isoformat()))
-                conn.commit()
-                logger.info(f"Joueur actif enregistré: {username} dans la session {normalized_code}")
-                return True
+            # Réservation atomique du nom (insensible à la casse), y compris entre workers
+            if not self.usernames.reserve(normalized_code, username, normalize_username(username),
+                                          datetime.now().isoformat()):
+                logger.info(f"Duplicate active username refused (case-insensitive): {username} in session {normalized_code}")
+                return False
+            logger.info(f"Joueur actif enregistré: {username} dans la session {normalized_code}")
+            return True
         except Exception as e:
             logger.error(f"Erreur lors de l'enregistrement du joueur actif: {e}")
             return False
@@ -349,72 +181,57 @@ class UserManager:
         """Retire un joueur actif d'une session (appelé quand le jeu est terminé)"""
         try:
             normalized_code = session_code.upper().strip()
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    DELETE FROM active_players
-                    WHERE UPPER(TRIM(session_code)) = ? AND username = ?
-                ''', (normalized_code, username))
-                conn.commit()
-                logger.info(f"Joueur actif retiré: {username} de la session {normalized_code}")
-                return True
+            self.active_players.remove_active_player(normalized_code, username)
+            logger.info(f"Joueur actif retiré: {username} de la session {normalized_code}")
+            return True
         except Exception as e:
             logger.error(f"Erreur lors de la suppression du joueur actif: {e}")
             return False
 
-    # Authoritative progress helpers
-    def upsert_progress(self, username: str, session_code: str, current_step: int) -> None:
+    def touch_active_players(self, entries: List[Tuple[str, str, str]]) -> bool:
+        """Enregistre la dernière activité des joueurs actifs [(session_code, username, last_seen)]"""
         try:
-            normalized_code = session_code.upper().strip()
-            now = datetime.now().isoformat()
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO player_progress (session_code, username, current_step, completed, updated_at)
-                    VALUES (?, ?, ?, 0, ?)
-                    ON CONFLICT(session_code, username)
-                    DO UPDATE SET current_step=excluded.current_step, updated_at=excluded.updated_at
-                ''', (normalized_code, username, max(1, min(5, int(current_step))), now))
-                conn.commit()
+            self.active_players.touch_active_players(entries)
+            return True
         except Exception as e:
-            logger.error(f"Erreur upsert_progress: {e}")
-
-    def mark_completed(self, username: str, session_code: str) -> None:
+            logger.error(f"Erreur lors de l'enregistrement de l'activité des joueurs: {e}")
+            return False
+    
+    def expire_idle_players(self, idle_before: str, limit: int = 500) -> List[Tuple[str, str]]:
+        """Retire un lot de joueurs inactifs depuis `idle_before` (leur nom est libéré s'ils n'ont pas de score)"""
         try:
-            normalized_code = session_code.upper().strip()
-            now = datetime.now().isoformat()
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE player_progress
-                    SET completed = 1, current_step = 5, updated_at = ?
-                    WHERE session_code = ? AND username = ?
-                ''', (now, normalized_code, username))
-                conn.commit()
+            split = self.scores is not self.active_players
+            removed = self.active_players.expire_active_players(idle_before, limit, release_names=not split)
+            for code in {code for code, _ in removed}:
+                if split:
+                    # Scores dans un autre stockage: seuls les noms sans score sont libérés
+                    scored = self.scores.scored_names(code)
+                    self.active_players.release_names(code, [normalize_username(username) for session_code, username
+                                                             in removed if session_code == code
+                                                             and normalize_username(username) not in scored])
+                self.usernames.invalidate(code)
+            if removed:
+                logger.info(f"Joueurs inactifs retirés: {len(removed)}")
+            return removed
         except Exception as e:
-            logger.error(f"Erreur mark_completed: {e}")
-
-    def get_next_step(self, username: str, session_code: str) -> Dict:
-        """Retourne le prochain step autorisé pour cet utilisateur dans la session."""
+            logger.error(f"Erreur lors du retrait des joueurs inactifs: {e}")
+            return []
+    
+    def get_session_activity(self, live_since: str, session_code: str = None) -> Dict[str, Dict[str, int]]:
+        """Joueurs actifs par session: live (activité depuis `live_since`) et idle"""
         try:
-            normalized_code = session_code.upper().strip()
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT current_step, completed FROM player_progress
-                    WHERE session_code = ? AND username = ?
-                ''', (normalized_code, username))
-                row = cursor.fetchone()
-                if not row:
-                    return { 'next_step': 1, 'completed': False }
-                current_step, completed = row
-                if completed:
-                    return { 'next_step': 6, 'completed': True }
-                return { 'next_step': max(2, min(6, int(current_step) + 1)), 'completed': False }
+            code = session_code.upper().strip() if session_code else None
+            counts = self.active_players.activity_counts(live_since, code)
+            return {code: {'live': live, 'idle': idle} for code, (live, idle) in counts.items()}
         except Exception as e:
-            logger.error(f"Erreur get_next_step: {e}")
-            return { 'next_step': 1, 'completed': False }
-    
+            logger.error(f"Erreur lors du comptage des joueurs actifs: {e}")
+            return {}
+
+    def optimize_database(self) -> None:
+        """Maintenance du stockage (tâche du planificateur, voir scheduler.py)"""
+        for backend in {id(backend): backend for backend in self.storage.values()}.values():
+            backend.optimize()
+
     def authenticate_user(self, username: str, password: str = None) -> Tuple[bool, Optional[User]]:
         """Authentifie un utilisateur (mode normal avec password ou mode Kahoot sans)"""
         try:
@@ -468,29 +285,7 @@ class UserManager:
     def get_user_by_username(self, username: str) -> Optional[User]:
         """Récupère un utilisateur par son nom d'utilisateur"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT id, username, email, password_hash, salt, role, created_at, last_login, is_active, is_kahoot_mode
-                    FROM users WHERE username = ?
-                ''', (username,))
-                
-                row = cursor.fetchone()
-                if row:
-                    return User(
-                        id=row[0],
-                        username=row[1],
-                        email=row[2],
-                        password_hash=row[3],
-                        salt=row[4],
-                        role=row[5],
-                        created_at=row[6],
-                        last_login=row[7],
-                        is_active=bool(row[8]),
-                        is_kahoot_mode=bool(row[9]) if len(row) > 9 else False
-                    )
-                return None
-                
+            return self.users.get_user_by_username(username)
         except Exception as e:
             logger.error(f"Erreur lors de la récupération de l'utilisateur {username}: {e}")
             return None
@@ -498,29 +293,7 @@ class UserManager:
     def get_user_by_email(self, email: str) -> Optional[User]:
         """Récupère un utilisateur par son email"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT id, username, email, password_hash, salt, role, created_at, last_login, is_active, is_kahoot_mode
-                    FROM users WHERE email = ?
-                ''', (email,))
-                
-                row = cursor.fetchone()
-                if row:
-                    return User(
-                        id=row[0],
-                        username=row[1],
-                        email=row[2],
-                        password_hash=row[3],
-                        salt=row[4],
-                        role=row[5],
-                        created_at=row[6],
-                        last_login=row[7],
-                        is_active=bool(row[8]),
-                        is_kahoot_mode=bool(row[9]) if len(row) > 9 else False
-                    )
-                return None
-                
+            return self.users.get_user_by_email(email)
         except Exception as e:
             logger.error(f"Erreur lors de la récupération de l'utilisateur par email {email}: {e}")
             return None
@@ -528,41 +301,14 @@ class UserManager:
     def update_last_login(self, user_id: int):
         """Met à jour la dernière connexion d'un utilisateur"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE users SET last_login = ? WHERE id = ?
-                ''', (datetime.now().isoformat(), user_id))
-                conn.commit()
+            self.users.set_last_login(user_id, datetime.now().isoformat())
         except Exception as e:
             logger.error(f"Erreur lors de la mise à jour de la dernière connexion: {e}")
     
     def get_all_users(self) -> List[User]:
         """Récupère tous les utilisateurs"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT id, username, email, password_hash, salt, role, created_at, last_login, is_active, is_kahoot_mode
-                    FROM users ORDER BY created_at DESC
-                ''')
-                
-                users = []
-                for row in cursor.fetchall():
-                    users.append(User(
-                        id=row[0],
-                        username=row[1],
-                        email=row[2],
-                        password_hash=row[3],
-                        salt=row[4],
-                        role=row[5],
-                        created_at=row[6],
-                        last_login=row[7],
-                        is_active=bool(row[8]),
-                        is_kahoot_mode=bool(row[9]) if len(row) > 9 else False
-                    ))
-                return users
-                
+            return self.users.list_users()
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des utilisateurs: {e}")
             return []
@@ -583,12 +329,7 @@ class UserManager:
             new_password_hash, new_salt = self.hash_password(new_password)
             
             # Mettre à jour dans la base de données
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE users SET password_hash = ?, salt = ? WHERE id = ?
-                ''', (new_password_hash, new_salt, user.id))
-                conn.commit()
+            self.users.set_password(user.id, new_password_hash, new_salt)
             
             logger.info(f"Mot de passe changé avec succès pour {username}")
             return True
@@ -600,12 +341,7 @@ class UserManager:
     def deactivate_user(self, username: str) -> bool:
         """Désactive un utilisateur"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE users SET is_active = 0 WHERE username = ?
-                ''', (username,))
-                conn.commit()
+            self.users.deactivate_user(username)
             
             logger.info(f"Utilisateur {username} désactivé")
             return True
@@ -620,20 +356,12 @@ class UserManager:
             import json
             # Normaliser le session_id en uppercase pour cohérence
             normalized_session_id = session_id.upper().strip() if session_id else None
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO game_scores (username, total_score, stars, mot_scores, completed_at, session_id)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    username,
-                    total_score,
-                    stars,
-                    json.dumps(mot_scores),
-                    datetime.now().isoformat(),
-                    normalized_session_id
-                ))
-                conn.commit()
+            completed_at = datetime.now().isoformat()
+            self.scores.insert_score(username, total_score, stars, json.dumps(mot_scores),
+                                     completed_at, normalized_session_id)
+            if normalized_session_id:
+                # Un nom ayant un score reste pris dans la session
+                self.usernames.remember(normalized_session_id, username, normalize_username(username), completed_at)
             logger.info(f"Score sauvegardé pour {username}: {total_score}/15 ({stars} étoiles), session={normalized_session_id}")
             return True
         except Exception as e:
@@ -643,91 +371,41 @@ class UserManager:
     def get_leaderboard(self, limit: int = 1000) -> List[Dict]:
         """Récupère le classement des meilleurs scores (un seul score par utilisateur, le meilleur)"""
         try:
-            import json
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                # Récupérer le meilleur score de chaque utilisateur
-                # En cas d'égalité de score, on prend le plus récent
-                cursor.execute('''
-                    SELECT 
-                        username, 
-                        MAX(total_score) as total_score,
-                        stars,
-                        mot_scores,
-                        MAX(completed_at) as completed_at
-                    FROM game_scores
-                    GROUP BY username
-                    ORDER BY total_score DESC, completed_at ASC
-                    LIMIT ?
-                ''', (limit,))
-                
-                leaderboard = []
-                rank = 1
-                prev_score = None
-                
-                for row in cursor.fetchall():
-                    total_score = row[1]
-                    
-                    # Pas de même rank en cas d'égalité : celui qui a fini en premier (par ORDER BY completed_at ASC)
-                    # est mieux classé. Donc on incrémente toujours le rank.
-                    # Le ORDER BY total_score DESC, completed_at ASC dans la requête SQL garantit déjà
-                    # que les joueurs sont triés correctement (meilleur score d'abord, puis premier fini en premier)
-                    
-                    # Pour les scores avec enablers, on doit récupérer le stars du meilleur score
-                    # On fait une sous-requête pour récupérer le stars du meilleur score de cet utilisateur
-                    cursor2 = conn.cursor()
-                    cursor2.execute('''
-                        SELECT stars, mot_scores
-                        FROM game_scores
-                        WHERE username = ? AND total_score = ?
-                        ORDER BY completed_at DESC
-                        LIMIT 1
-                    ''', (row[0], total_score))
-                    best_row = cursor2.fetchone()
-                    stars = best_row[0] if best_row else row[2]
-                    mot_scores = best_row[1] if best_row else row[3]
-                    
-                    leaderboard.append({
-                        'rank': rank,
-                        'username': row[0],
-                        'total_score': total_score,
-                        'stars': stars,
-                        'mot_scores': json.loads(mot_scores) if mot_scores else {},
-                        'completed_at': row[4]
-                    })
-                    
-                    prev_score = total_score
-                    rank += 1
-                    
-                return leaderboard
+            return self._ranked(self.scores.leaderboard(limit))
         except Exception as e:
             logger.error(f"Erreur lors de la récupération du leaderboard: {e}")
             return []
     
+    @staticmethod
+    def _ranked(rows) -> List[Dict]:
+        """Lignes de classement -> entrées du leaderboard
+        Pas de même rank en cas d'égalité : les lignes sont déjà triées (meilleur score d'abord,
+        puis premier fini en premier), donc on incrémente toujours le rank.
+        """
+        import json
+        return [{
+            'rank': rank,
+            'username': username,
+            'total_score': total_score,
+            'stars': stars,
+            'mot_scores': json.loads(mot_scores) if mot_scores else {},
+            'completed_at': completed_at
+        } for rank, (username, total_score, stars, mot_scores, completed_at) in enumerate(rows, start=1)]
+    
     def get_user_best_score(self, username: str) -> Optional[Dict]:
         """Récupère le meilleur score d'un utilisateur"""
         try:
             import json
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT username, total_score, stars, mot_scores, completed_at
-                    FROM game_scores
-                    WHERE username = ?
-                    ORDER BY total_score DESC, completed_at ASC
-                    LIMIT 1
-                ''', (username,))
-                
-                row = cursor.fetchone()
-                if row:
-                    return {
-                        'username': row[0],
-                        'total_score': row[1],
-                        'stars': row[2],
-                        'mot_scores': json.loads(row[3]) if row[3] else {},
-                        'completed_at': row[4]
-                    }
-                return None
+            row = self.scores.best_score(username)
+            if row:
+                return {
+                    'username': row[0],
+                    'total_score': row[1],
+                    'stars': row[2],
+                    'mot_scores': json.loads(row[3]) if row[3] else {},
+                    'completed_at': row[4]
+                }
+            return None
         except Exception as e:
             logger.error(f"Erreur lors de la récupération du meilleur score de {username}: {e}")
             return None
@@ -738,19 +416,18 @@ class UserManager:
             # Générer un code de session unique (6 caractères alphanumériques)
             import random
             import string
-            code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-            
-            # Vérifier que le code n'existe pas déjà
-            while self.get_session_by_code(code):
+            # Unicité garantie par la contrainte UNIQUE: on retente en cas de collision, sans relire la base
+            for attempt in range(5):
                 code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-            
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO game_sessions (session_code, created_by, created_at, is_active, player_count)
-                    VALUES (?, ?, ?, 1, 0)
-                ''', (code, created_by, datetime.now().isoformat()))
-                conn.commit()
+                try:
+                    self.sessions.insert_session(code, created_by, datetime.now().isoformat())
+                    break
+                except Exception as e:
+                    if attempt == 4:
+                        raise
+                    logger.warning(f"Code de session {code} déjà utilisé, nouvel essai: {e}")
+            # Le code a pu être mis en cache comme inconnu: la session est enregistrée à la lecture suivante
+            self.session_registry.invalidate(code)
             
             logger.info(f"Session de jeu créée: {code} par {created_by}")
             return code
@@ -761,98 +438,99 @@ class UserManager:
     def get_session_by_code(self, session_code: str) -> Optional[Dict]:
         """Récupère une session par son code"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT id, session_code, created_by, created_at, is_active, player_count
-                    FROM game_sessions
-                    WHERE session_code = ? AND is_active = 1
-                ''', (session_code.upper(),))
-                row = cursor.fetchone()
-                if row:
-                    return {
-                        'id': row[0],
-                        'session_code': row[1],
-                        'created_by': row[2],
-                        'created_at': row[3],
-                        'is_active': bool(row[4]),
-                        'player_count': row[5]
-                    }
-            return None
+            code = session_code.upper()
+            cached = self.session_registry.get(code)
+            if cached is not MISSING:
+                return cached
+            record = self.sessions.get_session(code)
+            self.session_registry.put(code, record)
+            return record
         except Exception as e:
             logger.error(f"Erreur lors de la récupération de la session {session_code}: {e}")
             return None
     
+    def get_session_creator(self, session_code: str) -> Optional[str]:
+        """Créateur d'une session, y compris fermée (statistiques, droits du formateur)"""
+        try:
+            session_data = self.get_session_by_code(session_code)
+            if session_data:
+                return session_data['created_by']
+            return self.sessions.session_creator(session_code.upper().strip())
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération du créateur de la session {session_code}: {e}")
+            return None
+    
+    def close_game_session(self, session_code: str) -> bool:
+        """Ferme une session: les joueurs ne peuvent plus la rejoindre"""
+        try:
+            code = session_code.upper().strip()
+            closed = self.sessions.close_session(code)
+            self.session_registry.invalidate(code)
+            if closed:
+                logger.info(f"Session de jeu fermée: {code}")
+            return closed
+        except Exception as e:
+            logger.error(f"Erreur lors de la fermeture de la session {session_code}: {e}")
+            return False
+    
     def increment_session_player_count(self, session_code: str) -> bool:
         """Incrémente le compteur de joueurs pour une session"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE game_sessions
-                    SET player_count = player_count + 1
-                    WHERE session_code = ?
-                ''', (session_code.upper(),))
-                conn.commit()
+            self.sessions.increment_player_count(session_code.upper())
+            self.session_registry.add_players(session_code.upper())
             return True
         except Exception as e:
             logger.error(f"Erreur lors de l'incrémentation du compteur de joueurs: {e}")
             return False
     
+    def record_completion_stats(self, total_score: int, stars: int, mot_scores: Dict[str, int],
+                                choices: Dict[str, List[str]], session_code: str = None) -> bool:
+        """Ajoute une partie terminée aux statistiques agrégées (global, session, formateur)"""
+        try:
+            code = session_code.upper().strip() if session_code else None
+            # Une partie finie après la fermeture de sa session compte aussi pour son formateur
+            trainer = self.get_session_creator(code) if code else None
+            self.scores.record_stats(stats_scopes(code, trainer), total_score, stars, mot_scores, choices)
+            return True
+        except Exception as e:
+            logger.error(f"Erreur lors de la mise à jour des statistiques: {e}")
+            return False
+    
+    def get_statistics(self, session_code: str = None, trainer: str = None) -> Dict:
+        """Statistiques agrégées des parties terminées: globales, d'une session ou d'un formateur"""
+        try:
+            if session_code:
+                scope = f'session:{session_code.upper().strip()}'
+            elif trainer:
+                scope = f'trainer:{trainer}'
+            else:
+                scope = 'global'
+            aggregate = self.scores.get_stats(scope)
+            if not aggregate or not aggregate['count']:
+                return {"total_paths": 0}
+            histograms = aggregate['histograms']
+            stars = histograms.get('stars', {})
+            return {
+                "total_paths": aggregate['count'],
+                "average_score": round(aggregate['score_sum'] / aggregate['count'], 2),
+                "star_distribution": {i: stars.get(str(i), 0) for i in range(1, 4)},
+                "best_score": aggregate['best'],
+                "worst_score": aggregate['worst'],
+                "score_distribution": {metric.split(':', 1)[1]: {int(bucket): count for bucket, count in buckets.items()}
+                                       for metric, buckets in histograms.items() if metric.startswith('score:')},
+                "choice_picks": {metric.split(':', 1)[1]: buckets
+                                 for metric, buckets in histograms.items() if metric.startswith('choice:')}
+            }
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération des statistiques: {e}")
+            return {"total_paths": 0}
+    
     def get_leaderboard_for_session(self, session_code: str, limit: int = 1000) -> List[Dict]:
         """Récupère le leaderboard pour une session spécifique"""
         try:
-            import json
             # Normaliser le session_code en uppercase pour la comparaison
             normalized_code = session_code.upper().strip()
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                # Filter strictly by session_id - only players who played in THIS specific session
-                # Use UPPER() to handle any case inconsistencies
-                cursor.execute('''
-                    SELECT username, MAX(total_score) as max_score, MAX(stars) as max_stars, 
-                           (SELECT mot_scores FROM game_scores 
-                            WHERE username = gs.username 
-                            AND UPPER(TRIM(session_id)) = ? 
-                            ORDER BY total_score DESC LIMIT 1) as mot_scores,
-                           MIN(completed_at) as first_completed
-                    FROM game_scores gs
-                    WHERE UPPER(TRIM(session_id)) = ? AND session_id IS NOT NULL
-                    GROUP BY username
-                    ORDER BY max_score DESC, first_completed ASC
-                    LIMIT ?
-                ''', (normalized_code, normalized_code, limit))
-                
-                leaderboard = []
-                rank = 1
-                prev_score = None
-                
-                for row in cursor.fetchall():
-                    username = row[0]
-                    total_score = row[1]
-                    stars = row[2]
-                    mot_scores_json = row[3]
-                    completed_at = row[4]
-                    mot_scores = json.loads(mot_scores_json) if mot_scores_json else {}
-                    
-                    # Pas de même rank en cas d'égalité : celui qui a fini en premier (par ORDER BY first_completed ASC)
-                    # est mieux classé. Donc on incrémente toujours le rank.
-                    # Le ORDER BY max_score DESC, first_completed ASC dans la requête SQL garantit déjà
-                    # que les joueurs sont triés correctement (meilleur score d'abord, puis premier fini en premier)
-                    
-                    leaderboard.append({
-                        'rank': rank,
-                        'username': username,
-                        'total_score': total_score,
-                        'stars': stars,
-                        'mot_scores': mot_scores,
-                        'completed_at': completed_at
-                    })
-                    
-                    prev_score = total_score
-                    rank += 1
-                
-                return leaderboard
+            return self._ranked(self.scores.session_leaderboard(normalized_code, limit))
         except Exception as e:
             logger.error(f"Erreur lors de la récupération du leaderboard de session: {e}")
             return []
@@ -870,4 +548,8 @@ if database_path != 'users.db':
         logger.info(f"📁 Créé le répertoire pour la base de données: {db_dir}")
 
 logger.info(f"📊 Initialisation de la base de données: {database_path}")
-user_manager = UserManager(db_path=database_path)
+user_manager = UserManager(db_path=database_path, storage=os.environ.get('STORAGE_BACKEND', 'sqlite'),
+                           session_registry=SessionRegistry(ttl=float(os.environ.get('SESSION_CACHE_TTL', 60)),
+                                                            negative_ttl=float(os.environ.get('SESSION_NEGATIVE_TTL', 10)),
+                                                            max_entries=int(os.environ.get('SESSION_CACHE_SIZE', 10000))),
+                           username_cache_sessions=int(os.environ.get('USERNAME_CACHE_SESSIONS', 1000)))
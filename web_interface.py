@@ -4,28 +4,94 @@ Interface Web pour le jeu AI Acceleration EXEC
 Utilise Flask pour créer une interface simple
 """
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, send_from_directory, url_for, g
 import json
 import pickle
 import base64
 import logging
+import mimetypes
 import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
 from datetime import datetime
+from functools import wraps
+from jinja2 import FileSystemBytecodeCache
 from ai_acceleration_game import AIAccelerationGame, GameState
 from user_manager import user_manager
 from game_content_manager import content_manager as content
+from response_cache import ResponseCache, json_body
+from static_assets import AssetManifest
+from tracing import tracer, lazy
+from log_pipeline import configure_logging, bind_context, clear_context
+from metrics import metrics
+from sql_profiler import sql_profiler
+from request_profiler import request_profiler
+from memory_accounting import memory_accountant, process_rss
+from player_events import player_events, EVENT_JOIN, EVENT_STEP, EVENT_COMPLETED
+from game_token import GameTokenCodec, InvalidGameToken, path_steps
+from shared_store import shared_store
+from player_presence import player_presence
+from scheduler import scheduler
+from path_log import completed_path_log
 
-# Configuration du logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Configuration du logging (queue + thread d'écriture, voir log_pipeline.py)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+trace_scoring = tracer.channel('scoring')
+trace_dashboard = tracer.channel('dashboard')
+trace_leaderboard = tracer.channel('leaderboard')
+
 app = Flask(__name__)
+
+# Cache disque du bytecode Jinja: évite de recompiler index.html à chaque démarrage
+jinja_cache_dir = os.environ.get('JINJA_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'aiquest_jinja_cache'))
+try:
+    os.makedirs(jinja_cache_dir, exist_ok=True)
+    app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache(jinja_cache_dir)}
+except OSError as e:
+    logger.warning(f"Jinja bytecode cache disabled ({jinja_cache_dir}): {e}")
 app.secret_key = os.environ.get('SECRET_KEY', 'ai_acceleration_secret_key_2024')
+# Fichiers /static non fingerprintés (images référencées en dur): cache court + revalidation
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = int(os.environ.get('STATIC_MAX_AGE', 3600))
+# Derrière un proxy (nginx), déléguer l'envoi des fichiers via X-Sendfile
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
+
+# Assets fingerprintés générés par `python static_assets.py`
+asset_manifest = AssetManifest(app.static_folder)
+ASSET_MAX_AGE = 31536000
+STATIC_ENDPOINTS = {'static', 'hashed_asset', 'metrics_endpoint'}
+
+# Métriques HTTP (voir metrics.py et /metrics)
+http_requests = metrics.counter('http_requests_total', 'Requêtes HTTP par route, méthode et statut',
+                                ('route', 'method', 'status'))
+http_latency = metrics.histogram('http_request_duration_seconds', 'Latence des requêtes HTTP par route',
+                                 ('route', 'method'))
+http_in_flight = metrics.gauge('http_requests_in_flight', 'Requêtes HTTP en cours de traitement')
+db_queries_per_request = metrics.histogram('db_queries_per_request', 'Requêtes SQL par requête HTTP',
+                                           ('route',), buckets=(0, 1, 2, 5, 10, 20, 50, 100))
+
+def _request_route():
+    """Route Flask (/api/phase4/choose, /assets/<path:filename>...) pour borner la cardinalité"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+@app.before_request
+def start_request_metrics():
+    """Démarre le chronomètre de la requête (enregistré en premier pour tout mesurer)"""
+    g.request_started = time.perf_counter()
+    http_in_flight.inc()
+    sql_profiler.begin_request()
+    request_profiler.begin_request(request.path)
 
 @app.before_request
 def ensure_guest_session():
     """Create a guest session so the game is accessible without login."""
-    global game_instance
+    # Les assets ne touchent pas à la session (pas de cookie, pas de Vary: Cookie)
+    if request.endpoint in STATIC_ENDPOINTS:
+        return
     
     if not session.get('logged_in'):
         session['logged_in'] = True
@@ -35,21 +101,164 @@ def ensure_guest_session():
     
     # Vérifier si c'est un refresh forcé (paramètre reset=1 dans l'URL)
     if request.args.get('reset') == '1':
+        drop_game()  # Reset la partie de ce navigateur (sa clé dépend de la session, avant clear)
         session.clear()  # Effacer complètement la session
         session['logged_in'] = True
         session['user_id'] = 'guest'
         session['username'] = 'guest'
         session['user_role'] = 'user'
-        game_instance = None  # Reset le jeu global
         return
     
     # Créer un ID de session temporaire pour chaque refresh
     if not session.get('session_id'):
-        import uuid
         session['session_id'] = str(uuid.uuid4())
 
-# Instance globale du jeu
-game_instance = None
+@app.before_request
+def bind_request_context():
+    """Identifiant de requête + contexte des logs et des traces"""
+    request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16]
+    g.request_id = request_id[:64]
+    if request.endpoint in STATIC_ENDPOINTS:
+        bind_context(request_id=g.request_id)
+        tracer.bind_session(None)
+        return
+    session_code = session.get('game_session_code')
+    bind_context(request_id=g.request_id, session_code=session_code, username=session.get('username'))
+    # Permet d'activer les traces pour une seule session Kahoot
+    tracer.bind_session(session_code)
+
+@app.before_request
+def record_player_heartbeat():
+    """Tout appel API d'un joueur connecté à une session vaut heartbeat (écrit par lots)"""
+    if request.endpoint in STATIC_ENDPOINTS:
+        return
+    session_code = session.get('game_session_code')
+    username = session.get('username')
+    if session_code and username and username != 'guest':
+        player_presence.touch(session_code, username)
+
+@app.after_request
+def add_request_id_header(response):
+    """Renvoie l'identifiant de requête pour corréler les logs côté client/proxy"""
+    request_id = g.get('request_id')
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    return response
+
+@app.after_request
+def persist_game_token(response):
+    """Mode jeton: réémet le jeton de la partie modifiée (cookie de session + en-tête X-Game-Token)"""
+    game = g.get('game')
+    if game is None:
+        return response
+    owner = _player_key()
+    try:
+        token = game_tokens.encode(game, owner)
+    except Exception as e:
+        logger.error(f"Erreur lors de l'encodage du jeton de partie: {e}")
+        return response
+    if token != g.get('game_token'):
+        session['game_token'] = token
+    response.headers['X-Game-Token'] = token
+    # Cache local: la requête suivante servie par ce worker évite le décodage
+    _store_game(('token', owner, token), game)
+    return response
+
+@app.after_request
+def record_request_metrics(response):
+    """Latence et statut par route"""
+    started = g.get('request_started')
+    if started is not None:
+        route = _request_route()
+        http_latency.observe(time.perf_counter() - started, route, request.method)
+        http_requests.inc(route, request.method, response.status_code)
+    db_stats = sql_profiler.request_stats()
+    if db_stats is not None and db_stats['count']:
+        db_queries_per_request.observe(db_stats['count'], _request_route())
+        response.headers['Server-Timing'] = f'db;dur={db_stats["time"] * 1000:.2f};desc="{db_stats["count"]} queries"'
+    return response
+
+@app.teardown_request
+def clear_request_context(exc):
+    """Le thread du worker est réutilisé: ne pas laisser fuir le contexte"""
+    if g.pop('request_started', None) is not None:
+        http_in_flight.dec()
+    sql_profiler.end_request()
+    request_profiler.end_request()
+    clear_context()
+    tracer.bind_session(None)
+
+# Parties en cours, une par joueur: (code de session, username) en mode Kahoot,
+# ('', id de navigateur) sinon. Les parties Kahoot évincées sont reconstruites
+# depuis le journal d'événements (player_events.py).
+game_states: 'OrderedDict[tuple, AIAccelerationGame]' = OrderedDict()
+game_states_lock = threading.Lock()
+GAME_STATES_MAX = int(os.environ.get('GAME_STATES_MAX', 10000))
+
+# GAME_STATE_MODE=token: la partie voyage dans un jeton signé (cookie de session ou en-tête
+# X-Game-Token), n'importe quel worker peut servir n'importe quel joueur (voir game_token.py)
+# En mode multi-process (SHARED_STATE=1) c'est le mode par défaut
+GAME_STATE_MODE = os.environ.get('GAME_STATE_MODE', 'token' if shared_store.enabled else 'memory')
+if shared_store.enabled and GAME_STATE_MODE != 'token':
+    logger.warning("SHARED_STATE=1 avec GAME_STATE_MODE=memory: les parties hors Kahoot restent propres à chaque worker")
+game_tokens = GameTokenCodec(app.secret_key, content)
+game_token_results = metrics.counter('game_tokens_total', 'Jetons de partie reçus, par résultat', ('result',))
+
+metrics.gauge('game_active_states', 'Parties en cours par état du jeu', ('state',),
+              callback=lambda: dict(Counter(game.current_state.value for game in list(game_states.values()))))
+metrics.gauge('content_version', 'Version du contenu chargé (game_content.json)',
+              callback=lambda: content.version)
+metrics.gauge('process_resident_memory_bytes', 'Mémoire résidente du process', callback=process_rss)
+
+# Payloads des choix, construits une fois par version de game_content.json
+choices_cache = ResponseCache(lambda: content.version)
+
+# Rendu de index.html, par version de contenu et rôle admin
+page_cache = ResponseCache(lambda: content.version)
+
+# Comptabilité mémoire (voir memory_accounting.py et /api/admin/memory)
+memory_accountant.register('game_states', lambda: dict(game_states))
+memory_accountant.register('player_events', lambda: player_events._states)
+memory_accountant.register('response_caches', lambda: {'choices': choices_cache, 'page': page_cache}, shared=True)
+memory_accountant.register('content', lambda: content.content, shared=True)
+memory_accountant.register('observability', lambda: {'metrics': metrics, 'sql_profiler': sql_profiler.statements})
+
+# Tâches de maintenance, hors du chemin des requêtes (voir scheduler.py); les tâches
+# exclusives ne sont exécutées que par un worker à la fois
+scheduler.register('memory_summary', memory_accountant.log_summary,
+                   float(os.environ.get('MEMORY_LOG_INTERVAL', 300)))
+scheduler.register('player_events_snapshot', player_events.snapshot_if_changed, player_events.snapshot_interval)
+scheduler.register('heartbeat_flush', player_presence.flush, player_presence.flush_interval)
+scheduler.register('completed_paths_flush', completed_path_log.flush, completed_path_log.flush_interval)
+scheduler.register('active_player_sweep', player_presence.sweep, player_presence.sweep_interval, exclusive=True)
+scheduler.register('sqlite_optimize', user_manager.optimize_database,
+                   float(os.environ.get('SQLITE_OPTIMIZE_INTERVAL', 21600)), exclusive=True)
+scheduler.start()
+
+# Pilier et enabler associés à chaque choix de la Phase 4
+PHASE4_CHOICE_PILLARS = {
+    'apis_hr_systems': 'platform_partnerships',
+    'tech_stack_data_pipelines': 'platform_partnerships',
+    'ai_ethics_officer': 'policies_practices',
+    'risk_mitigation_plan': 'policies_practices',
+    'internal_mobility': 'people_processes',
+    'data_collection_strategy': 'platform_partnerships',
+    'ceo_video_series': 'policies_practices',
+    'change_management': 'people_processes',
+    'business_sponsors': 'people_processes'
+}
+
+PHASE4_CHOICE_ENABLERS = {
+    'apis_hr_systems': 'api_connectivity',
+    'tech_stack_data_pipelines': 'data_pipeline_automation',
+    'ai_ethics_officer': 'ethics_oversight',
+    'risk_mitigation_plan': 'risk_management',
+    'internal_mobility': 'talent_retention',
+    'data_collection_strategy': 'data_strategy',
+    'ceo_video_series': 'leadership_communication',
+    'change_management': 'change_adoption',
+    'business_sponsors': 'business_alignment'
+}
 
 def initialize_default_users():
     """Initialise les utilisateurs par défaut au démarrage"""
@@ -88,21 +297,276 @@ def initialize_default_users():
     except Exception as e:
         logger.error(f"❌ Erreur lors de l'initialisation des utilisateurs: {e}")
 
+def _player_key():
+    """Clé de la partie du joueur courant"""
+    session_code = session.get('game_session_code')
+    username = session.get('username')
+    if session_code and username:
+        return (session_code, username)
+    return ('', session.get('session_id', 'anonymous'))
+
+def _store_game(key, game):
+    with game_states_lock:
+        game_states[key] = game
+        game_states.move_to_end(key)
+        while len(game_states) > GAME_STATES_MAX:
+            game_states.popitem(last=False)
+
+def _restore_game(key):
+    """Reconstruit une partie Kahoot en rejouant l'état dérivé du journal d'événements"""
+    if not key[0]:
+        return AIAccelerationGame()
+    return _replay_game(player_events.state(*key))
+
+def _replay_game(state):
+    """Partie reconstruite à partir d'un état du journal d'événements (chaque étape revalidée)"""
+    game = AIAccelerationGame()
+    if not state.joined:
+        return game
+    game.start_game()
+    if state.mot1_choice:
+        game.make_mot1_choice(state.mot1_choice)
+    if state.mot2_choices:
+        game.make_mot2_choices(state.mot2_choices)
+    if state.mot3_choices:
+        game.make_mot3_choices(state.mot3_choices)
+    if state.mot4_choices:
+        game.make_mot4_choices(state.mot4_choices)
+    if state.mot5_choice:
+        game.make_mot5_choice(state.mot5_choice)
+    return game
+
+def _game_from_state(state):
+    """Partie construite directement depuis le parcours d'un jeton (validé à son émission)"""
+    return AIAccelerationGame.from_path(state.joined, state.mot1_choice, state.mot2_choices,
+                                        state.mot3_choices, state.mot4_choices, state.mot5_choice)
+
+def _behind_event_log(key, game):
+    """Joueur Kahoot: la partie du jeton doit être celle du journal d'événements, sinon c'est
+    un jeton antérieur renvoyé (retour en arrière) ou celui d'une partie précédente"""
+    if not key[0]:
+        return False
+    state = player_events.state(*key)
+    return (state.joined != (game.current_state != GameState.LOGIN)
+            or [choices for _, choices in state.step_choices()] != path_steps(game.current_path))
+
+def _game_from_token():
+    """Mode jeton: partie décodée du jeton de la requête (ou reprise du cache local de ce worker)"""
+    game = g.get('game')
+    if game is not None:
+        return game
+    key = _player_key()
+    token = request.headers.get('X-Game-Token') or session.get('game_token')
+    if token:
+        with game_states_lock:
+            game = game_states.pop(('token', key, token), None)
+        try:
+            if game is None:
+                game = _game_from_state(game_tokens.decode(token, key))
+                game_token_results.inc('valid')
+            if _behind_event_log(key, game):
+                raise InvalidGameToken('stale_progress')
+        except InvalidGameToken as e:
+            game = None
+            game_token_results.inc(e.reason)
+            logger.warning(f"Jeton de partie refusé ({e.reason})")
+    if game is None:
+        # Pas de jeton valable: le journal d'événements fait foi pour les joueurs Kahoot
+        game = _restore_game(key)
+    g.game = game
+    g.game_token = token
+    return game
+
 def get_game():
-    """Récupère ou crée l'instance du jeu"""
-    global game_instance
-    if game_instance is None:
-        game_instance = AIAccelerationGame()
-    return game_instance
+    """Récupère (ou reconstruit) la partie du joueur courant"""
+    if GAME_STATE_MODE == 'token':
+        return _game_from_token()
+    key = _player_key()
+    with game_states_lock:
+        game = game_states.get(key)
+        if game is not None:
+            game_states.move_to_end(key)
+            return game
+    game = _restore_game(key)
+    _store_game(key, game)
+    return game
 
-@app.route('/')
-def index():
-    """Page d'accueil"""
+def new_game():
+    """Démarre une nouvelle partie pour le joueur courant"""
+    game = AIAccelerationGame()
+    if GAME_STATE_MODE == 'token':
+        g.game, g.game_token = game, None
+    else:
+        _store_game(_player_key(), game)
+    return game
+
+def drop_game():
+    """Oublie la partie du joueur courant"""
+    session.pop('game_token', None)
+    with game_states_lock:
+        game_states.pop(_player_key(), None)
+
+def _drop_expired_games(removed):
+    """Oublie les parties de ce worker des joueurs retirés pour inactivité"""
+    expired = set(removed)
+    with game_states_lock:
+        for key in [key for key in game_states if key in expired or (key[0] == 'token' and key[1] in expired)]:
+            del game_states[key]
+
+player_presence.on_expire(_drop_expired_games)
+
+def record_event(kind, choices=()):
+    """Ajoute une action du joueur courant au journal (mode Kahoot uniquement)"""
+    username = session.get('username')
+    session_code = session.get('game_session_code')
+    if not username or not session_code:
+        return
+    try:
+        player_events.append(session_code, username, kind, choices)
+    except Exception as e:
+        logger.warning(f"player event {kind} failed: {e}")
+
+def inactive_player_response():
+    """Refus des choix d'un joueur Kahoot qui n'est plus actif: retiré pour inactivité, ou
+    dont le nom a été repris depuis (même clé session/nom, connexion plus récente)"""
+    session_code = session.get('game_session_code')
+    username = session.get('username')
+    if not session_code or not username:
+        return None
+    state = player_events.state(session_code, username)
+    # Sessions ouvertes avant l'horodatage des connexions: seule la présence est vérifiée
+    if state.joined and session.get('joined_at', state.joined_at) == state.joined_at:
+        return None
+    return jsonify({
+        'success': False,
+        'message': 'Partie expirée, veuillez vous reconnecter'
+    }), 409
+
+def admin_required(view):
+    """Réserve un endpoint aux administrateurs"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not session.get('logged_in') or session.get('user_role') != 'admin':
+            return jsonify({
+                'success': False,
+                'message': 'Accès refusé. Admin requis.'
+            }), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+def _build_phase1_choices():
+    """Corps de réponse de /api/phase1/choices"""
+    choices = AIAccelerationGame().get_mot1_choices()
+    return json_body({
+        'success': True,
+        'choices': [
+            {
+                'id': choice.id,
+                'title': choice.title,
+                'description': choice.description,
+                'category': choice.category
+            }
+            for choice in choices
+        ]
+    })
+
+def _build_phase2_choices():
+    """Corps de réponse de /api/phase2/choices"""
+    choices = AIAccelerationGame().get_mot2_choices()
+    # Ne prendre que les 5 premières solutions (positions 1-5 dans la matrice)
+    return json_body({
+        'success': True,
+        'choices': [
+            {
+                'id': choice.id,
+                'title': choice.title,
+                'description': choice.description
+            }
+            for choice in choices[:5]
+        ]
+    })
+
+def _build_phase3_choices():
+    """Corps de réponse de /api/phase3/choices (et /api/mot3/choices)"""
+    choices_by_category = AIAccelerationGame().get_mot3_choices()
+    return json_body({
+        'success': True,
+        'choices': {
+            category: [
+                {
+                    'id': choice.id,
+                    'title': choice.title,
+                    'description': choice.description
+                }
+                for choice in choices_list
+            ]
+            for category, choices_list in choices_by_category.items()
+        }
+    })
+
+def _build_phase4_choices():
+    """Corps de réponse de /api/phase4/choices"""
+    choices = AIAccelerationGame().get_mot4_choices()
+    return json_body({
+        'success': True,
+        'choices': [
+            {
+                'id': choice.id,
+                'title': choice.title,
+                'description': choice.description,
+                'cost': choice.cost,
+                'pillar': PHASE4_CHOICE_PILLARS.get(choice.id, 'people_processes'),
+                'enabler_id': PHASE4_CHOICE_ENABLERS.get(choice.id, 'unknown')
+            }
+            for choice in choices
+        ]
+    })
+
+def _build_phase5_choices():
+    """Corps de réponse de /api/phase5/choices"""
+    choices = AIAccelerationGame().get_mot5_choices()
+    return json_body({
+        'success': True,
+        'choices': [
+            {
+                'id': choice.id,
+                'title': choice.title,
+                'description': choice.description,
+                'icon': content.get_choice_icon('phase5', choice.id)
+            }
+            for choice in choices
+        ]
+    })
+
+@app.template_global()
+def asset_url(filename):
+    """URL d'un asset: version fingerprintée si le build existe, sinon /static"""
+    hashed = asset_manifest.lookup(filename)
+    if hashed:
+        return url_for('hashed_asset', filename=hashed)
+    return url_for('static', filename=filename)
+
+@app.route('/assets/<path:filename>')
+def hashed_asset(filename):
+    """Sert un asset fingerprinté (immutable, pré-compressé si le client accepte gzip)"""
+    mimetype = None
+    encoding = None
+    if filename in asset_manifest.gzipped and request.accept_encodings['gzip']:
+        mimetype = mimetypes.guess_type(filename)[0]
+        filename = filename + '.gz'
+        encoding = 'gzip'
+    
+    # send_file passe par wsgi.file_wrapper: gunicorn utilise sendfile()
+    response = send_from_directory(asset_manifest.dist_dir, filename, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    response.vary.add('Accept-Encoding')
+    return response
+
+def _render_index(is_admin):
+    """Rendu complet de index.html (le code de session est lu côté client)"""
     template = content
-    # Récupérer le code de session depuis l'URL (si présent)
-    session_code_from_url = request.args.get('session', '').strip().upper()
-    # Vérifier si l'utilisateur est admin pour afficher le panneau admin
-    is_admin = session.get('logged_in') and session.get('user_role') == 'admin'
     return render_template('index.html', 
                          game_title=template.get_game_title(),
                          company_name=template.get_company_name(),
@@ -110,8 +574,14 @@ def index():
                          teams_meeting_button_text=template.get_teams_meeting_button_text(),
                          template=template,
                          content=content,
-                         session_code=session_code_from_url,
-                         is_admin=is_admin)
+                         is_admin=is_admin).encode('utf-8')
+
+@app.route('/')
+def index():
+    """Page d'accueil"""
+    # Vérifier si l'utilisateur est admin pour afficher le panneau admin
+    is_admin = bool(session.get('logged_in') and session.get('user_role') == 'admin')
+    return page_cache.respond(('index', is_admin), lambda: _render_index(is_admin), mimetype='text/html')
 
 @app.route('/api/game_config')
 def api_game_config():
@@ -239,6 +709,226 @@ def api_create_session():
             'message': f'Erreur: {str(e)}'
         }), 500
 
+@app.route('/api/admin/close_session', methods=['POST'])
+def api_close_session():
+    """API pour fermer une session de jeu (admin, ou le formateur qui l'a créée): le code n'est plus accepté"""
+    try:
+        user_role = session.get('user_role')
+        if not session.get('logged_in') or (user_role != 'admin' and user_role != 'trainer'):
+            return jsonify({
+                'success': False,
+                'message': 'Accès refusé. Admin requis.'
+            }), 403
+
+        session_code = (request.json or {}).get('session_code', '').strip().upper()
+        if not session_code:
+            return jsonify({
+                'success': False,
+                'message': 'Code de session manquant'
+            }), 400
+
+        if user_role != 'admin':
+            # Un formateur ne ferme que les sessions qu'il a créées
+            session_data = user_manager.get_session_by_code(session_code)
+            if not session_data:
+                return jsonify({
+                    'success': False,
+                    'message': 'Session introuvable ou déjà fermée'
+                }), 404
+            if session_data['created_by'] != session.get('username'):
+                return jsonify({
+                    'success': False,
+                    'message': 'Accès refusé. Session créée par un autre formateur.'
+                }), 403
+
+        if user_manager.close_game_session(session_code):
+            return jsonify({
+                'success': True,
+                'session_code': session_code,
+                'message': f'Session fermée: {session_code}'
+            })
+        return jsonify({
+            'success': False,
+            'message': 'Session introuvable ou déjà fermée'
+        }), 404
+
+    except Exception as e:
+        logger.error(f"Erreur lors de la fermeture de session: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Erreur: {str(e)}'
+        }), 500
+
+@app.route('/api/admin/session_activity')
+def api_session_activity():
+    """API pour suivre les joueurs d'une session (admin/formateur): live (activité récente) et idle"""
+    try:
+        user_role = session.get('user_role')
+        if not session.get('logged_in') or (user_role != 'admin' and user_role != 'trainer'):
+            return jsonify({
+                'success': False,
+                'message': 'Accès refusé. Admin requis.'
+            }), 403
+
+        session_code = request.args.get('session_code', '').strip().upper() or None
+        sessions = player_presence.session_activity(session_code)
+        if session_code:
+            sessions.setdefault(session_code, {'live': 0, 'idle': 0})
+        return jsonify({
+            'success': True,
+            'sessions': sessions,
+            'presence': player_presence.stats()
+        })
+
+    except Exception as e:
+        logger.error(f"Erreur lors du suivi des joueurs actifs: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Erreur: {str(e)}'
+        }), 500
+
+@app.route('/api/admin/trace', methods=['GET', 'POST'])
+@admin_required
+def api_admin_trace():
+    """API pour activer/désactiver les canaux de trace (globalement ou par session)"""
+    if request.method == 'POST':
+        data = request.json or {}
+        channel = data.get('channel', '')
+        enabled = bool(data.get('enabled', True))
+        session_code = data.get('session_code') or None
+        
+        channels = list(tracer.channels) if channel == 'all' else [channel]
+        for name in channels:
+            if not tracer.set(name, enabled, session_code):
+                return jsonify({
+                    'success': False,
+                    'message': f'Canal de trace inconnu: {name}'
+                }), 400
+    
+    return jsonify({
+        'success': True,
+        'channels': tracer.status()
+    })
+
+@app.route('/api/admin/sql_profile', methods=['GET', 'DELETE'])
+@admin_required
+def api_admin_sql_profile():
+    """API pour consulter (ou remettre à zéro) les requêtes SQL les plus coûteuses"""
+    if request.method == 'DELETE':
+        sql_profiler.reset()
+    
+    limit = request.args.get('limit', 20, type=int)
+    order_by = request.args.get('order_by', 'total')
+    return jsonify({
+        'success': True,
+        'slow_query_ms': sql_profiler.slow_query_ms,
+        'statements': sql_profiler.top(limit, order_by)
+    })
+
+@app.route('/api/admin/player_events', methods=['GET', 'POST'])
+@admin_required
+def api_admin_player_events():
+    """API pour consulter le journal d'événements (POST: forcer un snapshot des joueurs en cours)"""
+    try:
+        if request.method == 'POST':
+            player_events.snapshot()
+        return jsonify({
+            'success': True,
+            'player_events': player_events.stats(),
+            'shared_state': shared_store.stats(),
+            'games_in_memory': len(game_states)
+        })
+    except Exception as e:
+        logger.error(f"Erreur lors du snapshot des joueurs: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Erreur: {str(e)}'
+        }), 500
+
+@app.route('/api/admin/scheduler', methods=['GET', 'POST'])
+@admin_required
+def api_admin_scheduler():
+    """API pour consulter les tâches de maintenance (POST {"task": ...}: exécution anticipée)"""
+    if request.method == 'POST':
+        task = (request.json or {}).get('task', '')
+        if not scheduler.trigger(task):
+            return jsonify({
+                'success': False,
+                'message': f'Tâche inconnue: {task}'
+            }), 404
+    return jsonify({
+        'success': True,
+        'scheduler': scheduler.stats()
+    })
+
+@app.route('/api/admin/profile', methods=['GET', 'POST', 'DELETE'])
+@admin_required
+def api_admin_profile():
+    """API pour profiler le process: cProfile sur N requêtes ou échantillonnage pendant N secondes"""
+    try:
+        if request.method == 'POST':
+            data = request.json or {}
+            mode = data.get('mode', 'cprofile')
+            path_prefix = data.get('path') or None
+            if mode == 'cprofile':
+                request_profiler.start_cprofile(int(data.get('requests', 10)), path_prefix)
+            elif mode == 'sampling':
+                request_profiler.start_sampling(float(data.get('seconds', 10)),
+                                                float(data.get('interval_ms', 5)) / 1000, path_prefix)
+            else:
+                return jsonify({
+                    'success': False,
+                    'message': f'Mode de profilage inconnu: {mode}'
+                }), 400
+        elif request.method == 'DELETE':
+            request_profiler.stop()
+        
+        # Format collapsed stacks pour flamegraph.pl / speedscope
+        if request.method == 'GET' and request.args.get('format') == 'collapsed':
+            response = app.response_class(request_profiler.collapsed(), mimetype='text/plain')
+            response.headers['Content-Disposition'] = 'attachment; filename=profile.collapsed'
+            return response
+        
+        return jsonify({
+            'success': True,
+            'status': request_profiler.status(),
+            'result': request_profiler.result
+        })
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'message': f'Paramètres invalides: {str(e)}'
+        }), 400
+
+@app.route('/api/admin/memory', methods=['GET', 'POST'])
+@admin_required
+def api_admin_memory():
+    """API pour consulter la mémoire par état de jeu / cache et piloter tracemalloc"""
+    if request.method == 'POST':
+        data = request.json or {}
+        if 'tracemalloc' in data:
+            if data.get('tracemalloc'):
+                memory_accountant.start_tracing()
+            else:
+                memory_accountant.stop_tracing()
+    
+    report = memory_accountant.report(top=request.args.get('top', 20, type=int))
+    if report.get('tracemalloc') and request.args.get('group_by'):
+        report['top_allocations'] = memory_accountant.top_allocations(
+            request.args.get('top', 20, type=int), request.args.get('group_by'))
+    return jsonify({
+        'success': True,
+        'memory': report
+    })
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Métriques au format texte Prometheus (protégées par METRICS_TOKEN si défini)"""
+    token = os.environ.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'success': False, 'message': 'Accès refusé'}), 403
+    return app.response_class(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/api/validate_session', methods=['POST'])
 def api_validate_session():
     """API pour valider un code de session"""
@@ -328,7 +1018,8 @@ def api_login():
             if user_manager.username_exists_in_session(username, session_code):
                 return jsonify({
                     'success': False,
-                    'message': f'Le nom "{username}" est déjà pris dans cette session. Veuillez choisir un autre nom.'
+                    'message': f'Le nom "{username}" est déjà pris dans cette session. Veuillez choisir un autre nom.',
+                    'suggestions': user_manager.suggest_usernames(username, session_code)
                 }), 409  # HTTP 409 Conflict
         
         # Flux joueur Kahoot (pas de password): création/fetch direct et login sans passer par mot de passe
@@ -348,17 +1039,6 @@ def api_login():
             success, user = user_manager.authenticate_user(username, password)
         
         if success and user:
-            # Réinitialiser le jeu pour une nouvelle session
-            global game_instance
-            game_instance = None
-            game = get_game()
-            
-            # Démarrer le jeu automatiquement en mode Kahoot
-            if not password:  # Mode Kahoot
-                game.start_game()
-                # Incrémenter le compteur de joueurs
-                user_manager.increment_session_player_count(session_code)
-            
             session['logged_in'] = True
             session['user_id'] = user.id
             session['username'] = user.username
@@ -372,13 +1052,20 @@ def api_login():
                 if not registered:
                     return jsonify({
                         'success': False,
-                        'message': f'Le nom "{user.username}" est déjà pris dans cette session.'
+                        'message': f'Le nom "{user.username}" est déjà pris dans cette session.',
+                        'suggestions': user_manager.suggest_usernames(user.username, session_code)
                     }), 409
-                # Initialiser sa progression autoritaire au Step 1
-                try:
-                    user_manager.upsert_progress(user.username, session_code, 1)
-                except Exception as e:
-                    logger.warning(f"init progress failed: {e}")
+                # Compteur de joueurs: seulement une fois la place réservée (pas de doublon sous rafale)
+                user_manager.increment_session_player_count(session_code)
+            
+            # Nouvelle partie pour ce joueur, démarrée automatiquement en mode Kahoot
+            game = new_game()
+            if not password:
+                game.start_game()
+            # Progression autoritaire: le journal d'événements démarre au Step 1
+            record_event(EVENT_JOIN)
+            if session_code:
+                session['joined_at'] = player_events.state(session_code, user.username).joined_at
             
             return jsonify({
                 'success': True,
@@ -552,27 +1239,16 @@ def api_phase1_choices():
     if not session.get('logged_in'):
         return jsonify({'success': False, 'message': 'Not logged in'})
     
-    game = get_game()
-    choices = game.get_mot1_choices()
-    
-    return jsonify({
-        'success': True,
-        'choices': [
-            {
-                'id': choice.id,
-                'title': choice.title,
-                'description': choice.description,
-                'category': choice.category
-            }
-            for choice in choices
-        ]
-    })
+    return choices_cache.respond('phase1', _build_phase1_choices)
 
 @app.route('/api/phase1/choose', methods=['POST'])
 def api_phase1_choose():
     """API pour faire un choix Phase1"""
     if not session.get('logged_in'):
         return jsonify({'success': False, 'message': 'Not logged in'})
+    inactive = inactive_player_response()
+    if inactive:
+        return inactive
     
     data = request.json
     character_id = data.get('character_id', '')
@@ -582,14 +1258,8 @@ def api_phase1_choose():
     
     if success:
         score_info = game.get_current_score()
-        # Authoritative progress update
-        try:
-            username = session.get('username')
-            session_code = session.get('game_session_code')
-            if username and session_code:
-                user_manager.upsert_progress(username, session_code, 1)
-        except Exception as e:
-            logger.warning(f"progress update step1 failed: {e}")
+        # Authoritative progress update (journal d'événements)
+        record_event(EVENT_STEP + 1, [character_id])
         return jsonify({
             'success': True,
             'message': f'Choice made: {character_id}',
@@ -608,29 +1278,16 @@ def api_phase2_choices():
     if not session.get('logged_in'):
         return jsonify({'success': False, 'message': 'Not logged in'})
     
-    game = get_game()
-    choices = game.get_mot2_choices()
-    
-    # Ne prendre que les 5 premières solutions (positions 1-5 dans la matrice)
-    available_choices = choices[:5]
-    
-    return jsonify({
-        'success': True,
-        'choices': [
-            {
-                'id': choice.id,
-                'title': choice.title,
-                'description': choice.description
-            }
-            for choice in available_choices
-        ]
-    })
+    return choices_cache.respond('phase2', _build_phase2_choices)
 
 @app.route('/api/phase2/choose', methods=['POST'])
 def api_phase2_choose():
     """API pour faire des choix Phase2"""
     if not session.get('logged_in'):
         return jsonify({'success': False, 'message': 'Not logged in'})
+    inactive = inactive_player_response()
+    if inactive:
+        return inactive
     
     data = request.json
     solution_ids = data.get('solution_ids', [])
@@ -640,14 +1297,8 @@ def api_phase2_choose():
     
     if success:
         score_info = game.get_current_score()
-        # Authoritative progress update
-        try:
-            username = session.get('username')
-            session_code = session.get('game_session_code')
-            if username and session_code:
-                user_manager.upsert_progress(username, session_code, 2)
-        except Exception as e:
-            logger.warning(f"progress update step2 failed: {e}")
+        # Authoritative progress update (journal d'événements)
+        record_event(EVENT_STEP + 2, solution_ids)
         return jsonify({
             'success': True,
             'message': f'Choices made: {solution_ids}',
@@ -668,63 +1319,31 @@ def api_phase3_choices():
     
     game = get_game()
     
-    # Debug logs
-    print(f"DEBUG Phase 3 API: mot2_choices = {game.current_path.mot2_choices}")
-    print(f"DEBUG Phase 3 API: len(mot2_choices) = {len(game.current_path.mot2_choices) if game.current_path.mot2_choices else 0}")
+    trace_scoring("Phase 3 API: mot2_choices = %s", game.current_path.mot2_choices)
     
-    # Vérifier que Phase2 est terminé (in-memory). Si non, fallback sur player_progress en DB.
+    # Vérifier que Phase2 est terminé (in-memory). Si non, fallback sur la progression du journal.
     if not game.current_path.mot2_choices or len(game.current_path.mot2_choices) != 3:
         try:
             username = session.get('username')
             session_code = session.get('game_session_code')
             if username and session_code:
-                next_info = user_manager.get_next_step(username, session_code)
+                next_info = player_events.state(session_code, username).next_step()
                 if next_info and int(next_info.get('next_step', 1)) >= 3:
-                    template = content
-                    phase3_choices = template.get_phase_choices('phase3') or {}
-                    result = {}
-                    for category, choices_dict in phase3_choices.items():
-                        formatted = []
-                        for choice_id, choice_data in choices_dict.items():
-                            formatted.append({
-                                'id': choice_id,
-                                'title': choice_data.get('title', choice_id.replace('_', ' ').title()),
-                                'description': choice_data.get('description', '')
-                            })
-                        result[category] = formatted
-                    return jsonify({'success': True, 'choices': result})
+                    return choices_cache.respond('phase3', _build_phase3_choices)
         except Exception as e:
             logger.warning(f"phase3 choices DB fallback failed: {e}")
         return jsonify({'success': False, 'message': f'Phase2 must be completed first. Current choices: {game.current_path.mot2_choices}, count: {len(game.current_path.mot2_choices) if game.current_path.mot2_choices else 0}'})
     
-    choices_by_category = game.get_mot3_choices()
-    
-    result = {}
-    for category, choices_list in choices_by_category.items():
-        print(f"DEBUG Phase 3 API: category = {category}, choices_list type = {type(choices_list)}")
-        if isinstance(choices_list, list):
-            result[category] = [
-                {
-                    'id': choice.id,
-                    'title': choice.title,
-                    'description': choice.description
-                }
-                for choice in choices_list
-            ]
-        else:
-            print(f"DEBUG Phase 3 API: choices_list is not a list, skipping category {category}")
-            result[category] = []
-    
-    return jsonify({
-        'success': True,
-        'choices': result
-    })
+    return choices_cache.respond('phase3', _build_phase3_choices)
 
 @app.route('/api/phase3/choose', methods=['POST'])
 def api_phase3_choose():
     """API pour faire des choix Phase3"""
     if not session.get('logged_in'):
         return jsonify({'success': False, 'message': 'Not logged in'})
+    inactive = inactive_player_response()
+    if inactive:
+        return inactive
     
     data = request.get_json()
     choices = data.get('choices', {})
@@ -737,14 +1356,8 @@ def api_phase3_choose():
     
     if game.make_mot3_choices(choices):
         score_info = game.get_current_score()
-        # Authoritative progress update
-        try:
-            username = session.get('username')
-            session_code = session.get('game_session_code')
-            if username and session_code:
-                user_manager.upsert_progress(username, session_code, 3)
-        except Exception as e:
-            logger.warning(f"progress update step3 failed: {e}")
+        # Authoritative progress update (journal d'événements)
+        record_event(EVENT_STEP + 3, choices)
         return jsonify({
             'success': True,
             'message': f'Choices made: {choices}',
@@ -769,29 +1382,16 @@ def api_mot3_choices():
     if not game.current_path.mot2_choices or len(game.current_path.mot2_choices) != 3:
         return jsonify({'success': False, 'message': 'MOT2 must be completed first'})
     
-    choices_by_category = game.get_mot3_choices()
-    
-    result = {}
-    for category, choices in choices_by_category.items():
-        result[category] = [
-            {
-                'id': choice.id,
-                'title': choice.title,
-                'description': choice.description
-            }
-            for choice in choices.values()
-        ]
-    
-    return jsonify({
-        'success': True,
-        'choices': result
-    })
+    return choices_cache.respond('phase3', _build_phase3_choices)
 
 @app.route('/api/mot3/choose', methods=['POST'])
 def api_mot3_choose():
     """API pour faire des choix MOT3"""
     if not session.get('logged_in'):
         return jsonify({'success': False, 'message': 'Not logged in'})
+    inactive = inactive_player_response()
+    if inactive:
+        return inactive
     
     data = request.json
     choices = data.get('choices', {})
@@ -801,6 +1401,7 @@ def api_mot3_choose():
     
     if success:
         score_info = game.get_current_score()
+        record_event(EVENT_STEP + 3, choices)
         return jsonify({
             'success': True,
             'message': f'Choices made: {choices}',
@@ -819,55 +1420,16 @@ def api_phase4_choices():
     if not session.get('logged_in'):
         return jsonify({'success': False, 'message': 'Not logged in'})
     
-    game = get_game()
-    choices = game.get_mot4_choices()
-    
-    # Define pillar for each choice (corrected IDs and pillars)
-    choice_pillars = {
-        'apis_hr_systems': 'platform_partnerships',
-        'tech_stack_data_pipelines': 'platform_partnerships',
-        'ai_ethics_officer': 'policies_practices',
-        'risk_mitigation_plan': 'policies_practices',
-        'internal_mobility': 'people_processes',
-        'data_collection_strategy': 'platform_partnerships',
-        'ceo_video_series': 'policies_practices',
-        'change_management': 'people_processes',
-        'business_sponsors': 'people_processes'
-    }
-    
-    # Define enabler mapping for each choice
-    choice_enablers = {
-        'apis_hr_systems': 'api_connectivity',
-        'tech_stack_data_pipelines': 'data_pipeline_automation',
-        'ai_ethics_officer': 'ethics_oversight',
-        'risk_mitigation_plan': 'risk_management',
-        'internal_mobility': 'talent_retention',
-        'data_collection_strategy': 'data_strategy',
-        'ceo_video_series': 'leadership_communication',
-        'change_management': 'change_adoption',
-        'business_sponsors': 'business_alignment'
-    }
-    
-    return jsonify({
-        'success': True,
-        'choices': [
-            {
-                'id': choice.id,
-                'title': choice.title,
-                'description': choice.description,
-                'cost': choice.cost,
-                'pillar': choice_pillars.get(choice.id, 'people_processes'),
-                'enabler_id': choice_enablers.get(choice.id, 'unknown')
-            }
-            for choice in choices
-        ]
-    })
+    return choices_cache.respond('phase4', _build_phase4_choices)
 
 @app.route('/api/phase4/choose', methods=['POST'])
 def api_phase4_choose():
     """API pour faire des choix Phase4"""
     if not session.get('logged_in'):
         return jsonify({'success': False, 'message': 'Not logged in'})
+    inactive = inactive_player_response()
+    if inactive:
+        return inactive
     
     data = request.json
     enabler_ids = data.get('enabler_ids', [])
@@ -877,14 +1439,8 @@ def api_phase4_choose():
     
     if success:
         score_info = game.get_current_score()
-        # Authoritative progress update
-        try:
-            username = session.get('username')
-            session_code = session.get('game_session_code')
-            if username and session_code:
-                user_manager.upsert_progress(username, session_code, 4)
-        except Exception as e:
-            logger.warning(f"progress update step4 failed: {e}")
+        # Authoritative progress update (journal d'événements)
+        record_event(EVENT_STEP + 4, enabler_ids)
         return jsonify({
             'success': True,
             'message': f'Choices made: {enabler_ids}',
@@ -903,28 +1459,16 @@ def api_phase5_choices():
     if not session.get('logged_in'):
         return jsonify({'success': False, 'message': 'Not logged in'})
     
-    game = get_game()
-    choices = game.get_mot5_choices()
-    template = content
-    
-    return jsonify({
-        'success': True,
-        'choices': [
-            {
-                'id': choice.id,
-                'title': choice.title,
-                'description': choice.description,
-                'icon': template.get_choice_icon('phase5', choice.id)
-            }
-            for choice in choices
-        ]
-    })
+    return choices_cache.respond('phase5', _build_phase5_choices)
 
 @app.route('/api/phase5/choose', methods=['POST'])
 def api_phase5_choose():
     """API pour faire un choix Phase5 et sauvegarder le score"""
     if not session.get('logged_in'):
         return jsonify({'success': False, 'message': 'Not logged in'})
+    inactive = inactive_player_response()
+    if inactive:
+        return inactive
     
     data = request.json
     choice_id = data.get('choice_id', '')
@@ -947,13 +1491,18 @@ def api_phase5_choose():
             mot_scores=results['scores'],
             session_id=session_code  # Utiliser le code de session Kahoot
         )
+        # Statistiques agrégées persistantes (globales, session, formateur)
+        user_manager.record_completion_stats(
+            total_score=results['total'],
+            stars=results['stars'],
+            mot_scores=results['scores'],
+            choices=game.get_path_choices(),
+            session_code=session_code
+        )
 
         # Mark progress completed
-        try:
-            if username and session_code:
-                user_manager.mark_completed(username, session_code)
-        except Exception as e:
-            logger.warning(f"progress mark_completed failed: {e}")
+        record_event(EVENT_STEP + 5, [choice_id])
+        record_event(EVENT_COMPLETED)
         
         # Retirer le joueur de la liste des joueurs actifs (il a terminé, son score est sauvegardé)
         # La vérification d'unicité continuera de fonctionner grâce à game_scores
@@ -1006,7 +1555,7 @@ def api_next_step():
     session_code = session.get('game_session_code')
     if not username or not session_code:
         return jsonify({'success': False, 'message': 'Missing session/user'}), 400
-    result = user_manager.get_next_step(username, session_code)
+    result = player_events.state(session_code, username).next_step()
     return jsonify({'success': True, **result})
 
 @app.route('/api/game_state')
@@ -1024,12 +1573,31 @@ def api_game_state():
 
 @app.route('/api/statistics')
 def api_statistics():
-    """API pour récupérer les statistiques"""
+    """API pour récupérer les statistiques (globales, ?session_code=... ou ?trainer=...)"""
     if not session.get('logged_in'):
         return jsonify({'success': False, 'message': 'Not logged in'})
     
-    game = get_game()
-    stats = game.get_statistics()
+    session_code = request.args.get('session_code', '').strip().upper() or None
+    trainer = request.args.get('trainer', '').strip() or None
+    user_role = session.get('user_role')
+    if session_code and user_role != 'admin':
+        # Statistiques d'une session (même fermée): admin, ou le formateur qui l'a créée
+        creator = user_manager.get_session_creator(session_code) if user_role == 'trainer' else None
+        if not creator or creator != session.get('username'):
+            return jsonify({
+                'success': False,
+                'message': 'Accès refusé. Admin requis.'
+            }), 403
+    elif trainer:
+        # Statistiques d'un formateur: admin, ou le formateur lui-même
+        if user_role != 'admin' and (user_role != 'trainer' or trainer != session.get('username')):
+            return jsonify({
+                'success': False,
+                'message': 'Accès refusé. Admin requis.'
+            }), 403
+    
+    # Agrégats persistants mis à jour à chaque fin de partie: lecture en O(1), partagée entre workers
+    stats = user_manager.get_statistics(session_code=session_code, trainer=trainer)
     
     return jsonify({
         'success': True,
@@ -1039,15 +1607,12 @@ def api_statistics():
 @app.route('/api/executive_dashboard')
 def api_executive_dashboard():
     """API pour récupérer les données de l'executive dashboard"""
-    print("=" * 50)
-    print("DEBUG EXECUTIVE DASHBOARD: Function called")
-    print("=" * 50)
     if not session.get('logged_in'):
         return jsonify({'success': False, 'message': 'Not logged in'})
     
     game = get_game()
     current_score = game.get_current_score()
-    print(f"DEBUG EXECUTIVE DASHBOARD: Game loaded, current_score = {current_score}")
+    trace_dashboard("Game loaded, current_score = %s", current_score)
     
     # Calculer les ENABLERS débloqués par catégorie
     unlocked_enablers_by_category = game.current_path.unlocked_enablers_by_category
@@ -1109,7 +1674,7 @@ def api_executive_dashboard():
     formatted_enablers = all_enablers
     
     # Générer un message d'impact pédagogique
-    impact_message = generate_impact_message(current_score, formatted_enablers)
+    impact_message = generate_impact_message(game, current_score, formatted_enablers)
     
     # Récupérer TOUS les enablers disponibles par phase depuis le template
     template = content
@@ -1119,26 +1684,19 @@ def api_executive_dashboard():
     for phase_id in ['phase1', 'phase2', 'phase3', 'phase4', 'phase5']:
         all_available_enablers_by_phase[phase_id] = []
         phase_choices = template.get_phase_choices(phase_id)
-        print(f"DEBUG web_interface: phase_id={phase_id}, phase_choices={list(phase_choices.keys())}")
-        if phase_id == 'phase4':
-            print(f"DEBUG web_interface: phase4 phase_choices type={type(phase_choices)}, len={len(phase_choices) if phase_choices else 'None'}")
+        trace_dashboard("phase_id=%s, phase_choices=%s", phase_id, lazy(lambda: list(phase_choices.keys())))
         
         for choice_id, choice_data in phase_choices.items():
             # Pour la phase 5, ne charger que les enablers du choix réel fait par le joueur
             if phase_id == 'phase5' and game.current_path.mot5_choice and choice_id != game.current_path.mot5_choice:
-                print(f"DEBUG web_interface: Skipping choice {choice_id} (player chose {game.current_path.mot5_choice})")
                 continue
             
             # Récupérer les enablers de ce choix
             choice_enablers = template.get_choice_enablers(phase_id, choice_id)
             
-            print(f"DEBUG web_interface: phase_id={phase_id}, choice_id={choice_id}, choice_enablers={choice_enablers}")
+            trace_dashboard("phase_id=%s, choice_id=%s, choice_enablers=%s", phase_id, choice_id, choice_enablers)
             if choice_enablers:
-                print(f"DEBUG web_interface: Adding {choice_enablers} to phase {phase_id}")
                 all_available_enablers_by_phase[phase_id].extend(choice_enablers)
-                print(f"DEBUG web_interface: phase {phase_id} now has {all_available_enablers_by_phase[phase_id]}")
-            else:
-                print(f"DEBUG web_interface: No enablers for phase_id={phase_id}, choice_id={choice_id}")
     
     # Organiser par catégorie
     all_available_enablers_by_phase_and_category = {}
@@ -1182,24 +1740,14 @@ def api_executive_dashboard():
             
             if enabler_category in category_titles:
                 all_available_enablers_by_phase_and_category[phase][enabler_category].append(enabler)
-                if phase == 'phase4':
-                    print(f"DEBUG web_interface: Added enabler '{enabler}' to category '{enabler_category}' for phase4")
-                elif phase == 'phase5':
-                    print(f"DEBUG web_interface: Added enabler '{enabler}' to category '{enabler_category}' for phase5")
             else:
-                if phase == 'phase4':
-                    print(f"DEBUG web_interface: Category '{enabler_category}' not found for enabler '{enabler}' in phase4")
-                elif phase == 'phase5':
-                    print(f"DEBUG web_interface: Category '{enabler_category}' not found for enabler '{enabler}' in phase5")
+                trace_dashboard("Category %r not found for enabler %r in %s", enabler_category, enabler, phase)
     
     # Formater les données pédagogiques par phase et catégorie (exclure Step 2 qui n'a pas d'enablers)
     pedagogical_data = {}
-    print(f"DEBUG web_interface: all_available_enablers_by_phase_and_category keys: {list(all_available_enablers_by_phase_and_category.keys())}")
     for phase, phase_data in all_available_enablers_by_phase_and_category.items():
-        print(f"DEBUG web_interface: Processing phase {phase}, phase_data keys: {list(phase_data.keys())}")
         # Exclure phase2 car elle n'a pas d'enablers, seulement des Use Cases
         if phase == 'phase2':
-            print(f"DEBUG web_interface: Skipping phase2")
             continue
             
         pedagogical_data[phase] = {}
@@ -1224,14 +1772,10 @@ def api_executive_dashboard():
                     })
     
     # Calculer les Use Cases activés
-    print("DEBUG EXECUTIVE DASHBOARD: Starting Use Cases calculation")
     use_cases_data = {}
     use_cases_by_phase = game.current_path.enablers_by_phase
     
-    print(f"DEBUG EXECUTIVE DASHBOARD: mot1_choice = {game.current_path.mot1_choice}")
-    print(f"DEBUG EXECUTIVE DASHBOARD: mot2_choices = {game.current_path.mot2_choices}")
-    print(f"DEBUG EXECUTIVE DASHBOARD: mot2_choices type = {type(game.current_path.mot2_choices)}")
-    print(f"DEBUG EXECUTIVE DASHBOARD: mot2_choices length = {len(game.current_path.mot2_choices) if game.current_path.mot2_choices else 0}")
+    trace_dashboard("Use cases: mot1_choice = %s, mot2_choices = %s", game.current_path.mot1_choice, game.current_path.mot2_choices)
     
     # Déterminer quel step afficher selon l'état du jeu
     current_step = 1
@@ -1244,7 +1788,7 @@ def api_executive_dashboard():
     elif game.current_path.mot5_choice:
         current_step = 5
     
-    print(f"DEBUG EXECUTIVE DASHBOARD: current_step = {current_step}")
+    trace_dashboard("current_step = %s", current_step)
     
     # Use Cases pour Step 1 (Amira) - afficher si Amira a été choisie, quel que soit le step actuel
     if game.current_path.mot1_choice == 'amira':
@@ -1271,9 +1815,7 @@ def api_executive_dashboard():
             })
     
     # Use Cases pour Step 2 - afficher si Step 2 est complété (peu importe current_step)
-    print(f"DEBUG EXECUTIVE DASHBOARD: About to check Step 2, mot2_choices = {game.current_path.mot2_choices}")
     if game.current_path.mot2_choices and len(game.current_path.mot2_choices) > 0:
-        print(f"DEBUG EXECUTIVE DASHBOARD: Creating Step 2 Use Cases, mot2_choices = {game.current_path.mot2_choices}")
         use_cases_data['phase2'] = {
             'title': 'Step 2 Use Cases',
             'use_cases': []
@@ -1316,11 +1858,9 @@ def api_executive_dashboard():
         for use_case_info in step2_use_cases_info:
             # Les Use Cases choisis sont activés
             is_unlocked = use_case_info['id'] in game.current_path.mot2_choices
-            print(f"DEBUG: Use Case {use_case_info['id']} - is_unlocked = {is_unlocked}")
             
             # Pour Step 2, on affiche seulement les Use Cases choisis (verts)
             if is_unlocked:
-                print(f"DEBUG: Adding Use Case {use_case_info['id']} to Step 2")
                 use_cases_data['phase2']['use_cases'].append({
                     'id': use_case_info['id'],
                     'title': use_case_info['title'],
@@ -1329,9 +1869,7 @@ def api_executive_dashboard():
                     'unlocked': is_unlocked
                 })
         
-        print(f"DEBUG: Step 2 Use Cases count = {len(use_cases_data['phase2']['use_cases'])}")
-    else:
-        print(f"DEBUG: Not creating Step 2 Use Cases, current_step = {current_step}")
+        trace_dashboard("Step 2 Use Cases count = %s", len(use_cases_data['phase2']['use_cases']))
 
     # Add all_enablers data to pedagogical_data for modal display
     pedagogical_data['all_enablers'] = {}
@@ -1418,25 +1956,25 @@ def get_personalized_step_message(mot_key, choice, score):
     # Messages génériques pour les autres phases
     return f"Congratulations! You earned {score} star{'s' if score > 1 else ''} for this step. These stars will be a quick visual cue of your overall success throughout the rest of the game."
 
-def generate_impact_message(score_data, enablers):
+def generate_impact_message(game, score_data, enablers):
     """Génère un message d'impact pédagogique basé sur le score et les enablers"""
     total_score = score_data.get('total', 0)
     max_possible = score_data.get('max_possible', 15)
     
     # Calculer les scores par étape dynamiquement
     mot_scores = {}
-    if game_instance.current_path:
+    if game.current_path:
         # Calculer le score pour chaque phase complétée
-        if game_instance.current_path.mot1_choice:
-            mot_scores['mot1'] = game_instance.calculate_mot_score(1)
-        if game_instance.current_path.mot2_choices:
-            mot_scores['mot2'] = game_instance.calculate_mot_score(2)
-        if game_instance.current_path.mot3_choices:
-            mot_scores['mot3'] = game_instance.calculate_mot_score(3)
-        if game_instance.current_path.mot4_choices:
-            mot_scores['mot4'] = game_instance.calculate_mot_score(4)
-        if game_instance.current_path.mot5_choice:
-            mot_scores['mot5'] = game_instance.calculate_mot_score(5)
+        if game.current_path.mot1_choice:
+            mot_scores['mot1'] = game.calculate_mot_score(1)
+        if game.current_path.mot2_choices:
+            mot_scores['mot2'] = game.calculate_mot_score(2)
+        if game.current_path.mot3_choices:
+            mot_scores['mot3'] = game.calculate_mot_score(3)
+        if game.current_path.mot4_choices:
+            mot_scores['mot4'] = game.calculate_mot_score(4)
+        if game.current_path.mot5_choice:
+            mot_scores['mot5'] = game.calculate_mot_score(5)
     
     # Analyser les résultats par étape avec messages personnalisés
     step_results = []
@@ -1450,17 +1988,17 @@ def generate_impact_message(score_data, enablers):
     
     # Récupérer les choix faits pour chaque étape
     choices = {}
-    if game_instance.current_path:
-        if game_instance.current_path.mot1_choice:
-            choices['mot1'] = game_instance.current_path.mot1_choice
-        if game_instance.current_path.mot2_choices:
-            choices['mot2'] = game_instance.current_path.mot2_choices
-        if game_instance.current_path.mot3_choices:
-            choices['mot3'] = game_instance.current_path.mot3_choices
-        if game_instance.current_path.mot4_choices:
-            choices['mot4'] = game_instance.current_path.mot4_choices
-        if game_instance.current_path.mot5_choice:
-            choices['mot5'] = game_instance.current_path.mot5_choice
+    if game.current_path:
+        if game.current_path.mot1_choice:
+            choices['mot1'] = game.current_path.mot1_choice
+        if game.current_path.mot2_choices:
+            choices['mot2'] = game.current_path.mot2_choices
+        if game.current_path.mot3_choices:
+            choices['mot3'] = game.current_path.mot3_choices
+        if game.current_path.mot4_choices:
+            choices['mot4'] = game.current_path.mot4_choices
+        if game.current_path.mot5_choice:
+            choices['mot5'] = game.current_path.mot5_choice
     
     # Générer le message personnalisé pour la dernière étape complétée seulement
     last_completed_step = None
@@ -1505,16 +2043,14 @@ def api_leaderboard():
         limit = request.args.get('limit', 1000, type=int)
         session_code = session.get('game_session_code')  # Code de session Kahoot
         
-        logger.info(f"Leaderboard request: session_code={session_code}, limit={limit}")
+        trace_leaderboard("Leaderboard request: session_code=%s, limit=%s", session_code, limit)
         
         # Si on a un code de session, filtrer STRICTEMENT par session (seulement les joueurs de cette session)
         if session_code:
-            logger.info(f"Filtering leaderboard for session: {session_code}")
             leaderboard = user_manager.get_leaderboard_for_session(session_code, limit=limit)
-            logger.info(f"Found {len(leaderboard)} players for session {session_code}")
+            trace_leaderboard("Found %s players for session %s", len(leaderboard), session_code)
         else:
             # Sinon, leaderboard global (mode normal)
-            logger.info("No session code, using global leaderboard")
             leaderboard = user_manager.get_leaderboard(limit=limit)
         
         # Ajouter le rang de l'utilisateur actuel s'il est connecté
@@ -1522,7 +2058,6 @@ def api_leaderboard():
         current_username = None
         if session.get('logged_in'):
             current_username = session.get('username')
-            logger.info(f"Current logged-in user: {current_username}")
             # Normalize username for comparison (case-insensitive)
             current_username_normalized = current_username.lower().strip() if current_username else None
             for entry in leaderboard:
@@ -1530,17 +2065,12 @@ def api_leaderboard():
                 if entry_username and current_username_normalized:
                     if entry_username.lower() == current_username_normalized:
                         user_rank = entry['rank']
-                        logger.info(f"User {current_username} found at rank {user_rank} (normalized comparison)")
                         break
                 elif entry_username == current_username:  # Fallback to exact match
                     user_rank = entry['rank']
-                    logger.info(f"User {current_username} found at rank {user_rank} (exact match)")
                     break
             
-            # Log if user not found in leaderboard
-            if user_rank is None and current_username:
-                logger.warning(f"User {current_username} NOT FOUND in leaderboard!")
-                logger.warning(f"Available usernames in leaderboard: {[e.get('username', 'N/A') for e in leaderboard]}")
+            trace_leaderboard("User %s at rank %s", current_username, user_rank)
         
         # Ensure leaderboard is a list and contains valid data
         leaderboard_list = []
@@ -1558,16 +2088,9 @@ def api_leaderboard():
             else:
                 logger.warning(f"Invalid leaderboard entry format: {entry}")
         
-        logger.info(f"Returning leaderboard with {len(leaderboard_list)} entries for session {session_code}")
-        
-        # DEBUG: Log all usernames in leaderboard and current username for comparison
-        if current_username:
-            leaderboard_usernames = [e.get('username', 'N/A') for e in leaderboard_list]
-            logger.info(f"DEBUG: Current username '{current_username}' looking in: {leaderboard_usernames}")
-            if current_username not in leaderboard_usernames:
-                logger.warning(f"WARNING: Current username '{current_username}' NOT in leaderboard list!")
-                logger.warning(f"  Normalized comparison: Looking for '{current_username.lower().strip()}'")
-                logger.warning(f"  Available (normalized): {[u.lower().strip() for u in leaderboard_usernames]}")
+        if trace_leaderboard and current_username:
+            trace_leaderboard("Current username %r looking in: %s", current_username,
+                              [e.get('username', 'N/A') for e in leaderboard_list])
         
         # Get the timestamp of the most recent score completion for this session
         last_completion_time = None